@@ -1,24 +1,111 @@
 # app/auth/dependencies.py
-from fastapi import Depends, HTTPException, Request
+import logging
+from typing import Optional
+from uuid import UUID
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.auth.token_cache import hash_token, revoked_tokens, verified_tokens
 from app.auth.utils import decode_access_token
 from psycopg2.extensions import connection as PGConnection
 
-from app.database.auth_queries import create_user, get_user_by_email
+from app.database.auth_queries import create_user, get_user_by_email, select_active_revoked_tokens
+from app.database.connection import PostgresConnection
+from app.database.replicas import replica_router
+from app.services.invalidation import invalidation_bus
 
 
+logger = logging.getLogger(__name__)
+
 security = HTTPBearer()
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
-    payload = decode_access_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    return payload["sub"]
+
+def get_token_claims(token: str) -> dict:
+    """
+    Verify a bearer token and return its claims.
+    Verified payloads are served from the token cache until they expire;
+    revocation is checked on every call, cached or not.
+    """
+    token_hash = hash_token(token)
+    payload = verified_tokens.get(token_hash)
+
+    if payload is None:
+        payload = decode_access_token(token)
+        if not payload:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        verified_tokens.put(token_hash, payload)
+
+    if revoked_tokens.is_revoked(payload.get("jti")):
+        verified_tokens.evict(token_hash)
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+
+    return payload
+
+
+async def get_current_claims(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    return get_token_claims(credentials.credentials)
+
+
+async def get_current_user(claims: dict = Depends(get_current_claims)):
+    return claims["sub"]
+
+
+async def track_user_writes(request: Request, current_user: str = Depends(get_current_user)):
+    """
+    Router dependency that tells the replica router about a user's writes, so
+    their following reads are not served by a replica that has not caught up.
+    """
+    if request.method in ("GET", "HEAD", "OPTIONS"):
+        yield
+        return
+
+    replica_router.begin_write(current_user)
+    try:
+        yield
+    finally:
+        replica_router.end_write(current_user)
+
+
+def ensure_current_user(user_id: Optional[UUID], current_user: str) -> None:
+    """
+    Reject a client supplied user_id that differs from the token's subject.
+    Queries are always scoped by the token's subject, this only turns a
+    mismatch into an explicit 403 instead of silently serving the caller's own data.
+    """
+    if user_id is not None and str(user_id) != str(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to access another user's data",
+        )
+
+
+def load_revoked_tokens(conn: PGConnection) -> None:
+    """
+    Populate the in-memory revocation list from the database at startup.
+    """
+    entries = select_active_revoked_tokens(conn)
+    revoked_tokens.load(entries)
+    logger.info(f"Loaded {len(entries)} revoked tokens")
+
+
+def on_token_revoked(key: str) -> None:
+    """
+    Invalidation handler: a token was revoked by this or another process.
+    The key is '<jti>:<expires_at epoch>'.
+    """
+    jti, _, expires_at = key.rpartition(":")
+    revoked_tokens.revoke(jti, float(expires_at))
+
+
+def reload_revoked_tokens() -> None:
+    with PostgresConnection() as conn:
+        load_revoked_tokens(conn)
+
+
+invalidation_bus.subscribe("revoked_token", on_token_revoked, resync=reload_revoked_tokens)
 
 
 def get_or_create_user(conn: PGConnection, email: str, name: str):
     user = get_user_by_email(conn, email)
     if user:
         return user
-    return create_user(conn, email, name)
\ No newline at end of file
+    return create_user(conn, email, name)
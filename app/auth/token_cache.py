@@ -0,0 +1,88 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def hash_token(token: str) -> str:
+    """
+    Hash a raw bearer token so it is never kept in memory as a cache key.
+    """
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache of already verified JWT payloads, keyed by token hash.
+    Each entry expires at the token's own `exp` claim.
+    """
+
+    def __init__(self, max_size: int = 10_000) -> None:
+        self._max_size = max_size
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token_hash: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            payload = self._entries.get(token_hash)
+            if payload is None:
+                return None
+
+            if payload["exp"] <= now:
+                del self._entries[token_hash]
+                return None
+
+            self._entries.move_to_end(token_hash)
+            return payload
+
+    def put(self, token_hash: str, payload: dict) -> None:
+        with self._lock:
+            self._entries[token_hash] = payload
+            self._entries.move_to_end(token_hash)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def evict(self, token_hash: str) -> None:
+        with self._lock:
+            self._entries.pop(token_hash, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RevocationList:
+    """
+    In-memory set of revoked token ids (`jti`), each kept until the token it
+    revokes would have expired anyway.
+    """
+
+    def __init__(self) -> None:
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, jti: str, expires_at: float) -> None:
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti:
+            return False
+        with self._lock:
+            expires_at = self._revoked.get(jti)
+            if expires_at is None:
+                return False
+            if expires_at <= time.time():
+                del self._revoked[jti]
+                return False
+            return True
+
+    def load(self, entries: Dict[str, float]) -> None:
+        with self._lock:
+            self._revoked.update(entries)
+
+
+verified_tokens = VerifiedTokenCache()
+revoked_tokens = RevocationList()
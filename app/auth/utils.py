@@ -1,26 +1,52 @@
+import logging
 import os
+import time
+from uuid import uuid4
 from jose import jwt
 from datetime import datetime, timedelta
 
 ALGORITHM = "HS256"
 
+logger = logging.getLogger(__name__)
+
+_jwt_secret_key: str | None = None
+
+
+def load_jwt_secret() -> str:
+    """
+    Read JWT_SECRET_KEY from the environment once and keep it for the process lifetime.
+    Called at startup, after the .env file has been loaded.
+    """
+    global _jwt_secret_key
+    secret = os.getenv("JWT_SECRET_KEY")
+    if not secret:
+        raise RuntimeError("JWT_SECRET_KEY is not set")
+    _jwt_secret_key = secret
+    return secret
+
+
+def get_jwt_secret() -> str:
+    return _jwt_secret_key or load_jwt_secret()
+
+
 def create_access_token(user: dict, expires_delta: timedelta = timedelta(minutes=15)):
     to_encode = {
         "sub": user["id"],
         "email": user["email"],
-        "username": user["username"]
+        "username": user["username"],
+        "jti": uuid4().hex,
     }
 
     expire = datetime.utcnow() + expires_delta
-        
+
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, os.getenv("JWT_SECRET_KEY"), algorithm=ALGORITHM)
+    return jwt.encode(to_encode, get_jwt_secret(), algorithm=ALGORITHM)
 
 
 def decode_access_token(token: str):
     try:
-        payload = jwt.decode(str(token), os.getenv("JWT_SECRET_KEY"), algorithms=[ALGORITHM])
-        return payload if "exp" in payload and datetime.utcnow() < datetime.fromtimestamp(payload["exp"]) else None
+        payload = jwt.decode(str(token), get_jwt_secret(), algorithms=[ALGORITHM])
+        return payload if "exp" in payload and time.time() < payload["exp"] else None
     except Exception as e:
-        print(str(e)) #TODO handle exception properly
+        logger.info(f"Rejected access token: {e}")
         return False
@@ -3,3 +3,22 @@ ALLOWED_ORIGINS = [
     "http://localhost:3000/",  
     # forntend domains
 ]
+
+MAX_WORKSPACES_PER_USER = 5
+
+# Connections kept per process for each database server (primary and each replica)
+DB_POOL_MIN_CONNECTIONS = 1
+DB_POOL_MAX_CONNECTIONS = 20
+
+# Read replicas (DB_REPLICA_DSNS): seconds between health/lag checks, and the lag
+# beyond which a replica stops serving reads
+REPLICA_HEALTH_CHECK_SECONDS = 5
+REPLICA_MAX_LAG_SECONDS = 10
+
+# Hash partitions of messages on conversation_id (partition_messages.py)
+MESSAGE_HASH_PARTITIONS = 16
+
+# Cache invalidation (LISTEN/NOTIFY): how long cached entries are trusted while
+# the listener is not connected, and seconds between reconnect attempts
+INVALIDATION_FALLBACK_TTL_SECONDS = 30
+INVALIDATION_RECONNECT_SECONDS = 2
@@ -9,4 +9,26 @@ class WorkspaceLimitExceeded(Exception):
 class MovementError(Exception):
     def __init__(self, message: str = "Error moving item"):
         self.message = message
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+
+class QuizPipelineError(Exception):
+    def __init__(self, message: str = "Quiz generation failed"):
+        self.message = message
+        super().__init__(self.message)
+
+class RateLimitExceeded(Exception):
+    def __init__(self, retry_after: float, message: str = "Rate limit exceeded"):
+        self.retry_after = retry_after
+        self.message = message
+        super().__init__(self.message)
+
+class ConversationArchived(Exception):
+    def __init__(self, conversation_id, message: str = "Conversation is archived and must be read from the primary"):
+        self.conversation_id = conversation_id
+        self.message = message
+        super().__init__(self.message)
+
+class ImportRejected(Exception):
+    def __init__(self, message: str = "Import file is not valid"):
+        self.message = message
+        super().__init__(self.message)
@@ -0,0 +1,235 @@
+import logging
+import zlib
+from typing import Any, Dict, List, Tuple
+from uuid import UUID
+
+from psycopg2 import sql
+from psycopg2.extensions import connection as PGConnection
+import psycopg2.extras
+
+from app.database.partition_queries import select_copyable_message_columns
+
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # optional, archives fall back to zlib
+    zstandard = None
+
+
+def compress_payload(data: bytes) -> Tuple[str, bytes]:
+    """
+    Compress with zstd when the zstandard package is installed, otherwise zlib.
+
+    Returns:
+        (codec, compressed bytes)
+    """
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(data)
+    return "zlib", zlib.compress(data, 9)
+
+
+def decompress_payload(codec: str, payload: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Archive is zstd compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return zlib.decompress(payload)
+
+
+def select_idle_conversations(conn: PGConnection, idle_days: int, limit: int) -> List[UUID]:
+    """
+    Hot conversations with no message for `idle_days`, oldest activity first,
+    skipping those rehydrated within `idle_days`. Rows are locked and rows locked by another archiver are skipped, so
+    several workers can archive at once without picking the same conversation.
+    """
+    query = """
+    SELECT conversation_id
+    FROM conversations
+    WHERE archived_at IS NULL
+    AND last_message_at < now() - make_interval(days => %(idle_days)s)
+    AND (rehydrated_at IS NULL OR rehydrated_at < now() - make_interval(days => %(idle_days)s))
+    ORDER BY last_message_at
+    LIMIT %(limit)s
+    FOR UPDATE SKIP LOCKED;
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(query, {"idle_days": idle_days, "limit": limit})
+        return [row[0] for row in cursor.fetchall()]
+
+
+def lock_idle_conversation(conn: PGConnection, conversation_id: UUID, idle_days: int) -> bool:
+    """
+    Lock a conversation for archiving if it is still hot and idle. False if it was
+    archived, deleted, written to since it was picked, or is locked by another archiver.
+    """
+    query = """
+    SELECT 1
+    FROM conversations
+    WHERE conversation_id = %(conversation_id)s
+    AND archived_at IS NULL
+    AND last_message_at < now() - make_interval(days => %(idle_days)s)
+    AND (rehydrated_at IS NULL OR rehydrated_at < now() - make_interval(days => %(idle_days)s))
+    FOR UPDATE SKIP LOCKED;
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(query, {"conversation_id": conversation_id, "idle_days": idle_days})
+        return cursor.fetchone() is not None
+
+
+def select_conversation_messages_json(conn: PGConnection, conversation_id: UUID) -> Tuple[str, int]:
+    """
+    Every message of a conversation as a JSON array, oldest first, without the
+    generated columns. Returns (json text, message count).
+    """
+    query = """
+    SELECT
+        COALESCE(jsonb_agg(to_jsonb(m) - 'search_vector' ORDER BY m.message_id), '[]'::jsonb)::text,
+        count(*)
+    FROM messages m
+    WHERE m.conversation_id = %s;
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(query, (conversation_id,))
+        messages_json, count = cursor.fetchone()
+        return messages_json, count
+
+
+def insert_conversation_archive(
+    conn: PGConnection, conversation_id: UUID, codec: str, payload: bytes, raw_bytes: int, message_count: int
+) -> None:
+    """
+    Store the archive and remove the conversation's messages, leaving the
+    conversation row as a stub with its counters intact. The active leaf
+    pointer is kept in the archive and restored with the messages.
+    """
+    archive_query = """
+    WITH archived AS (
+        INSERT INTO conversation_archives (
+            conversation_id, codec, payload, message_count, last_message_at,
+            active_leaf_message_id, raw_bytes, compressed_bytes
+        )
+        SELECT conversation_id, %s, %s, %s, last_message_at, active_leaf_message_id, %s, %s
+        FROM conversations
+        WHERE conversation_id = %s
+        RETURNING conversation_id
+    )
+    DELETE FROM messages
+    WHERE conversation_id = (SELECT conversation_id FROM archived);
+    """
+    # A separate statement: the message counter trigger acts at the end of the
+    # DELETE and would reset what is restored here
+    stub_query = """
+    UPDATE conversations c
+    SET archived_at = a.archived_at,
+        message_count = a.message_count,
+        last_message_at = a.last_message_at
+    FROM conversation_archives a
+    WHERE a.conversation_id = c.conversation_id AND c.conversation_id = %s;
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            archive_query,
+            (codec, psycopg2.Binary(payload), message_count, raw_bytes, len(payload), conversation_id),
+        )
+        cursor.execute(stub_query, (conversation_id,))
+
+
+def rehydrate_conversation(conn: PGConnection, conversation_id: UUID, user_id: UUID) -> bool:
+    """
+    Move an archived conversation's messages back into messages and drop the
+    archive, in the caller's transaction. Concurrent callers queue on the
+    archive row; the later ones find it gone and return False.
+
+    Returns:
+        True if the conversation was rehydrated
+    """
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+        cursor.execute(
+            """
+            SELECT a.codec, a.payload
+            FROM conversation_archives a
+            JOIN conversations c ON c.conversation_id = a.conversation_id
+            WHERE a.conversation_id = %s AND c.user_id = %s
+            FOR UPDATE OF a;
+            """,
+            (conversation_id, user_id),
+        )
+        archive = cursor.fetchone()
+    if archive is None:
+        return False
+
+    messages_json = decompress_payload(archive["codec"], bytes(archive["payload"])).decode("utf-8")
+    columns = sql.SQL(", ").join(map(sql.Identifier, select_copyable_message_columns(conn)))
+    restore_query = sql.SQL("""
+    INSERT INTO messages ({columns})
+    SELECT {columns}
+    FROM json_populate_recordset(NULL::messages, %s::json);
+    """).format(columns=columns)
+    unstub_query = """
+    WITH restored AS (
+        DELETE FROM conversation_archives
+        WHERE conversation_id = %s
+        RETURNING message_count, last_message_at, active_leaf_message_id
+    )
+    UPDATE conversations c
+    SET archived_at = NULL,
+        rehydrated_at = now(),
+        message_count = restored.message_count,
+        last_message_at = restored.last_message_at,
+        active_leaf_message_id = restored.active_leaf_message_id
+    FROM restored
+    WHERE c.conversation_id = %s;
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(restore_query, (messages_json,))
+        cursor.execute(unstub_query, (conversation_id, conversation_id))
+    logger.info(f"Rehydrated archived conversation {conversation_id}")
+    return True
+
+
+def select_storage_metrics(conn: PGConnection, user_id: UUID) -> Dict[str, Any]:
+    """
+    Size of a user's hot (messages) and cold (archived) conversation storage.
+    Hot bytes are estimated from the average size of a messages row, so no
+    message has to be read; cold sizes are exact.
+    """
+    query = """
+    WITH message_tables AS (
+        SELECT 'messages'::regclass AS relid
+        UNION ALL
+        SELECT inhrelid FROM pg_inherits WHERE inhparent = 'messages'::regclass
+    ),
+    row_size AS (
+        SELECT sum(pg_total_relation_size(t.relid))::float8 / NULLIF(sum(GREATEST(c.reltuples, 0)), 0) AS bytes
+        FROM message_tables t
+        JOIN pg_class c ON c.oid = t.relid
+    )
+    SELECT
+        hot.conversations AS hot_conversations,
+        hot.messages AS hot_messages,
+        COALESCE(round(hot.messages * (SELECT bytes FROM row_size)), 0)::bigint AS hot_bytes,
+        cold.conversations AS cold_conversations,
+        cold.messages AS cold_messages,
+        cold.raw_bytes AS cold_raw_bytes,
+        cold.compressed_bytes AS cold_compressed_bytes
+    FROM (
+        SELECT count(*) AS conversations, COALESCE(sum(message_count), 0)::bigint AS messages
+        FROM conversations
+        WHERE user_id = %(user_id)s AND archived_at IS NULL
+    ) hot,
+    (
+        SELECT
+            count(*) AS conversations,
+            COALESCE(sum(a.message_count), 0)::bigint AS messages,
+            COALESCE(sum(a.raw_bytes), 0)::bigint AS raw_bytes,
+            COALESCE(sum(a.compressed_bytes), 0)::bigint AS compressed_bytes
+        FROM conversation_archives a
+        JOIN conversations c ON c.conversation_id = a.conversation_id
+        WHERE c.user_id = %(user_id)s
+    ) cold;
+    """
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+        cursor.execute(query, {"user_id": user_id})
+        return dict(cursor.fetchone())
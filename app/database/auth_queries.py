@@ -26,6 +26,34 @@ def create_user(conn: PGConnection, email: str, name: str) -> dict:
         cursor.execute(query, (user_id, name, email))
         user = cursor.fetchone()
 
-        conn.commit()
 
     return dict(user)
+
+
+def insert_revoked_token(conn: PGConnection, jti: str, user_id: UUID, expires_at: float) -> None:
+    """
+    Record a revoked token id until the token's own expiry.
+    """
+    query = """
+    INSERT INTO revoked_tokens (jti, user_id, expires_at)
+    VALUES (%s, %s, to_timestamp(%s))
+    ON CONFLICT (jti) DO NOTHING;
+    """
+
+    with conn.cursor() as cursor:
+        cursor.execute(query, (jti, user_id, expires_at))
+
+
+def select_active_revoked_tokens(conn: PGConnection) -> dict:
+    """
+    Return {jti: expires_at_epoch} for every revocation that has not expired yet.
+    """
+    query = """
+    SELECT jti, EXTRACT(EPOCH FROM expires_at)::float8 AS expires_at
+    FROM revoked_tokens
+    WHERE expires_at > now();
+    """
+
+    with conn.cursor() as cursor:
+        cursor.execute(query)
+        return {jti: expires_at for jti, expires_at in cursor.fetchall()}
@@ -1,62 +1,399 @@
 from datetime import datetime
-from typing import Any, Dict
-from uuid import UUID
+from typing import Any, Dict, Iterator, Optional
+from uuid import UUID, uuid4
 from psycopg2.extensions import connection as PGConnection
 import psycopg2.extras
 
+from app.custom_exceptions import ConversationArchived
+from app.database.archive_queries import rehydrate_conversation
+from app.database.prepared import execute_prepared
+from app.routes.constant import ASSISTANT_ROLE, USER_ROLE
 
-def select_chat_context_by_id(conn: PGConnection, chat_id: UUID) -> dict:
+
+# Messages form a tree through parent_message_id. A conversation shows one branch:
+# the path from its active leaf (the newest message when the pointer is NULL) up to
+# the root. The walk is one primary key lookup per message, so it costs the branch
+# depth regardless of how many other branches the conversation has.
+# Expects the %(chat_id)s and %(user_id)s parameters; %(from_message_id)s, when not
+# NULL, starts the walk at that message instead of the active leaf.
+# Every access to messages is keyed by conversation_id = %(chat_id)s so that, with
+# messages hash partitioned on conversation_id, only one partition is touched.
+# A parent always has a smaller id than its children; each step up requires it,
+# so a corrupt parent chain (a cycle) ends the walk instead of looping forever.
+ACTIVE_BRANCH_CTE = """
+conv AS (
+    SELECT
+        c.conversation_id,
+        c.current_model_id,
+        c.persona_id,
+        c.created_at,
+        c.updated_at,
+        c.archived_at,
+        COALESCE(
+            c.active_leaf_message_id,
+            (SELECT max(message_id) FROM messages WHERE conversation_id = %(chat_id)s)
+        ) AS leaf_id
+    FROM conversations c
+    WHERE c.conversation_id = %(chat_id)s AND c.user_id = %(user_id)s
+),
+branch AS (
+    SELECT m.*, 1 AS depth
+    FROM messages m, conv
+    WHERE m.message_id = COALESCE(%(from_message_id)s::bigint, conv.leaf_id)
+    AND m.conversation_id = %(chat_id)s
+    UNION ALL
+    SELECT p.*, b.depth + 1
+    FROM messages p
+    JOIN branch b ON p.message_id = b.parent_message_id
+    WHERE p.conversation_id = %(chat_id)s
+    AND p.message_id < b.message_id
+)
+"""
+
+
+def _rehydrate_archived(conn: PGConnection, chat_id: UUID, user_id: UUID) -> bool:
     """
-    Retrieve a specific chat context by its ID.
+    Bring an archived conversation's messages back so the read can be retried.
+    Read-only connections (replicas) cannot, the caller retries on the primary.
     """
-    query = """
+    if conn.readonly:
+        raise ConversationArchived(chat_id)
+    return rehydrate_conversation(conn, chat_id, user_id)
+
+
+def _rehydrate_if_archived(conn: PGConnection, chat_id: UUID, user_id: UUID) -> bool:
+    """
+    For queries that do not read archived_at themselves: called when they find
+    nothing, rehydrates the conversation if that is because it is archived.
+
+    Returns:
+        True if the conversation was rehydrated and the query can be retried
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT archived_at IS NOT NULL FROM conversations WHERE conversation_id = %s AND user_id = %s;",
+            (chat_id, user_id),
+        )
+        row = cursor.fetchone()
+    return bool(row and row[0]) and _rehydrate_archived(conn, chat_id, user_id)
+
+
+def select_chat_context_by_id(
+    conn: PGConnection, chat_id: UUID, user_id: UUID, from_message_id: Optional[int] = None
+) -> dict:
+    """
+    Retrieve a specific chat context by its ID, only if it belongs to the user.
+    Messages are the active branch, root first, or the branch ending at
+    from_message_id when given. leaf_message_id is the last message of it.
+    An archived conversation is rehydrated first.
+    """
+    query = f"""
+    WITH RECURSIVE {ACTIVE_BRANCH_CTE}
     SELECT
-        c.current_model_id,
-        json_agg(
-          json_build_object(
-            'role', m.role,
-            'content', m.content
-          ) ORDER BY m.created_at, m.message_id
+        conv.archived_at IS NOT NULL AS archived,
+        conv.current_model_id,
+        conv.persona_id,
+        (SELECT message_id FROM branch WHERE depth = 1) AS leaf_message_id,
+        COALESCE(
+            (
+                SELECT json_agg(
+                    json_build_object(
+                        'role', b.role,
+                        'content', b.content
+                    ) ORDER BY b.depth DESC
+                )
+                FROM branch b
+            ),
+            '[]'::json
         ) AS messages
-    FROM conversations c
-    JOIN messages m ON c.conversation_id = m.conversation_id
-    WHERE c.conversation_id = %s
-    GROUP BY c.current_model_id;
+    FROM conv;
     """
+    params = {"chat_id": chat_id, "user_id": user_id, "from_message_id": from_message_id}
     # Use RealDictCursor for JSON output
     with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-        cursor.execute(query, (chat_id,))
+        execute_prepared(cursor, "select_chat_context_by_id", query, params)
         records = cursor.fetchone()
-        return records
+    if records and records.pop("archived") and _rehydrate_archived(conn, chat_id, user_id):
+        return select_chat_context_by_id(conn, chat_id, user_id, from_message_id)
+    return records
 
 
-def select_chat_by_id(conn: PGConnection, chat_id: UUID) -> dict:
+def select_message(conn: PGConnection, chat_id: UUID, user_id: UUID, message_id: int) -> Optional[dict]:
     """
-    Retrieve a specific chat by its ID.
+    Retrieve one message with its conversation's model and persona, only if it belongs to the user.
+    An archived conversation is rehydrated first.
     """
     query = """
     SELECT
+        m.message_id,
+        m.parent_message_id,
+        m.role,
+        m.content,
         c.current_model_id,
-        c.conversation_id,
-        c.created_at,
-        c.updated_at,
-        json_agg(
-          json_build_object(
+        c.persona_id
+    FROM messages m
+    JOIN conversations c ON c.conversation_id = m.conversation_id
+    WHERE m.message_id = %s AND m.conversation_id = %s AND c.user_id = %s;
+    """
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+        execute_prepared(cursor, "select_message", query, (message_id, chat_id, user_id))
+        message = cursor.fetchone()
+    if message is None and _rehydrate_if_archived(conn, chat_id, user_id):
+        return select_message(conn, chat_id, user_id, message_id)
+    return message
+
+
+def select_chat_by_id(conn: PGConnection, chat_id: UUID, user_id: UUID) -> Optional[str]:
+    """
+    Retrieve a specific chat by its ID, only if it belongs to the user.
+    The messages are the active branch, each with the ids of its siblings
+    (alternative edits or regenerations) to switch branches with.
+    The whole chat is built as JSON by Postgres and returned as raw text,
+    ready to be sent to the client without being parsed and re-encoded.
+    An archived conversation is rehydrated first.
+    """
+    query = f"""
+    WITH RECURSIVE {ACTIVE_BRANCH_CTE}
+    SELECT
+        conv.archived_at IS NOT NULL AS archived,
+        json_build_object(
+            'current_model_id', conv.current_model_id,
+            'conversation_id', conv.conversation_id,
+            'persona_id', conv.persona_id,
+            'active_leaf_message_id', conv.leaf_id,
+            'created_at', conv.created_at,
+            'updated_at', conv.updated_at,
+            'messages', COALESCE(
+                (
+                    SELECT json_agg(
+                        json_build_object(
+                            'message_id', b.message_id,
+                            'parent_message_id', b.parent_message_id,
+                            'role', b.role,
+                            'model_id', b.model_id,
+                            'content', b.content,
+                            'truncated', b.truncated,
+                            'sibling_ids', CASE
+                                WHEN b.parent_message_id IS NULL THEN (
+                                    SELECT json_agg(s.message_id ORDER BY s.message_id)
+                                    FROM messages s
+                                    WHERE s.conversation_id = %(chat_id)s
+                                    AND s.parent_message_id IS NULL
+                                )
+                                ELSE (
+                                    SELECT json_agg(s.message_id ORDER BY s.message_id)
+                                    FROM messages s
+                                    WHERE s.conversation_id = %(chat_id)s
+                                    AND s.parent_message_id = b.parent_message_id
+                                )
+                            END
+                        ) ORDER BY b.depth DESC
+                    )
+                    FROM branch b
+                ),
+                '[]'::json
+            )
+        )::text AS chat
+    FROM conv;
+    """
+    params = {"chat_id": chat_id, "user_id": user_id, "from_message_id": None}
+    with conn.cursor() as cursor:
+        execute_prepared(cursor, "select_chat_by_id", query, params)
+        row = cursor.fetchone()
+    if row and row[0] and _rehydrate_archived(conn, chat_id, user_id):
+        return select_chat_by_id(conn, chat_id, user_id)
+    return row[1] if row else None
+
+
+def select_chat_page_by_id(
+    conn: PGConnection,
+    chat_id: UUID,
+    user_id: UUID,
+    limit: int,
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+) -> Optional[str]:
+    """
+    Retrieve one page of a chat using keyset pagination on message_id.
+    Without `after` the page is the `limit` messages right before `before`
+    (or the latest ones), with only `after` it is the `limit` messages right after it.
+    Messages are always returned oldest first, with a `has_more` flag for the
+    direction that was paged. Returns raw JSON text, or None if the chat does
+    not exist or does not belong to the user.
+
+    Pages follow a branch: the active one, or the branch of `before` when given.
+    Ids grow from root to leaf along a branch, so walking up from the leaf (or from
+    `before`) stops after `limit` + 1 messages, or at `after` when paging forward.
+    """
+    direction = "ASC" if after is not None and before is None else "DESC"
+    query = f"""
+    WITH RECURSIVE conv AS (
+        SELECT
+            c.conversation_id,
+            c.current_model_id,
+            c.persona_id,
+            c.created_at,
+            c.updated_at,
+            c.archived_at,
+            COALESCE(
+                c.active_leaf_message_id,
+                (SELECT max(message_id) FROM messages WHERE conversation_id = %(chat_id)s)
+            ) AS leaf_id
+        FROM conversations c
+        WHERE c.conversation_id = %(chat_id)s AND c.user_id = %(user_id)s
+    ),
+    branch AS (
+        SELECT m.message_id, m.parent_message_id, m.role, m.model_id, m.content, m.truncated, 1 AS depth
+        FROM messages m, conv
+        WHERE m.conversation_id = %(chat_id)s
+        AND m.message_id = CASE
+            WHEN %(before)s::bigint IS NULL THEN conv.leaf_id
+            ELSE (
+                SELECT parent_message_id FROM messages
+                WHERE message_id = %(before)s AND conversation_id = %(chat_id)s
+            )
+        END
+        AND (%(after)s::bigint IS NULL OR m.message_id > %(after)s)
+        UNION ALL
+        SELECT p.message_id, p.parent_message_id, p.role, p.model_id, p.content, p.truncated, b.depth + 1
+        FROM messages p
+        JOIN branch b ON p.message_id = b.parent_message_id
+        WHERE p.conversation_id = %(chat_id)s
+        AND p.message_id < b.message_id
+        AND (%(after)s::bigint IS NULL OR p.message_id > %(after)s)
+        AND (%(walk_limit)s::int IS NULL OR b.depth < %(walk_limit)s)
+    ),
+    page AS (
+        SELECT message_id, parent_message_id, role, model_id, content, truncated
+        FROM branch
+        ORDER BY message_id {direction}
+        LIMIT %(limit)s + 1
+    )
+    SELECT
+        conv.archived_at IS NOT NULL AS archived,
+        json_build_object(
+            'current_model_id', conv.current_model_id,
+            'conversation_id', conv.conversation_id,
+            'persona_id', conv.persona_id,
+            'created_at', conv.created_at,
+            'updated_at', conv.updated_at,
+            'messages', COALESCE(
+                (
+                    SELECT json_agg(
+                        json_build_object(
+                            'message_id', p.message_id,
+                            'parent_message_id', p.parent_message_id,
+                            'role', p.role,
+                            'model_id', p.model_id,
+                            'content', p.content,
+                            'truncated', p.truncated
+                        ) ORDER BY p.message_id
+                    )
+                    FROM (
+                        SELECT * FROM page ORDER BY message_id {direction} LIMIT %(limit)s
+                    ) p
+                ),
+                '[]'::json
+            ),
+            'has_more', (SELECT COUNT(*) FROM page) > %(limit)s
+        )::text AS chat
+    FROM conv;
+    """
+    params = {
+        "chat_id": chat_id,
+        "user_id": user_id,
+        "limit": limit,
+        "before": before,
+        "after": after,
+        # Forward pages walk up to `after`, backward pages only as far as one page
+        "walk_limit": None if direction == "ASC" else limit + 1,
+    }
+    with conn.cursor() as cursor:
+        execute_prepared(cursor, f"select_chat_page_by_id_{direction.lower()}", query, params)
+        row = cursor.fetchone()
+    if row and row[0] and _rehydrate_archived(conn, chat_id, user_id):
+        return select_chat_page_by_id(conn, chat_id, user_id, limit, before=before, after=after)
+    return row[1] if row else None
+
+
+def select_chat_header_by_id(conn: PGConnection, chat_id: UUID, user_id: UUID) -> Optional[str]:
+    """
+    Retrieve the conversation metadata (no messages) as one NDJSON line,
+    only if it belongs to the user. An archived conversation is rehydrated first,
+    so the messages streamed after the header are there.
+    """
+    query = """
+    SELECT
+        archived_at IS NOT NULL,
+        json_build_object(
+            'type', 'conversation',
+            'current_model_id', current_model_id,
+            'conversation_id', conversation_id,
+            'persona_id', persona_id,
+            'active_leaf_message_id', active_leaf_message_id,
+            'created_at', created_at,
+            'updated_at', updated_at
+        )::text
+    FROM conversations
+    WHERE conversation_id = %s AND user_id = %s;
+    """
+    with conn.cursor() as cursor:
+        execute_prepared(cursor, "select_chat_header_by_id", query, (chat_id, user_id))
+        row = cursor.fetchone()
+    if row and row[0] and _rehydrate_archived(conn, chat_id, user_id):
+        return select_chat_header_by_id(conn, chat_id, user_id)
+    return row[1] if row else None
+
+
+def stream_chat_messages(
+    conn: PGConnection, chat_id: UUID, user_id: UUID, batch_size: int = 500
+) -> Iterator[str]:
+    """
+    Yield every message of a chat, all branches, as one JSON text line each, oldest first.
+    Each carries its parent_message_id so clients can rebuild the tree; the header
+    line has the active leaf. Rows come from a server-side named cursor, fetched `batch_size` at a time,
+    so neither the server nor Postgres materialises the whole conversation.
+    """
+    query = """
+    SELECT
+        json_build_object(
+            'type', 'message',
+            'message_id', m.message_id,
+            'parent_message_id', m.parent_message_id,
             'role', m.role,
             'model_id', m.model_id,
-            'content', m.content
-          ) ORDER BY m.created_at, m.message_id
-        ) AS messages
-    FROM conversations c
-    JOIN messages m ON c.conversation_id = m.conversation_id
-    WHERE c.conversation_id = %s
-    GROUP BY c.current_model_id, c.conversation_id, c.created_at, c.updated_at;
+            'content', m.content,
+            'truncated', m.truncated,
+            'created_at', m.created_at
+        )::text
+    FROM messages m
+    JOIN conversations c ON c.conversation_id = m.conversation_id
+    WHERE m.conversation_id = %s AND c.user_id = %s
+    ORDER BY m.message_id;
     """
-    # Use RealDictCursor for JSON output
-    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-        cursor.execute(query, (chat_id,))
-        records = cursor.fetchone()
-        return records
+    with conn.cursor(name=f"chat_messages_{uuid4().hex}") as cursor:
+        cursor.itersize = batch_size
+        cursor.execute(query, (chat_id, user_id))
+        for (line,) in cursor:
+            yield line
+
+
+def select_first_user_message(conn: PGConnection, chat_id: UUID, user_id: UUID) -> Optional[str]:
+    """
+    Retrieve the content of the first user message of a chat, only if it belongs to the user.
+    """
+    query = """
+    SELECT m.content
+    FROM messages m
+    JOIN conversations c ON c.conversation_id = m.conversation_id
+    WHERE m.conversation_id = %s AND c.user_id = %s AND m.role = %s
+    ORDER BY m.message_id
+    LIMIT 1;
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(query, (chat_id, user_id, USER_ROLE))
+        row = cursor.fetchone()
+        return row[0] if row else None
 
 
 def select_user_chat_titles(
@@ -77,90 +414,256 @@ def select_user_chat_titles(
         return cursor.fetchall()
 
 
-def insert_chat(
+def insert_chat_with_messages(
     conn: PGConnection,
     user_id: UUID,
     current_model_id: UUID,
     title: str,
+    user_content: str,
+    assistant_content: str,
+    usage: Optional[Dict[str, int]] = None,
     workspace_id: UUID = None,
     folder_id: UUID = None,
-) -> dict:
+    persona_id: Optional[str] = None,
+    truncated: bool = False,
+) -> Optional[dict]:
     """
-    Create a new chat and return the inserted record.
+    Create a chat with its first user message and assistant reply in a single
+    statement (one round trip) and return the conversation with both messages.
+    truncated marks a reply cut short by a client disconnect.
+    Message ids are drawn first so the conversation row can point its active
+    leaf at the reply; foreign keys are checked at the end of the statement.
+    Returns None if the target workspace or folder does not belong to the user.
     """
     query = """
-    INSERT INTO conversations (user_id, current_model_id, title, workspace_id, folder_id)
-    VALUES (%s, %s, %s, %s, %s)
-    RETURNING conversation_id, current_model_id, title, workspace_id, folder_id;
+    WITH ids AS (
+        SELECT min(id) AS user_message_id, max(id) AS assistant_message_id
+        FROM (
+            SELECT nextval(pg_get_serial_sequence('messages', 'message_id')) AS id
+            FROM generate_series(1, 2)
+        ) allocated
+    ),
+    conv AS (
+        INSERT INTO conversations (
+            user_id, current_model_id, title, workspace_id, folder_id, persona_id, active_leaf_message_id
+        )
+        SELECT
+            %(user_id)s, %(current_model_id)s, %(title)s, %(workspace_id)s, %(folder_id)s,
+            %(persona_id)s, ids.assistant_message_id
+        FROM ids
+        WHERE (
+            %(workspace_id)s::uuid IS NULL
+            OR EXISTS (SELECT 1 FROM workspaces WHERE workspace_id = %(workspace_id)s AND user_id = %(user_id)s)
+        )
+        AND (
+            %(folder_id)s::uuid IS NULL
+            OR EXISTS (SELECT 1 FROM folders WHERE folder_id = %(folder_id)s AND user_id = %(user_id)s)
+        )
+        RETURNING conversation_id, current_model_id, title, workspace_id, folder_id, persona_id
+    ),
+    inserted AS (
+        INSERT INTO messages (
+            message_id, parent_message_id, conversation_id, role, model_id, content,
+            prompt_tokens, completion_tokens, cached_tokens, truncated, updated_at
+        )
+        SELECT ids.user_message_id, NULL::bigint, conv.conversation_id, %(user_role)s, NULL::uuid,
+            %(user_content)s, NULL::integer, NULL::integer, NULL::integer, false, %(updated_at)s
+        FROM conv, ids
+        UNION ALL
+        SELECT ids.assistant_message_id, ids.user_message_id, conv.conversation_id, %(assistant_role)s,
+            %(current_model_id)s, %(assistant_content)s,
+            %(prompt_tokens)s, %(completion_tokens)s, %(cached_tokens)s, %(truncated)s, %(updated_at)s
+        FROM conv, ids
+        RETURNING message_id, parent_message_id, conversation_id, role, model_id, content,
+            prompt_tokens, completion_tokens, cached_tokens, truncated
+    )
+    SELECT
+        conv.*,
+        (SELECT json_agg(row_to_json(inserted) ORDER BY message_id) FROM inserted) AS messages
+    FROM conv;
     """
-    with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
-        cursor.execute(query, (user_id, current_model_id, title, workspace_id, folder_id))
+    params = {
+        "user_id": user_id,
+        "current_model_id": current_model_id,
+        "title": title,
+        "workspace_id": workspace_id,
+        "folder_id": folder_id,
+        "persona_id": persona_id,
+        "user_content": user_content,
+        "assistant_content": assistant_content,
+        "user_role": USER_ROLE,
+        "assistant_role": ASSISTANT_ROLE,
+        "prompt_tokens": usage["prompt_tokens"] if usage else None,
+        "completion_tokens": usage["completion_tokens"] if usage else None,
+        "cached_tokens": usage["cached_tokens"] if usage else None,
+        "truncated": truncated,
+        "updated_at": datetime.now(),
+    }
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+        cursor.execute(query, params)
         chat = cursor.fetchone()
-        conn.commit()
-        return chat
+        return dict(chat) if chat else None
 
 
-def insert_chat_messages(conn: PGConnection, messages_data: list) -> list:
+def insert_chat_messages(
+    conn: PGConnection,
+    messages_data: list,
+    parent_message_id: Optional[int] = None,
+    keep_active_branch: bool = False,
+) -> list:
     """
-    Insert multiple messages into the messages table in a single query.
+    Insert multiple messages into the messages table as a chain: the first one is
+    a child of parent_message_id (a new root if None), each next one a child of the
+    previous. The last one becomes the conversation's active leaf; with
+    keep_active_branch only if the leaf is still parent_message_id, so the first
+    of several sibling replies becomes active and later ones stay alternatives.
+
     Each element in messages_data should be a tuple: (conversation_id, role, model_id, content)
+    or (conversation_id, role, model_id, content, usage[, truncated]) where usage is the
+    provider's token counts dict (prompt_tokens, completion_tokens, cached_tokens) for an
+    assistant reply and truncated marks a reply cut short by a client disconnect.
     Returns a list of inserted records.
     """
-    placeholders = ", ".join(["(%s, %s, %s, %s, %s)"] * len(messages_data))
+    # Ids are allocated first so every row can reference its parent in a single INSERT
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence('messages', 'message_id')) FROM generate_series(1, %s);",
+            (len(messages_data),),
+        )
+        message_ids = [row[0] for row in cursor.fetchall()]
+
+    placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(messages_data))
     updated_at = datetime.now()
     query = f"""
-    INSERT INTO messages (conversation_id, role, model_id, content, updated_at)
-    VALUES {placeholders}
-    RETURNING message_id, conversation_id, role, model_id, content;
+    WITH inserted AS (
+        INSERT INTO messages (
+            message_id, parent_message_id, conversation_id, role, model_id, content,
+            prompt_tokens, completion_tokens, cached_tokens, truncated, updated_at
+        )
+        VALUES {placeholders}
+        RETURNING message_id, parent_message_id, conversation_id, role, model_id, content,
+            prompt_tokens, completion_tokens, cached_tokens, truncated
+    ),
+    leaf AS (
+        UPDATE conversations
+        SET active_leaf_message_id = %s
+        WHERE conversation_id = %s
+        AND (NOT %s OR active_leaf_message_id = %s)
+    )
+    SELECT * FROM inserted ORDER BY message_id;
     """
    
-    # Add updated_at to each message's values
+    # Add the tree position, token counts and updated_at to each message's values
     flattened_values = []
-    for message in messages_data:
-        flattened_values.extend([*message, updated_at])  # Add updated_at to each message
+    parent_id = parent_message_id
+    for message_id, (conversation_id, role, model_id, content, *rest) in zip(message_ids, messages_data):
+        usage = rest[0] if rest else None
+        truncated = rest[1] if len(rest) > 1 else False
+        flattened_values.extend([
+            message_id,
+            parent_id,
+            conversation_id,
+            role,
+            model_id,
+            content,
+            usage["prompt_tokens"] if usage else None,
+            usage["completion_tokens"] if usage else None,
+            usage["cached_tokens"] if usage else None,
+            truncated,
+            updated_at,
+        ])
+        parent_id = message_id
+    flattened_values.extend([message_ids[-1], messages_data[-1][0], keep_active_branch, parent_message_id])
 
     with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
         cursor.execute(query, flattened_values)
         new_messages = cursor.fetchall()
-        conn.commit()
         return new_messages
 
 
-def update_chat_title_query(conn: PGConnection, chat_id: UUID, new_title: str) -> dict:
+def update_active_branch(conn: PGConnection, chat_id: UUID, user_id: UUID, message_id: int) -> Optional[int]:
+    """
+    Make the branch through message_id the active one. The new leaf is found by
+    following the newest child from message_id down, so switching to a sibling
+    resumes where that branch was left.
+
+    Returns:
+        The new active leaf id, or None if the message is not in the user's chat
+    """
+    query = """
+    WITH RECURSIVE down AS (
+        SELECT m.message_id, 1 AS depth
+        FROM messages m
+        JOIN conversations c ON c.conversation_id = m.conversation_id
+        WHERE m.message_id = %(message_id)s
+        AND m.conversation_id = %(chat_id)s
+        AND c.user_id = %(user_id)s
+        UNION ALL
+        SELECT child.message_id, d.depth + 1
+        FROM down d
+        JOIN LATERAL (
+            SELECT message_id FROM messages
+            WHERE conversation_id = %(chat_id)s AND parent_message_id = d.message_id
+            -- Children have larger ids; also stops on a corrupt parent chain
+            AND message_id > d.message_id
+            ORDER BY message_id DESC
+            LIMIT 1
+        ) child ON true
+    )
+    UPDATE conversations
+    SET active_leaf_message_id = (SELECT message_id FROM down ORDER BY depth DESC LIMIT 1)
+    WHERE conversation_id = %(chat_id)s
+    AND user_id = %(user_id)s
+    AND EXISTS (SELECT 1 FROM down)
+    RETURNING active_leaf_message_id;
+    """
+    params = {"chat_id": chat_id, "user_id": user_id, "message_id": message_id}
+    with conn.cursor() as cursor:
+        cursor.execute(query, params)
+        row = cursor.fetchone()
+    if row is None and _rehydrate_if_archived(conn, chat_id, user_id):
+        return update_active_branch(conn, chat_id, user_id, message_id)
+    return row[0] if row else None
+
+
+def update_chat_title_query(
+    conn: PGConnection, chat_id: UUID, user_id: UUID, new_title: str, expected_title: Optional[str] = None
+) -> dict:
     """
     Update the title of a chat conversation by its ID.
+    With expected_title, only while the title is still that one (e.g. the
+    placeholder), so a title the user set in the meantime is kept.
     Returns the updated record with conversation_id, model_id, userid, and new title.
     """
     query = """
     UPDATE conversations
     SET title = %s
-    WHERE conversation_id = %s
+    WHERE conversation_id = %s AND user_id = %s
+    AND (%s::text IS NULL OR title = %s)
     RETURNING conversation_id, title;
     """
     with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
-        cursor.execute(query, (new_title, chat_id))
+        cursor.execute(query, (new_title, chat_id, user_id, expected_title, expected_title))
         updated_record = cursor.fetchone()
-        conn.commit()
         return updated_record
 
 
-def delete_chat_query(conn: PGConnection, chat_id: UUID) -> None:
+def delete_chat_query(conn: PGConnection, chat_id: UUID, user_id: UUID) -> bool:
     """
-    Delete a chat conversation by its ID.
+    Delete a chat conversation by its ID, only if it belongs to the user.
     """
     query = """
     DELETE FROM conversations
-    WHERE conversation_id = %s
+    WHERE conversation_id = %s AND user_id = %s
     """
     with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
-        cursor.execute(query, (chat_id,))
-        conn.commit()
+        cursor.execute(query, (chat_id, user_id))
         # Check how many rows were affected
         return cursor.rowcount > 0
 
 
 def update_conversation_model(
-    conn: PGConnection, chat_id: UUID, model_id: UUID
+    conn: PGConnection, chat_id: UUID, user_id: UUID, model_id: UUID
 ) -> dict:
     """
     Update the current model for a chat conversation.
@@ -168,13 +671,12 @@ def update_conversation_model(
     query = """
     UPDATE conversations
     SET current_model_id = %s
-    WHERE conversation_id = %s
+    WHERE conversation_id = %s AND user_id = %s
     RETURNING conversation_id, current_model_id;
     """
     with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
-        cursor.execute(query, (model_id, chat_id))
+        cursor.execute(query, (model_id, chat_id, user_id))
         updated_record = cursor.fetchone()
-        conn.commit()
         return updated_record
 
 
@@ -186,51 +688,47 @@ def select_user_chat_titles_and_count_single_row(
       {
         "total_count": <int>,
         "conversations": [
-            { "conversation_id": <uuid>, "title": <str> },
+            { "conversation_id": <uuid>, "title": <str>, "message_count": <int>, "last_message_at": <ts> },
             ...
         ]
       }
+    The total comes from the user's global_chat_count counter rather than a COUNT(*).
     """
     query = """
-    WITH total AS (
-        SELECT COUNT(*)::int AS total_count
-        FROM conversations
-        WHERE user_id = %s AND workspace_id IS NULL AND folder_id IS NULL
-    ),
-    paged AS (
-        SELECT
-            conversation_id,
-            title
-        FROM conversations
-        WHERE user_id = %s AND workspace_id IS NULL AND folder_id IS NULL
-        ORDER BY updated_at DESC
-        LIMIT %s
-        OFFSET %s
-    )
     SELECT
-        total.total_count,
+        u.global_chat_count AS total_count,
         COALESCE(
-            JSON_AGG(
-                JSON_BUILD_OBJECT(
-                    'conversation_id', paged.conversation_id,
-                    'title', paged.title
+            (
+                SELECT JSON_AGG(
+                    JSON_BUILD_OBJECT(
+                        'conversation_id', paged.conversation_id,
+                        'title', paged.title,
+                        'message_count', paged.message_count,
+                        'last_message_at', paged.last_message_at
+                    ) ORDER BY paged.updated_at DESC
                 )
-            ), '[]'::json
+                FROM (
+                    SELECT conversation_id, title, message_count, last_message_at, updated_at
+                    FROM conversations
+                    WHERE user_id = u.id AND workspace_id IS NULL AND folder_id IS NULL
+                    ORDER BY updated_at DESC
+                    LIMIT %s
+                    OFFSET %s
+                ) paged
+            ),
+            '[]'::json
         ) AS conversations
-    FROM total
-    CROSS JOIN paged
-    GROUP BY total.total_count;
+    FROM users u
+    WHERE u.id = %s;
     """
 
     with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-        cursor.execute(query, (user_id, user_id, limit, offset))
-        row = (
-            cursor.fetchone()
-        )  # Could be None if user has zero conversations or offset out of range
+        execute_prepared(
+            cursor, "select_user_chat_titles_and_count", query, (limit, offset, user_id)
+        )
+        row = cursor.fetchone()
 
         if not row:
-            # If there are no rows, user might have zero conversations
-            # or the offset is out of range. We'll handle that gracefully.
             return {"total_count": 0, "conversations": []}
 
         return {
@@ -238,5 +736,3 @@ def select_user_chat_titles_and_count_single_row(
             # row["conversations"] is a JSON array => RealDictCursor returns it as a Python list
             "conversations": row["conversations"] or [],
         }
-
-
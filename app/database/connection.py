@@ -1,26 +1,82 @@
 import logging
 import os
+import threading
 import psycopg2
+import psycopg2.pool
 from dotenv import load_dotenv
 from psycopg2.extensions import connection as PGConnection
-from typing import Optional
+from typing import Any, Dict, Optional
+
+from app.constants import DB_POOL_MAX_CONNECTIONS, DB_POOL_MIN_CONNECTIONS
 
 logger = logging.getLogger(__name__)
 
+# One pool per server: None for the primary, the DSN for each replica
+_pools: Dict[Optional[str], psycopg2.pool.ThreadedConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(key: Optional[str], connect_kwargs: Dict[str, Any]) -> psycopg2.pool.ThreadedConnectionPool:
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = psycopg2.pool.ThreadedConnectionPool(
+                    DB_POOL_MIN_CONNECTIONS, DB_POOL_MAX_CONNECTIONS, **connect_kwargs
+                )
+                _pools[key] = pool
+    return pool
+
+
+def close_pools() -> None:
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.closeall()
+        _pools.clear()
+
+
 class PostgresConnection:
+    """
+    Unit of work: one connection and one transaction for everything run inside
+    the `with` block. A clean exit commits once, any exception (including an
+    HTTPException raised on purpose) rolls everything back. Query functions
+    never commit, so composing several of them in one block is atomic.
+
+    Keep provider calls and other slow work outside the block so no transaction
+    stays open while waiting on them.
+
+    Connections come from a per-process pool and go back to it on exit, so
+    sessions (and the statements prepared on them) outlive a single request.
+    When the pool is exhausted a dedicated connection is opened instead.
+    Pass pooled=False for one-off connections such as health checks, and
+    keepalive_seconds for long-lived ones whose peer may vanish silently.
+    """
+
     def __init__(
         self,
         user: Optional[str] = None,
         password: Optional[str] = None,
         host: Optional[str] = None,
         port: Optional[str] = None,
-        database: Optional[str] = None
+        database: Optional[str] = None,
+        dsn: Optional[str] = None,
+        connect_timeout: Optional[int] = None,
+        pooled: bool = True,
+        readonly: bool = False,
+        keepalive_seconds: Optional[int] = None,
     ) -> None:
         self._user = user or os.getenv("DB_USER")
         self._password = password or os.getenv("DB_PASSWORD")
         self._host = host or os.getenv("BRANCH_DB_HOST")
         self._port = port or os.getenv("DB_PORT")
         self._database = database or os.getenv("DB_NAME")
+        self._dsn = dsn
+        self._connect_timeout = connect_timeout
+        self._pooled = pooled
+        self._readonly = readonly
+        self._keepalive_seconds = keepalive_seconds
+        self._pool: Optional[psycopg2.pool.ThreadedConnectionPool] = None
         self._connection: Optional[PGConnection] = None
 
     def __enter__(self) -> PGConnection:
@@ -28,26 +84,85 @@ class PostgresConnection:
         return self._connection
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
-        self.close_connection()
+        try:
+            self.end_transaction(commit=exc_type is None)
+        finally:
+            self.close_connection()
+
+    @property
+    def connection(self) -> Optional[PGConnection]:
+        return self._connection
+
+    def _connect_kwargs(self) -> Dict[str, Any]:
+        if self._dsn:
+            # Replicas are configured as full DSNs
+            kwargs = {"dsn": self._dsn, "sslmode": "require", "connect_timeout": self._connect_timeout}
+        else:
+            kwargs = {
+                "user": self._user,
+                "password": self._password,
+                "host": self._host,
+                "port": self._port,
+                "database": self._database,
+                "sslmode": "require",
+                "connect_timeout": self._connect_timeout,
+            }
+        if self._keepalive_seconds:
+            # TCP keepalives make a dead server show up as a socket error
+            kwargs.update(
+                keepalives=1,
+                keepalives_idle=self._keepalive_seconds,
+                keepalives_interval=self._keepalive_seconds,
+                keepalives_count=3,
+            )
+        return kwargs
 
     def connect(self) -> None:
         if self._connection is None or self._connection.closed:
             try:
-                self._connection = psycopg2.connect(
-                    user=self._user,
-                    password=self._password,
-                    host=self._host,
-                    port=self._port,
-                    database=self._database,
-                    sslmode="require",
-                )
-                logger.info("Connection established successfully.")
+                self._pool = None
+                if self._pooled:
+                    pool = _get_pool(self._dsn, self._connect_kwargs())
+                    try:
+                        self._connection = pool.getconn()
+                        self._pool = pool
+                    except psycopg2.pool.PoolError:
+                        logger.warning("Connection pool exhausted, opening a dedicated connection")
+                if self._pool is None:
+                    self._connection = psycopg2.connect(**self._connect_kwargs())
+                    logger.info("Connection established successfully.")
+                if self._readonly:
+                    self._connection.readonly = True
             except psycopg2.Error as e:
                 logger.error(f"Error connecting to PostgreSQL: {e}")
                 raise
 
+    def end_transaction(self, commit: bool) -> None:
+        if self._connection is None or self._connection.closed:
+            return
+        if commit:
+            self._connection.commit()
+        else:
+            try:
+                self._connection.rollback()
+            except psycopg2.Error as e:
+                logger.error(f"Error while rolling back the transaction: {e}")
+
     def close_connection(self) -> None:
-        if self._connection and not self._connection.closed:
+        if self._connection is None:
+            return
+        if self._pool is not None:
+            broken = bool(self._connection.closed)
+            if not broken and self._readonly:
+                try:
+                    self._connection.readonly = False
+                except psycopg2.Error:
+                    broken = True
+            self._pool.putconn(self._connection, close=broken)
+            self._connection = None
+            self._pool = None
+            return
+        if not self._connection.closed:
             try:
                 self._connection.close()
                 logger.info("Connection closed successfully.")
@@ -0,0 +1,102 @@
+import json
+import logging
+from typing import Iterator
+from uuid import UUID, uuid4
+
+from psycopg2.extensions import connection as PGConnection
+
+from app.database.archive_queries import decompress_payload
+
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMAT_VERSION = 1
+
+
+def _stream_lines(conn: PGConnection, query: str, params: tuple, batch_size: int) -> Iterator[str]:
+    with conn.cursor(name=f"export_{uuid4().hex}") as cursor:
+        cursor.itersize = batch_size
+        cursor.execute(query, params)
+        for (line,) in cursor:
+            yield line
+
+
+def _archived_message_lines(conn: PGConnection, conversation_id: UUID) -> Iterator[str]:
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT codec, payload FROM conversation_archives WHERE conversation_id = %s;",
+            (conversation_id,),
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return
+    codec, payload = row
+    # One archived conversation is held in memory at a time
+    for message in json.loads(decompress_payload(codec, bytes(payload))):
+        yield json.dumps({"type": "message", **message}, default=str)
+
+
+def stream_user_export(conn: PGConnection, user_id: UUID, batch_size: int = 1000) -> Iterator[str]:
+    """
+    Yield everything a user owns as JSON text lines: a header, then workspaces,
+    folders, and each conversation followed by its messages (all branches,
+    oldest first). Every line has a "type" and the row's own columns. A final
+    {"type": "end", "count": N} line, N being the number of lines between it
+    and the header, tells a complete file from a truncated one.
+
+    Rows come from server-side named cursors, `batch_size` at a time, and
+    messages are read one conversation at a time along the
+    (conversation_id, message_id) index, so memory stays flat however large
+    the account is. Archived conversations are read from their archive
+    without being rehydrated. Run it in one REPEATABLE READ transaction for a
+    consistent snapshot.
+    """
+    yield json.dumps({"type": "export", "version": EXPORT_FORMAT_VERSION, "user_id": str(user_id)})
+    count = 0
+    for line in _export_records(conn, user_id, batch_size):
+        count += 1
+        yield line
+    yield json.dumps({"type": "end", "count": count})
+
+
+def _export_records(conn: PGConnection, user_id: UUID, batch_size: int) -> Iterator[str]:
+    workspaces_query = """
+    SELECT (jsonb_build_object('type', 'workspace') || (to_jsonb(w) - 'user_id'))::text
+    FROM workspaces w
+    WHERE w.user_id = %s
+    ORDER BY w.created_at, w.workspace_id;
+    """
+    yield from _stream_lines(conn, workspaces_query, (user_id,), batch_size)
+
+    folders_query = """
+    SELECT (jsonb_build_object('type', 'folder') || (to_jsonb(f) - 'user_id'))::text
+    FROM folders f
+    WHERE f.user_id = %s
+    ORDER BY f.created_at, f.folder_id;
+    """
+    yield from _stream_lines(conn, folders_query, (user_id,), batch_size)
+
+    conversations_query = """
+    SELECT
+        c.conversation_id,
+        c.archived_at IS NOT NULL,
+        (jsonb_build_object('type', 'conversation') || (to_jsonb(c) - 'user_id' - 'title_vector'))::text
+    FROM conversations c
+    WHERE c.user_id = %s
+    ORDER BY c.created_at, c.conversation_id;
+    """
+    messages_query = """
+    SELECT (jsonb_build_object('type', 'message') || (to_jsonb(m) - 'search_vector'))::text
+    FROM messages m
+    WHERE m.conversation_id = %s
+    ORDER BY m.message_id;
+    """
+    with conn.cursor(name=f"export_{uuid4().hex}") as conversations:
+        conversations.itersize = batch_size
+        conversations.execute(conversations_query, (user_id,))
+        for conversation_id, archived, line in conversations:
+            yield line
+            if archived:
+                yield from _archived_message_lines(conn, conversation_id)
+            else:
+                yield from _stream_lines(conn, messages_query, (conversation_id,), batch_size)
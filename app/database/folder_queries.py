@@ -1,9 +1,7 @@
-from fastapi import HTTPException, status
-import psycopg2
+import psycopg2.extras
 from psycopg2.extensions import connection as PGConnection
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Optional
 from uuid import UUID
-from app.schemas.folders import FolderInfo
 from app.schemas.movements import LocationType
 from app.schemas.workspaces import DeletionMode
 
@@ -26,27 +24,11 @@ def create_folder_query(
         workspace_id: UUID of workspace if location_type is WORKSPACE, None for GLOBAL
 
     Returns:
-        Dict containing the created folder's information
+        Dict containing the created folder's information, or None if the
+        workspace does not belong to the user
     """
 
-    # If creating in workspace, validate workspace exists and user has access
-    if location_type == LocationType.WORKSPACE and workspace_id:
-        workspace_access_query = """
-        SELECT EXISTS(
-            SELECT 1 
-            FROM workspaces 
-            WHERE workspace_id = %s AND user_id = %s
-        )
-        """
-        with conn.cursor() as cur:
-            cur.execute(workspace_access_query, (workspace_id, user_id))
-            if not cur.fetchone()[0]:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Workspace not found for the user",
-                )
-
-    # Create folder query
+    # Workspace ownership is checked inside the INSERT, so access costs no extra round trip
     query = """
     INSERT INTO folders (
         name,
@@ -55,12 +37,17 @@ def create_folder_query(
         created_at,
         updated_at
     )
-    VALUES (
-        %s,
-        %s,
-        %s,
+    SELECT
+        %(name)s,
+        %(user_id)s,
+        %(workspace_id)s,
         CURRENT_TIMESTAMP,
         CURRENT_TIMESTAMP
+    WHERE %(workspace_id)s::uuid IS NULL
+    OR EXISTS(
+        SELECT 1
+        FROM workspaces
+        WHERE workspace_id = %(workspace_id)s AND user_id = %(user_id)s
     )
     RETURNING 
         folder_id,
@@ -71,87 +58,88 @@ def create_folder_query(
         updated_at
     """
 
+    # Global folders never carry a workspace_id
+    if location_type != LocationType.WORKSPACE:
+        workspace_id = None
+
     with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
         cur.execute(
-            query, (name, user_id, workspace_id)  # Will be NULL for global folders
+            query, {"name": name, "user_id": user_id, "workspace_id": workspace_id}
         )
-        conn.commit()
         folder = cur.fetchone()
 
-        return dict(folder)
+        return dict(folder) if folder else None
 
 
 
 def delete_folder_query(
     conn: PGConnection,
     folder_id: UUID,
+    user_id: UUID,
     mode: DeletionMode
-) -> None:
+) -> bool:
     """
     Deletes a folder using the specified deletion mode.
+    Ownership is part of each statement, so a folder of another user is simply not found.
     
     Args:
         conn: Database connection
         folder_id: UUID of the folder to delete
         user_id: UUID of the user requesting deletion
         mode: DeletionMode.ARCHIVE (move contents to global) or DeletionMode.PERMANENT (delete all)
+
+    Returns:
+        bool: True if the folder was found and deleted
     """
     
-    VERIFY_FOLDER_ACCESS = """
-    SELECT EXISTS(
-        SELECT 1 
-        FROM folders 
-        WHERE folder_id = %s
+    ARCHIVE_AND_DELETE = """
+    WITH target AS (
+        SELECT folder_id
+        FROM folders
+        WHERE folder_id = %s AND user_id = %s
+        FOR UPDATE
+    ),
+    archived AS (
+        -- Move conversations to global space
+        UPDATE conversations 
+        SET folder_id = NULL,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE folder_id IN (SELECT folder_id FROM target)
     )
+    DELETE FROM folders 
+    WHERE folder_id IN (SELECT folder_id FROM target)
+    RETURNING folder_id
     """
     
-    ARCHIVE_CONVERSATIONS = """
-    UPDATE conversations 
-    SET folder_id = NULL,
-        updated_at = CURRENT_TIMESTAMP
-    WHERE folder_id = %s
-    """
-    
-    DELETE_CONVERSATIONS = """
-    DELETE FROM conversations 
-    WHERE folder_id = %s
-    """
-    
-    DELETE_FOLDER = """
+    DELETE_WITH_CONVERSATIONS = """
+    WITH target AS (
+        SELECT folder_id
+        FROM folders
+        WHERE folder_id = %s AND user_id = %s
+        FOR UPDATE
+    ),
+    deleted_conversations AS (
+        DELETE FROM conversations 
+        WHERE folder_id IN (SELECT folder_id FROM target)
+    )
     DELETE FROM folders 
-    WHERE folder_id = %s
+    WHERE folder_id IN (SELECT folder_id FROM target)
+    RETURNING folder_id
     """
     
-    # First verify folder exists and belongs to user
+    query = ARCHIVE_AND_DELETE if mode == DeletionMode.ARCHIVE else DELETE_WITH_CONVERSATIONS
+
     with conn.cursor() as cur:
-        cur.execute(VERIFY_FOLDER_ACCESS, (folder_id,))
-        if not cur.fetchone()[0]:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Folder not found"
-            )
-    
-    if mode == DeletionMode.ARCHIVE:
-        with conn.cursor() as cur:
-            # Move conversations to global space
-            cur.execute(ARCHIVE_CONVERSATIONS, (folder_id,))
-            # Delete the folder
-            cur.execute(DELETE_FOLDER, (folder_id,))
-            
-    else:  # PERMANENT deletion
-        with conn.cursor() as cur:
-            # Delete all conversations in the folder
-            cur.execute(DELETE_CONVERSATIONS, (folder_id,))
-            # Delete the folder
-            cur.execute(DELETE_FOLDER, (folder_id,))
-    
-    conn.commit()
+        cur.execute(query, (folder_id, user_id))
+        deleted = cur.fetchone() is not None
+
+    return deleted
     
     
 def get_user_global_folders_query(
     conn: PGConnection,
     user_id: UUID
-) -> List[Dict[str, Any]]:
+) -> str:
     """
     Retrieves all personal folders (not associated with any workspace) 
     belonging to a specific user, along with their conversations.
@@ -161,7 +149,7 @@ def get_user_global_folders_query(
         user_id: UUID of the user whose folders to retrieve
         
     Returns:
-        List of folder objects with their associated conversations
+        JSON array text of folder objects (FolderInfo shape) with their associated conversations
     """
     query = """
     WITH folder_conversations AS (
@@ -173,6 +161,8 @@ def get_user_global_folders_query(
                     jsonb_build_object(
                         'conversation_id', c.conversation_id,
                         'title', c.title,
+                        'message_count', c.message_count,
+                        'last_message_at', c.last_message_at,
                         'created_at', c.created_at,
                         'updated_at', c.updated_at
                     ) ORDER BY c.updated_at DESC
@@ -186,21 +176,25 @@ def get_user_global_folders_query(
         GROUP BY f.folder_id
     )
     SELECT 
-        f.folder_id,
-        f.name,
-        f.created_at,
-        f.updated_at,
-        f.user_id,
-        COALESCE(fc.conversations, '[]'::jsonb) as conversations
+        COALESCE(
+            jsonb_agg(
+                jsonb_build_object(
+                    'folder_id', f.folder_id,
+                    'name', f.name,
+                    'chat_count', f.chat_count,
+                    'created_at', f.created_at,
+                    'updated_at', f.updated_at,
+                    'conversations', COALESCE(fc.conversations, '[]'::jsonb)
+                ) ORDER BY f.created_at DESC
+            ),
+            '[]'::jsonb
+        )::text AS folders
     FROM folders f
     LEFT JOIN folder_conversations fc ON f.folder_id = fc.folder_id
     WHERE f.user_id = %s
-    AND f.workspace_id IS NULL
-    ORDER BY f.created_at DESC;
+    AND f.workspace_id IS NULL;
     """
 
-    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+    with conn.cursor() as cur:
         cur.execute(query, (user_id, user_id))
-        results = cur.fetchall()
-        
-        return [FolderInfo(**row) for row in results]
\ No newline at end of file
+        return cur.fetchone()[0]
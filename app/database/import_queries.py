@@ -0,0 +1,301 @@
+import logging
+from typing import Any, BinaryIO, Dict, List
+from uuid import UUID
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extensions import connection as PGConnection
+
+from app.constants import MAX_WORKSPACES_PER_USER
+from app.custom_exceptions import ImportRejected, WorkspaceLimitExceeded
+from app.database.partition_queries import select_copyable_message_columns
+
+
+logger = logging.getLogger(__name__)
+
+# Raw lines are loaded as CSV with delimiter and quote characters that valid
+# JSON cannot contain unescaped, so every line arrives untouched in one column
+COPY_LINES = r"COPY import_lines (line) FROM STDIN WITH (FORMAT csv, DELIMITER E'\x1f', QUOTE E'\x1e')"
+
+IMPORT_TYPES = ("export", "workspace", "folder", "conversation", "message", "end")
+
+
+def copy_import_lines(conn: PGConnection, stream: BinaryIO) -> int:
+    """
+    COPY an NDJSON stream into a temporary staging table, one jsonb value per
+    line numbered in file order, dropped at the end of the transaction.
+    Postgres parses the JSON; an invalid line fails the COPY.
+
+    Returns:
+        Number of lines loaded
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+        CREATE TEMP TABLE import_lines (
+            position bigint GENERATED ALWAYS AS IDENTITY,
+            line jsonb
+        ) ON COMMIT DROP;
+        """)
+        cursor.copy_expert(COPY_LINES, stream)
+        return cursor.rowcount
+
+
+def stage_import(conn: PGConnection) -> None:
+    """
+    Split the staged lines by type and draw a new id for every row, keyed by
+    its id in the file. Ids repeated in the file violate the staging keys.
+
+    New message ids are handed out in the order of the old ones, whatever the
+    line order, so parents keep smaller ids than their children and
+    ORDER BY message_id keeps its meaning.
+    """
+    statements = [
+        """
+        CREATE TEMP TABLE import_workspaces ON COMMIT DROP AS
+        SELECT (line->>'workspace_id')::uuid AS old_id, gen_random_uuid() AS new_id, line AS data
+        FROM import_lines WHERE line->>'type' = 'workspace';
+        """,
+        """
+        CREATE TEMP TABLE import_folders ON COMMIT DROP AS
+        SELECT (line->>'folder_id')::uuid AS old_id, gen_random_uuid() AS new_id, line AS data
+        FROM import_lines WHERE line->>'type' = 'folder';
+        """,
+        """
+        CREATE TEMP TABLE import_conversations ON COMMIT DROP AS
+        SELECT (line->>'conversation_id')::uuid AS old_id, gen_random_uuid() AS new_id, line AS data
+        FROM import_lines WHERE line->>'type' = 'conversation';
+        """,
+        """
+        CREATE TEMP TABLE import_messages ON COMMIT DROP AS
+        WITH staged AS (
+            SELECT
+                (line->>'message_id')::bigint AS old_id,
+                (line->>'conversation_id')::uuid AS old_conversation_id,
+                line AS data,
+                row_number() OVER (ORDER BY (line->>'message_id')::bigint) AS position
+            FROM import_lines WHERE line->>'type' = 'message'
+        ),
+        -- nextval runs in scan order, so pair the drawn ids with the rows by rank
+        allocated AS (
+            SELECT id, row_number() OVER (ORDER BY id) AS position
+            FROM (SELECT nextval(pg_get_serial_sequence('messages', 'message_id')) AS id FROM staged) ids
+        )
+        SELECT s.old_id, a.id AS new_id, s.old_conversation_id, s.data
+        FROM staged s
+        JOIN allocated a USING (position);
+        """,
+        "ALTER TABLE import_workspaces ADD PRIMARY KEY (old_id);",
+        "ALTER TABLE import_folders ADD PRIMARY KEY (old_id);",
+        "ALTER TABLE import_conversations ADD PRIMARY KEY (old_id);",
+        "ALTER TABLE import_messages ADD PRIMARY KEY (old_id);",
+        "ANALYZE import_workspaces, import_folders, import_conversations, import_messages;",
+    ]
+    with conn.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def select_import_problems(conn: PGConnection) -> List[str]:
+    """
+    Check that the staged rows only reference each other (or existing models),
+    so nothing can be attached to another user's data. Returns one message per
+    failed check, empty if the import can go ahead.
+    """
+    checks = {
+        "unknown line type": """
+            SELECT line->>'type' FROM import_lines
+            WHERE line IS NOT NULL
+            AND (line->>'type' IS NULL OR line->>'type' <> ALL(%(types)s))
+        """,
+        # A file cut short (interrupted download, partial upload) has no trailer or a wrong count
+        "file does not end with an end record counting its lines": """
+            WITH records AS (
+                SELECT count(*) FILTER (WHERE line->>'type' NOT IN ('export', 'end')) AS lines,
+                       count(*) FILTER (WHERE line->>'type' = 'end') AS ends
+                FROM import_lines WHERE line IS NOT NULL
+            ),
+            last AS (
+                SELECT line FROM import_lines WHERE line IS NOT NULL ORDER BY position DESC LIMIT 1
+            )
+            SELECT COALESCE((SELECT line->>'count' FROM last WHERE line->>'type' = 'end'), 'missing')
+            FROM records
+            WHERE records.ends <> 1
+            OR NOT EXISTS (
+                SELECT 1 FROM last WHERE line->>'type' = 'end' AND line->>'count' = records.lines::text
+            )
+        """,
+        "folder references a workspace not in the import": """
+            SELECT data->>'folder_id' FROM import_folders
+            WHERE data->>'workspace_id' IS NOT NULL
+            AND (data->>'workspace_id')::uuid NOT IN (SELECT old_id FROM import_workspaces)
+        """,
+        "conversation references a workspace or folder not in the import": """
+            SELECT data->>'conversation_id' FROM import_conversations
+            WHERE (data->>'workspace_id' IS NOT NULL
+                   AND (data->>'workspace_id')::uuid NOT IN (SELECT old_id FROM import_workspaces))
+            OR (data->>'folder_id' IS NOT NULL
+                AND (data->>'folder_id')::uuid NOT IN (SELECT old_id FROM import_folders))
+        """,
+        "message references a conversation not in the import": """
+            SELECT data->>'message_id' FROM import_messages
+            WHERE old_conversation_id IS NULL
+            OR old_conversation_id NOT IN (SELECT old_id FROM import_conversations)
+        """,
+        "message parent is not a message of the same conversation": """
+            SELECT m.data->>'message_id' FROM import_messages m
+            LEFT JOIN import_messages p ON p.old_id = (m.data->>'parent_message_id')::bigint
+            WHERE m.data->>'parent_message_id' IS NOT NULL
+            AND p.old_conversation_id IS DISTINCT FROM m.old_conversation_id
+        """,
+        # Parents come before their children, as they do for ids the app assigns.
+        # This rules out self-parents and cycles, which the branch walks rely on.
+        "message parent does not have a smaller message_id": """
+            SELECT data->>'message_id' FROM import_messages
+            WHERE (data->>'parent_message_id')::bigint >= old_id
+        """,
+        "conversation active leaf is not one of its messages": """
+            SELECT c.data->>'conversation_id' FROM import_conversations c
+            LEFT JOIN import_messages m ON m.old_id = (c.data->>'active_leaf_message_id')::bigint
+            WHERE c.data->>'active_leaf_message_id' IS NOT NULL
+            AND m.old_conversation_id IS DISTINCT FROM c.old_id
+        """,
+        "unknown model": """
+            SELECT model_id FROM (
+                SELECT data->>'current_model_id' AS model_id FROM import_conversations
+                UNION
+                SELECT data->>'model_id' FROM import_messages
+            ) used
+            WHERE model_id IS NOT NULL
+            AND model_id::uuid NOT IN (SELECT model_id FROM models)
+        """,
+    }
+    problems = []
+    with conn.cursor() as cursor:
+        for problem, query in checks.items():
+            cursor.execute(f"{query} LIMIT 1;", {"types": list(IMPORT_TYPES)})
+            row = cursor.fetchone()
+            if row:
+                problems.append(f"{problem} ({row[0]})")
+    return problems
+
+
+def _insert_staged(
+    conn: PGConnection, table: str, staging: str, overrides: sql.Composable, params: Dict[str, Any]
+) -> int:
+    """
+    Insert staged rows into `table`: every column is taken from the line's JSON
+    by name, except `overrides` (a jsonb object merged over it) for new ids,
+    ownership and counters.
+    """
+    columns = select_copyable_message_columns(conn, table)
+    query = sql.SQL("""
+    INSERT INTO {table} ({columns})
+    SELECT {values}
+    FROM {staging} i,
+    jsonb_populate_record(
+        NULL::{table},
+        i.data || jsonb_build_object(
+            'created_at', COALESCE(i.data->'created_at', to_jsonb(now())),
+            'updated_at', COALESCE(i.data->'updated_at', to_jsonb(now()))
+        ) || {overrides}
+    ) r;
+    """).format(
+        table=sql.Identifier(table),
+        columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+        values=sql.SQL(", ").join(sql.SQL("r.{}").format(sql.Identifier(column)) for column in columns),
+        staging=sql.Identifier(staging),
+        overrides=overrides,
+    )
+    with conn.cursor() as cursor:
+        cursor.execute(query, params)
+        return cursor.rowcount
+
+
+def insert_imported_rows(conn: PGConnection, user_id: UUID) -> Dict[str, int]:
+    """
+    Insert the staged workspaces, folders, conversations and messages for the
+    user with set-based INSERTs, each row under its new id and references
+    remapped through the staging tables. Counters start at zero and are
+    filled by the counter triggers as the rows go in.
+
+    Raises:
+        WorkspaceLimitExceeded: the import would take the user past the workspace limit
+    """
+    params = {"user_id": str(user_id)}
+    workspaces = _insert_staged(conn, "workspaces", "import_workspaces", sql.SQL("""
+        jsonb_build_object('workspace_id', i.new_id, 'user_id', %(user_id)s, 'chat_count', 0)
+    """), params)
+    folders = _insert_staged(conn, "folders", "import_folders", sql.SQL("""
+        jsonb_build_object(
+            'folder_id', i.new_id,
+            'user_id', %(user_id)s,
+            'workspace_id', (SELECT w.new_id FROM import_workspaces w WHERE w.old_id = (i.data->>'workspace_id')::uuid),
+            'chat_count', 0
+        )
+    """), params)
+    # The active leaf is set once the messages exist
+    conversations = _insert_staged(conn, "conversations", "import_conversations", sql.SQL("""
+        jsonb_build_object(
+            'conversation_id', i.new_id,
+            'user_id', %(user_id)s,
+            'workspace_id', (SELECT w.new_id FROM import_workspaces w WHERE w.old_id = (i.data->>'workspace_id')::uuid),
+            'folder_id', (SELECT f.new_id FROM import_folders f WHERE f.old_id = (i.data->>'folder_id')::uuid),
+            'active_leaf_message_id', NULL,
+            'message_count', 0,
+            'last_message_at', NULL,
+            'archived_at', NULL
+        )
+    """), params)
+    # Parents are in the same statement; foreign keys are checked at its end
+    messages = _insert_staged(conn, "messages", "import_messages", sql.SQL("""
+        jsonb_build_object(
+            'message_id', i.new_id,
+            'conversation_id', (SELECT c.new_id FROM import_conversations c WHERE c.old_id = i.old_conversation_id),
+            'parent_message_id', (
+                SELECT p.new_id FROM import_messages p WHERE p.old_id = (i.data->>'parent_message_id')::bigint
+            )
+        )
+    """), params)
+
+    with conn.cursor() as cursor:
+        cursor.execute("""
+        UPDATE conversations c
+        SET active_leaf_message_id = m.new_id
+        FROM import_conversations ic
+        JOIN import_messages m ON m.old_id = (ic.data->>'active_leaf_message_id')::bigint
+        WHERE c.conversation_id = ic.new_id;
+        """)
+        cursor.execute("SELECT workspace_count FROM users WHERE id = %s;", (str(user_id),))
+        row = cursor.fetchone()
+    if row and row[0] > MAX_WORKSPACES_PER_USER:
+        raise WorkspaceLimitExceeded()
+
+    return {
+        "workspaces": workspaces,
+        "folders": folders,
+        "conversations": conversations,
+        "messages": messages,
+    }
+
+
+def import_ndjson(conn: PGConnection, user_id: UUID, stream: BinaryIO) -> Dict[str, int]:
+    """
+    Load an export file (see stream_user_export) into the user's account in the
+    caller's transaction, under new ids.
+
+    Raises:
+        ImportRejected: the file is not valid or references rows outside it
+        WorkspaceLimitExceeded: too many workspaces for the user
+    """
+    try:
+        lines = copy_import_lines(conn, stream)
+        stage_import(conn)
+        problems = select_import_problems(conn)
+        if problems:
+            raise ImportRejected("; ".join(problems))
+        counts = insert_imported_rows(conn, user_id)
+    except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+        # Malformed JSON, ids that do not parse, ids repeated in the file
+        raise ImportRejected(str(e).strip().splitlines()[0]) from e
+    logger.info(f"Imported {lines} lines for user {user_id}: {counts}")
+    return counts
@@ -0,0 +1,14 @@
+from psycopg2.extensions import connection as PGConnection
+
+
+# Channel the triggers of migrations/012_cache_invalidation.sql publish on
+INVALIDATION_CHANNEL = "cache_invalidation"
+
+
+def listen_for_invalidations(conn: PGConnection) -> None:
+    """
+    Subscribe an autocommit connection to cache invalidation events.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(f"LISTEN {INVALIDATION_CHANNEL};")
+
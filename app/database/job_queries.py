@@ -0,0 +1,237 @@
+from typing import Any, Dict, Optional
+from uuid import UUID
+from psycopg2.extensions import connection as PGConnection
+import psycopg2.extras
+
+
+def enqueue_job(
+    conn: PGConnection,
+    kind: str,
+    payload: Dict[str, Any],
+    user_id: Optional[UUID] = None,
+    priority: int = 0,
+    max_attempts: int = 3,
+    delay_seconds: int = 0,
+) -> Dict[str, Any]:
+    """
+    Add a job to the queue and return its id and status.
+    With delay_seconds the job is not claimed before that many seconds have passed.
+    """
+    query = """
+    INSERT INTO jobs (user_id, kind, payload, priority, max_attempts, run_after)
+    VALUES (%s, %s, %s, %s, %s, now() + make_interval(secs => %s))
+    RETURNING job_id, kind, status, created_at;
+    """
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+        cursor.execute(
+            query, (user_id, kind, psycopg2.extras.Json(payload), priority, max_attempts, delay_seconds)
+        )
+        job = cursor.fetchone()
+        return dict(job)
+
+
+def ensure_job_scheduled(
+    conn: PGConnection,
+    kind: str,
+    payload: Dict[str, Any],
+    priority: int = 0,
+    max_attempts: int = 3,
+    delay_seconds: int = 0,
+    exclude_job_id: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Enqueue a job of this kind unless one is already queued or running,
+    for recurring system jobs that reschedule themselves. A running job
+    scheduling its successor passes its own id as exclude_job_id.
+
+    Returns:
+        The new job, or None if one was already scheduled
+    """
+    query = """
+    INSERT INTO jobs (kind, payload, priority, max_attempts, run_after)
+    SELECT %(kind)s, %(payload)s, %(priority)s, %(max_attempts)s, now() + make_interval(secs => %(delay_seconds)s)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM jobs
+        WHERE kind = %(kind)s AND status IN ('queued', 'running')
+        AND job_id IS DISTINCT FROM %(exclude_job_id)s
+    )
+    RETURNING job_id, kind, status, created_at;
+    """
+    params = {
+        "kind": kind,
+        "payload": psycopg2.extras.Json(payload),
+        "priority": priority,
+        "max_attempts": max_attempts,
+        "delay_seconds": delay_seconds,
+        "exclude_job_id": exclude_job_id,
+    }
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+        # Serialise workers starting at the same time
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (kind,))
+        cursor.execute(query, params)
+        job = cursor.fetchone()
+        return dict(job) if job else None
+
+
+def claim_job(conn: PGConnection, worker_id: str, visibility_timeout: int) -> Optional[Dict[str, Any]]:
+    """
+    Claim the most urgent runnable job, skipping rows other workers hold.
+    A running job whose visibility timeout expired (its worker died or stalled)
+    is runnable again and taken first, as it is already overdue. Claiming
+    counts as an attempt.
+
+    Each kind of candidate is looked up through its own partial index
+    (jobs_running_locked_until_idx, jobs_queued_idx), so a poll reads a few
+    index entries however many finished jobs the table holds.
+
+    Returns:
+        The claimed job, or None if the queue is empty
+    """
+    query = """
+    WITH expired AS (
+        SELECT job_id
+        FROM jobs
+        WHERE status = 'running' AND locked_until < now()
+        ORDER BY locked_until
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    ),
+    queued AS (
+        SELECT job_id
+        FROM jobs
+        WHERE status = 'queued' AND run_after <= now()
+        AND NOT EXISTS (SELECT 1 FROM expired)
+        ORDER BY priority DESC, run_after, job_id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    ),
+    next_job AS (
+        SELECT job_id FROM expired
+        UNION ALL
+        SELECT job_id FROM queued
+    )
+    UPDATE jobs j
+    SET status = 'running',
+        attempts = j.attempts + 1,
+        locked_by = %s,
+        locked_until = now() + make_interval(secs => %s),
+        updated_at = now()
+    FROM next_job
+    WHERE j.job_id = next_job.job_id
+    RETURNING j.job_id, j.user_id, j.kind, j.payload, j.attempts, j.max_attempts;
+    """
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+        cursor.execute(query, (worker_id, visibility_timeout))
+        job = cursor.fetchone()
+        return dict(job) if job else None
+
+
+def extend_job_lock(conn: PGConnection, job_id: int, worker_id: str, visibility_timeout: int) -> bool:
+    """
+    Heartbeat for a long running job: push its visibility timeout forward.
+    Returns False if the job is no longer held by this worker.
+    """
+    query = """
+    UPDATE jobs
+    SET locked_until = now() + make_interval(secs => %s),
+        updated_at = now()
+    WHERE job_id = %s AND locked_by = %s AND status = 'running';
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(query, (visibility_timeout, job_id, worker_id))
+        return cursor.rowcount > 0
+
+
+def complete_job(conn: PGConnection, job_id: int, worker_id: str, result: Any) -> bool:
+    """
+    Mark a job as succeeded with its result, only if this worker still holds it.
+    """
+    query = """
+    UPDATE jobs
+    SET status = 'succeeded',
+        result = %s,
+        last_error = NULL,
+        locked_by = NULL,
+        locked_until = NULL,
+        finished_at = now(),
+        updated_at = now()
+    WHERE job_id = %s AND locked_by = %s AND status = 'running';
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(query, (psycopg2.extras.Json(result), job_id, worker_id))
+        return cursor.rowcount > 0
+
+
+def fail_job(
+    conn: PGConnection, job_id: int, worker_id: str, error: str, retry_delay: int
+) -> Optional[str]:
+    """
+    Record a failed attempt. The job goes back to the queue after retry_delay
+    seconds while it has attempts left, otherwise it is marked as failed.
+
+    Returns:
+        The job's new status, or None if this worker no longer holds it
+    """
+    query = """
+    UPDATE jobs
+    SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+        run_after = now() + make_interval(secs => %s),
+        last_error = %s,
+        locked_by = NULL,
+        locked_until = NULL,
+        finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE now() END,
+        updated_at = now()
+    WHERE job_id = %s AND locked_by = %s AND status = 'running'
+    RETURNING status;
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(query, (retry_delay, error, job_id, worker_id))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+
+def select_job_for_user(conn: PGConnection, job_id: int, user_id: UUID) -> Optional[Dict[str, Any]]:
+    """
+    Retrieve a job's status and result, only if it belongs to the user.
+    """
+    query = """
+    SELECT
+        job_id,
+        kind,
+        status,
+        priority,
+        attempts,
+        max_attempts,
+        last_error,
+        result,
+        created_at,
+        updated_at,
+        finished_at
+    FROM jobs
+    WHERE job_id = %s AND user_id = %s;
+    """
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+        cursor.execute(query, (job_id, user_id))
+        job = cursor.fetchone()
+        return dict(job) if job else None
+
+
+def delete_finished_jobs(conn: PGConnection, retention_days: int, limit: int) -> int:
+    """
+    Delete up to `limit` succeeded or failed jobs that finished more than
+    retention_days ago, oldest first. Returns the number deleted.
+    """
+    query = """
+    DELETE FROM jobs
+    WHERE job_id IN (
+        SELECT job_id
+        FROM jobs
+        WHERE status IN ('succeeded', 'failed')
+        AND finished_at < now() - make_interval(days => %s)
+        ORDER BY finished_at
+        LIMIT %s
+    );
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(query, (retention_days, limit))
+        return cursor.rowcount
@@ -7,103 +7,103 @@ from app.custom_exceptions import MovementError
 from app.schemas.movements import ItemType, Location, LocationType
 
 
-def get_current_location(conn: PGConnection, item_type: ItemType, item_id: UUID) -> Location:
+def location_from_row(item_type: ItemType, row: dict) -> Location:
     """
-    Determines the current location of an item.
+    Determines the location of an item from its workspace_id / folder_id columns.
     For chats: Can be in workspace, folder, or global
     For folders: Can only be in workspace or global
     """
-    if item_type == ItemType.CHAT:
-        query = """
-        SELECT workspace_id, folder_id
-        FROM conversations
-        WHERE conversation_id = %s;
-        """
-    else:  # FOLDER
-        query = """
-        SELECT workspace_id
-        FROM folders
-        WHERE folder_id = %s;
-        """
-        
-    with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
-        cursor.execute(query, (item_id,))
-        result = cursor.fetchone()
-        
-        if not result:
-            raise MovementError(f"{item_type} with id {item_id} not found")
-            
-        if item_type == ItemType.CHAT:
-            if result['workspace_id']:
-                return Location(type=LocationType.WORKSPACE, id=result['workspace_id'])
-            elif result['folder_id']:
-                return Location(type=LocationType.FOLDER, id=result['folder_id'])
-            else:
-                return Location(type=LocationType.GLOBAL)
-        else:  # FOLDER
-            if result['workspace_id']:
-                return Location(type=LocationType.WORKSPACE, id=result['workspace_id'])
-            else:
-                return Location(type=LocationType.GLOBAL)
+    if row['workspace_id']:
+        return Location(type=LocationType.WORKSPACE, id=row['workspace_id'])
+    if item_type == ItemType.CHAT and row['folder_id']:
+        return Location(type=LocationType.FOLDER, id=row['folder_id'])
+    return Location(type=LocationType.GLOBAL)
 
 
 def move_item(
-    conn: PGConnection, 
+    conn: PGConnection,
     item_type: ItemType,
     item_id: UUID,
+    user_id: UUID,
     destination: Location
 ) -> Tuple[Location, Location]:
     """
     Moves an item to a new location.
     For chats: Can move to workspace, folder, or global
     For folders: Can only move to workspace or global
-    
+
+    The item and the destination must belong to the user. Both checks and the
+    previous location lookup are part of the UPDATE, so a move is one round trip.
+
     Returns:
         Tuple[Location, Location]: (new_location, previous_location)
     """
-    # Get current location first
-    previous_location = get_current_location(conn, item_type, item_id)
-    
     # Validate movement for folders
     if item_type == ItemType.FOLDER and destination.type == LocationType.FOLDER:
         raise MovementError("Folders cannot be nested inside other folders")
-    
+
     # Prepare update values based on destination
     update_values = {
         'item_id': item_id,
-        'workspace_id': None
+        'user_id': user_id,
+        'workspace_id': None,
+        'folder_id': None,
     }
-    
+
     if destination.type == LocationType.WORKSPACE:
         update_values['workspace_id'] = destination.id
-    
+
     # Choose appropriate update query
     if item_type == ItemType.CHAT:
         update_values['folder_id'] = destination.id if destination.type == LocationType.FOLDER else None
-        
+
         update_query = """
-        UPDATE conversations
-        SET 
+        UPDATE conversations c
+        SET
             workspace_id = %(workspace_id)s,
             folder_id = %(folder_id)s,
             updated_at = CURRENT_TIMESTAMP
-        WHERE conversation_id = %(item_id)s
-        RETURNING conversation_id;
+        FROM (
+            SELECT conversation_id, workspace_id, folder_id
+            FROM conversations
+            WHERE conversation_id = %(item_id)s AND user_id = %(user_id)s
+            FOR UPDATE
+        ) prev
+        WHERE c.conversation_id = prev.conversation_id
+        AND (
+            %(workspace_id)s::uuid IS NULL
+            OR EXISTS (SELECT 1 FROM workspaces WHERE workspace_id = %(workspace_id)s AND user_id = %(user_id)s)
+        )
+        AND (
+            %(folder_id)s::uuid IS NULL
+            OR EXISTS (SELECT 1 FROM folders WHERE folder_id = %(folder_id)s AND user_id = %(user_id)s)
+        )
+        RETURNING prev.workspace_id, prev.folder_id;
         """
     else:  # FOLDER
         update_query = """
-        UPDATE folders
-        SET 
+        UPDATE folders f
+        SET
             workspace_id = %(workspace_id)s,
             updated_at = CURRENT_TIMESTAMP
-        WHERE folder_id = %(item_id)s
-        RETURNING folder_id;
+        FROM (
+            SELECT folder_id, workspace_id
+            FROM folders
+            WHERE folder_id = %(item_id)s AND user_id = %(user_id)s
+            FOR UPDATE
+        ) prev
+        WHERE f.folder_id = prev.folder_id
+        AND (
+            %(workspace_id)s::uuid IS NULL
+            OR EXISTS (SELECT 1 FROM workspaces WHERE workspace_id = %(workspace_id)s AND user_id = %(user_id)s)
+        )
+        RETURNING prev.workspace_id, NULL::uuid AS folder_id;
         """
-    
+
     with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
         cursor.execute(update_query, update_values)
-        if not cursor.fetchone():
-            raise MovementError(f"Failed to update {item_type}")
-        conn.commit()
-    
-    return destination, previous_location
+        previous = cursor.fetchone()
+        if not previous:
+            raise MovementError(f"{item_type} with id {item_id} or its destination not found")
+
+    return destination, location_from_row(item_type, previous)
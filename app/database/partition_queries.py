@@ -0,0 +1,343 @@
+import json
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from psycopg2 import sql
+from psycopg2.extensions import connection as PGConnection
+
+
+# Layout built next to `messages` while it is copied, then swapped in by name.
+PARTITIONED_TABLE = "messages_partitioned"
+RETIRED_TABLE = "messages_unpartitioned"
+MIRROR_TRIGGER = "messages_mirror_to_partitioned"
+PARTITION_PREFIX = "messages_hash_"
+
+
+def select_copyable_message_columns(conn: PGConnection, table: str = "messages") -> List[str]:
+    """
+    Columns of the table in order, without generated ones (recomputed on insert).
+    """
+    query = """
+    SELECT column_name
+    FROM information_schema.columns
+    WHERE table_schema = current_schema() AND table_name = %s AND is_generated = 'NEVER'
+    ORDER BY ordinal_position;
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(query, (table,))
+        return [row[0] for row in cursor.fetchall()]
+
+
+def is_partitioned(conn: PGConnection, table: str = "messages") -> bool:
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s));",
+            (table,),
+        )
+        return cursor.fetchone()[0]
+
+
+def create_partitioned_messages(conn: PGConnection, partitions: int) -> None:
+    """
+    Create the hash partitioned copy of `messages` and a trigger on `messages`
+    that mirrors every insert, update and delete into it, so the copy stays
+    current while the backfill runs.
+
+    The primary key becomes (conversation_id, message_id), since a partitioned
+    table's keys must include the partition key. message_id keeps drawing from
+    the existing sequence through the copied column default.
+    """
+    columns = select_copyable_message_columns(conn)
+    column_list = sql.SQL(", ").join(map(sql.Identifier, columns))
+    new_values = sql.SQL(", ").join(sql.SQL("NEW.{}").format(sql.Identifier(c)) for c in columns)
+
+    statements = [
+        sql.SQL(
+            "CREATE TABLE {table} (LIKE messages INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING STORAGE)"
+            " PARTITION BY HASH (conversation_id)"
+        ).format(table=sql.Identifier(PARTITIONED_TABLE)),
+    ]
+    statements.extend(
+        sql.SQL(
+            "CREATE TABLE {partition} PARTITION OF {table} FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})"
+        ).format(
+            partition=sql.Identifier(f"{PARTITION_PREFIX}{remainder:02d}"),
+            table=sql.Identifier(PARTITIONED_TABLE),
+            modulus=sql.Literal(partitions),
+            remainder=sql.Literal(remainder),
+        )
+        for remainder in range(partitions)
+    )
+    statements.extend([
+        sql.SQL("ALTER TABLE {table} ADD PRIMARY KEY (conversation_id, message_id)").format(
+            table=sql.Identifier(PARTITIONED_TABLE)
+        ),
+        sql.SQL(
+            "ALTER TABLE {table} ADD FOREIGN KEY (conversation_id)"
+            " REFERENCES conversations (conversation_id) ON DELETE CASCADE"
+        ).format(table=sql.Identifier(PARTITIONED_TABLE)),
+        # Sibling lookups and walking down a branch
+        sql.SQL("CREATE INDEX ON {table} (conversation_id, parent_message_id)").format(
+            table=sql.Identifier(PARTITIONED_TABLE)
+        ),
+        sql.SQL("CREATE INDEX ON {table} USING GIN (search_vector)").format(
+            table=sql.Identifier(PARTITIONED_TABLE)
+        ),
+        sql.SQL("""
+        CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO {table} ({columns}) VALUES ({new_values})
+                ON CONFLICT (conversation_id, message_id) DO NOTHING;
+            ELSIF TG_OP = 'UPDATE' THEN
+                UPDATE {table} SET ({columns}) = ROW({new_values})
+                WHERE conversation_id = OLD.conversation_id AND message_id = OLD.message_id;
+            ELSE
+                DELETE FROM {table}
+                WHERE conversation_id = OLD.conversation_id AND message_id = OLD.message_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """).format(
+            function=sql.Identifier(MIRROR_TRIGGER),
+            table=sql.Identifier(PARTITIONED_TABLE),
+            columns=column_list,
+            new_values=new_values,
+        ),
+        sql.SQL(
+            "CREATE TRIGGER {trigger} AFTER INSERT OR UPDATE OR DELETE ON messages"
+            " FOR EACH ROW EXECUTE FUNCTION {function}()"
+        ).format(trigger=sql.Identifier(MIRROR_TRIGGER), function=sql.Identifier(MIRROR_TRIGGER)),
+    ])
+
+    with conn.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def copy_messages_batch(conn: PGConnection, after_message_id: int, batch_size: int) -> Optional[int]:
+    """
+    Copy the next `batch_size` messages after `after_message_id` into the
+    partitioned table. Source rows are share-locked so an update racing the
+    copy waits for it and is then mirrored onto the copied row.
+
+    Returns:
+        The last message_id copied, or None when there is nothing left
+    """
+    columns = sql.SQL(", ").join(map(sql.Identifier, select_copyable_message_columns(conn)))
+    query = sql.SQL("""
+    WITH batch AS (
+        SELECT {columns}
+        FROM messages
+        WHERE message_id > %s
+        ORDER BY message_id
+        LIMIT %s
+        FOR SHARE
+    ),
+    copied AS (
+        INSERT INTO {table} ({columns})
+        SELECT {columns} FROM batch
+        ON CONFLICT (conversation_id, message_id) DO NOTHING
+    )
+    SELECT max(message_id) FROM batch;
+    """).format(columns=columns, table=sql.Identifier(PARTITIONED_TABLE))
+    with conn.cursor() as cursor:
+        cursor.execute(query, (after_message_id, batch_size))
+        return cursor.fetchone()[0]
+
+
+def select_copy_progress(conn: PGConnection) -> Dict[str, int]:
+    """
+    Row counts of both tables, estimated from planner statistics
+    (exact counts of 100M rows take minutes).
+    """
+    query = sql.SQL("""
+    SELECT
+        (SELECT reltuples::bigint FROM pg_class WHERE oid = 'messages'::regclass) AS source_rows,
+        (
+            SELECT COALESCE(sum(c.reltuples), 0)::bigint
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = {table}::regclass
+        ) AS copied_rows;
+    """).format(table=sql.Literal(PARTITIONED_TABLE))
+    with conn.cursor() as cursor:
+        cursor.execute(query)
+        source_rows, copied_rows = cursor.fetchone()
+        return {"source_rows": source_rows, "copied_rows": copied_rows}
+
+
+def select_missing_messages(conn: PGConnection, limit: int = 10) -> List[int]:
+    """
+    Ids present in `messages` but not in the partitioned copy.
+    """
+    query = sql.SQL("""
+    SELECT m.message_id
+    FROM messages m
+    WHERE NOT EXISTS (
+        SELECT 1 FROM {table} p
+        WHERE p.conversation_id = m.conversation_id AND p.message_id = m.message_id
+    )
+    LIMIT %s;
+    """).format(table=sql.Identifier(PARTITIONED_TABLE))
+    with conn.cursor() as cursor:
+        cursor.execute(query, (limit,))
+        return [row[0] for row in cursor.fetchall()]
+
+
+def swap_in_partitioned_messages(conn: PGConnection) -> None:
+    """
+    Replace `messages` with the partitioned copy. Takes an exclusive lock on
+    `messages` for the duration of the transaction, which is only renames and
+    catalog changes, no data is moved. Check select_missing_messages first:
+    once every row has been copied the mirror trigger keeps it that way, so
+    the check does not need to hold the lock.
+
+    - Foreign keys pointing at the old table are dropped. The active leaf
+      pointer is re-added as (conversation_id, active_leaf_message_id) NOT VALID,
+      validate it afterwards with validate_partitioned_messages. The
+      parent_message_id self reference is not re-created: messages are only
+      deleted with their conversation, which the conversation foreign key cascades.
+    - The message_id sequence is re-owned by the new table so dropping the old
+      one later keeps it.
+    - The counter triggers from migration 010 move to the new table.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("LOCK TABLE messages IN ACCESS EXCLUSIVE MODE;")
+        cursor.execute("SELECT pg_get_serial_sequence('messages', 'message_id');")
+        sequence = cursor.fetchone()[0]
+
+        cursor.execute(
+            """
+            SELECT conrelid::regclass::text, conname
+            FROM pg_constraint
+            WHERE contype = 'f' AND confrelid = 'messages'::regclass;
+            """
+        )
+        for table, constraint in cursor.fetchall():
+            cursor.execute(
+                sql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(
+                    sql.SQL(table), sql.Identifier(constraint)
+                )
+            )
+
+        cursor.execute(sql.SQL("DROP TRIGGER {} ON messages").format(sql.Identifier(MIRROR_TRIGGER)))
+        cursor.execute(sql.SQL("DROP FUNCTION {}()").format(sql.Identifier(MIRROR_TRIGGER)))
+        for trigger in ("messages_counters_insert", "messages_counters_delete"):
+            cursor.execute(sql.SQL("DROP TRIGGER IF EXISTS {} ON messages").format(sql.Identifier(trigger)))
+
+        cursor.execute(
+            sql.SQL("ALTER TABLE messages RENAME TO {}").format(sql.Identifier(RETIRED_TABLE))
+        )
+        cursor.execute(
+            sql.SQL("ALTER TABLE {} RENAME TO messages").format(sql.Identifier(PARTITIONED_TABLE))
+        )
+        if sequence:
+            cursor.execute(
+                sql.SQL("ALTER SEQUENCE {} OWNED BY messages.message_id").format(sql.SQL(sequence))
+            )
+
+        cursor.execute(
+            """
+            CREATE TRIGGER messages_counters_insert
+                AFTER INSERT ON messages
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION messages_maintain_counters();
+            CREATE TRIGGER messages_counters_delete
+                AFTER DELETE ON messages
+                REFERENCING OLD TABLE AS old_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION messages_maintain_counters();
+            """
+        )
+        # Needs PostgreSQL 15+ for the column list on SET NULL
+        cursor.execute(
+            """
+            ALTER TABLE conversations
+                ADD CONSTRAINT conversations_active_leaf_message_fkey
+                FOREIGN KEY (conversation_id, active_leaf_message_id)
+                REFERENCES messages (conversation_id, message_id)
+                ON DELETE SET NULL (active_leaf_message_id)
+                NOT VALID;
+            """
+        )
+
+
+def validate_partitioned_messages(conn: PGConnection) -> None:
+    """
+    Validate the active leaf foreign key added by the swap. Runs without
+    blocking reads or writes on either table.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "ALTER TABLE conversations VALIDATE CONSTRAINT conversations_active_leaf_message_fkey;"
+        )
+
+
+class PlanRecorder:
+    """
+    Stands in for a connection in the query functions: every statement run
+    through it is EXPLAINed instead of executed and its plan kept in `plans`.
+    PREPAREs run as is and EXECUTEs are explained, so prepared statements are
+    checked with the plan they actually get.
+    """
+
+    def __init__(self, conn: PGConnection) -> None:
+        self._conn = conn
+        self.plans: List[Dict[str, Any]] = []
+
+    def cursor(self, *args, **kwargs) -> "_ExplainingCursor":
+        return _ExplainingCursor(self._conn.cursor(), self.plans)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+
+class _ExplainingCursor:
+    def __init__(self, cursor, plans: List[Dict[str, Any]]) -> None:
+        self._cursor = cursor
+        self._plans = plans
+        self.itersize = cursor.itersize
+
+    @property
+    def connection(self) -> PGConnection:
+        return self._cursor.connection
+
+    def execute(self, query, params=None) -> None:
+        text = query.as_string(self._cursor) if isinstance(query, sql.Composable) else query
+        if text.lstrip().upper().startswith("PREPARE"):
+            self._cursor.execute(query, params)
+            return
+        self._cursor.execute("EXPLAIN (FORMAT JSON) " + text, params)
+        plan = self._cursor.fetchone()[0]
+        self._plans.append(plan[0] if isinstance(plan, list) else json.loads(plan)[0])
+
+    def fetchone(self):
+        return None
+
+    def fetchall(self):
+        return []
+
+    def __iter__(self) -> Iterator:
+        return iter(())
+
+    def __enter__(self) -> "_ExplainingCursor":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._cursor.close()
+
+
+def partitions_in_plan(plan: Dict[str, Any]) -> Set[str]:
+    """
+    Names of the message partitions a plan still reads. EXPLAIN leaves out
+    the partitions pruned when planning, and for a generic plan those pruned
+    when it starts with the EXECUTE parameters ("Subplans Removed").
+    """
+    found: Set[str] = set()
+    stack = [plan["Plan"]]
+    while stack:
+        node = stack.pop()
+        relation = node.get("Relation Name", "")
+        if relation.startswith(PARTITION_PREFIX):
+            found.add(relation)
+        stack.extend(node.get("Plans", []))
+    return found
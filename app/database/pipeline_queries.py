@@ -0,0 +1,60 @@
+from typing import Any, Dict, List, Tuple
+from psycopg2.extensions import connection as PGConnection
+import psycopg2.extras
+
+
+def select_checkpoints(conn: PGConnection, checkpoint_keys: List[str], max_age_seconds: int) -> Dict[str, Any]:
+    """
+    Fetch stored stage outputs for any of the given checkpoint keys in one query,
+    ignoring those older than max_age_seconds.
+
+    Returns:
+        Dict mapping checkpoint_key to its decoded output, only for keys that exist
+    """
+    if not checkpoint_keys:
+        return {}
+
+    query = """
+    SELECT checkpoint_key, output
+    FROM pipeline_checkpoints
+    WHERE checkpoint_key = ANY(%s)
+    AND created_at > now() - make_interval(secs => %s);
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(query, (checkpoint_keys, max_age_seconds))
+        return {key: output for key, output in cursor.fetchall()}
+
+
+def insert_checkpoints(conn: PGConnection, checkpoints: List[Tuple[str, str, str, Any]]) -> None:
+    """
+    Store stage outputs in one statement, replacing expired ones under the same key.
+    Each element in checkpoints should be a tuple: (checkpoint_key, stage, model, output)
+    """
+    if not checkpoints:
+        return
+
+    query = """
+    INSERT INTO pipeline_checkpoints (checkpoint_key, stage, model, output)
+    VALUES %s
+    ON CONFLICT (checkpoint_key) DO UPDATE
+    SET output = EXCLUDED.output, model = EXCLUDED.model, created_at = now();
+    """
+    values = [
+        (key, stage, model, psycopg2.extras.Json(output))
+        for key, stage, model, output in checkpoints
+    ]
+    with conn.cursor() as cursor:
+        psycopg2.extras.execute_values(cursor, query, values)
+
+
+def delete_expired_checkpoints(conn: PGConnection, max_age_seconds: int) -> int:
+    """
+    Delete stage outputs older than max_age_seconds. Returns the number deleted.
+    """
+    query = """
+    DELETE FROM pipeline_checkpoints
+    WHERE created_at < now() - make_interval(secs => %s);
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(query, (max_age_seconds,))
+        return cursor.rowcount
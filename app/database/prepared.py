@@ -0,0 +1,156 @@
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Set, Union
+from weakref import WeakKeyDictionary
+
+from psycopg2.extensions import connection as PGConnection
+from psycopg2.extensions import cursor as PGCursor
+
+
+logger = logging.getLogger(__name__)
+
+_NAMED_PARAM = re.compile(r"%\((\w+)\)s")
+
+
+@dataclass(frozen=True)
+class PreparedStatement:
+    name: str
+    query: str
+    prepare_sql: str
+    # Parameter names in $n order for dict params, None for positional params
+    param_names: Optional[List[str]]
+    param_count: int
+
+
+def _compile(name: str, query: str, named: bool) -> PreparedStatement:
+    """
+    Turn a psycopg2 query into a PREPARE statement: %(name)s placeholders become
+    $n in order of first use, positional %s placeholders become $1..$n.
+    """
+    if named:
+        param_names: List[str] = []
+
+        def number(match: "re.Match") -> str:
+            if match.group(1) not in param_names:
+                param_names.append(match.group(1))
+            return f"${param_names.index(match.group(1)) + 1}"
+
+        body = _NAMED_PARAM.sub(number, query)
+        param_count = len(param_names)
+    else:
+        param_names = None
+        parts = query.split("%s")
+        body = parts[0] + "".join(f"${i}{part}" for i, part in enumerate(parts[1:], start=1))
+        param_count = len(parts) - 1
+
+    body = body.replace("%%", "%").strip().rstrip(";")
+    return PreparedStatement(
+        name=name,
+        query=query,
+        prepare_sql=f"PREPARE {name} AS {body}",
+        param_names=param_names,
+        param_count=param_count,
+    )
+
+
+class StatementRegistry:
+    """
+    Hot queries PREPAREd once per connection and then run with EXECUTE, so
+    Postgres parses and plans their text once per connection instead of on
+    every call. Pooled connections are reused across requests, so the cost of
+    preparing is paid once per pool slot.
+
+    Prepared statements belong to a server session. Behind a pooler in
+    transaction mode (e.g. PgBouncer) consecutive transactions can land on
+    different server connections, so set DB_PREPARED_STATEMENTS=false there;
+    statements then run as plain queries.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None) -> None:
+        self._enabled = enabled
+        self._statements: Dict[str, PreparedStatement] = {}
+        self._prepared: "WeakKeyDictionary[PGConnection, Set[str]]" = WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        # Read on first use, after the app has loaded its .env
+        if self._enabled is None:
+            self._enabled = os.getenv("DB_PREPARED_STATEMENTS", "true").lower() not in ("0", "false", "off", "no")
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled: bool) -> None:
+        # Statements already prepared stay on their connections and are reused if re-enabled
+        self._enabled = enabled
+
+    def _statement(self, name: str, query: str, named: bool) -> PreparedStatement:
+        statement = self._statements.get(name)
+        if statement is None:
+            with self._lock:
+                statement = self._statements.setdefault(name, _compile(name, query, named))
+        if statement.query != query:
+            raise ValueError(f"Prepared statement '{name}' is already registered with a different query")
+        return statement
+
+    def execute(
+        self,
+        cursor: PGCursor,
+        name: str,
+        query: str,
+        params: Union[Sequence[Any], Mapping[str, Any]] = (),
+    ) -> None:
+        """
+        Run `query` through the statement prepared as `name` on the cursor's
+        connection, preparing it first if this connection has not yet.
+        Drop-in for cursor.execute(query, params).
+        """
+        if not self.enabled:
+            cursor.execute(query, params)
+            return
+
+        named = isinstance(params, Mapping)
+        statement = self._statement(name, query, named)
+        conn = cursor.connection
+
+        with self._lock:
+            prepared = self._prepared.setdefault(conn, set())
+        if name not in prepared:
+            cursor.execute(statement.prepare_sql)
+            # Not transactional: the statement survives a rollback of this transaction
+            prepared.add(name)
+            logger.debug(f"Prepared statement '{name}' on connection {id(conn)}")
+
+        if named:
+            values = [params[param] for param in statement.param_names]
+        else:
+            values = list(params)
+        if len(values) != statement.param_count:
+            raise ValueError(
+                f"Prepared statement '{name}' takes {statement.param_count} parameters, got {len(values)}"
+            )
+
+        placeholders = ", ".join(["%s"] * len(values))
+        cursor.execute(f"EXECUTE {name} ({placeholders})" if values else f"EXECUTE {name}", values)
+
+    def forget(self, conn: PGConnection) -> None:
+        """
+        Drop what is known about a connection whose session was reset or replaced.
+        """
+        with self._lock:
+            self._prepared.pop(conn, None)
+
+
+statement_registry = StatementRegistry()
+
+
+def execute_prepared(
+    cursor: PGCursor,
+    name: str,
+    query: str,
+    params: Union[Sequence[Any], Mapping[str, Any]] = (),
+) -> None:
+    statement_registry.execute(cursor, name, query, params)
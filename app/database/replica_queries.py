@@ -0,0 +1,29 @@
+from typing import Optional, Tuple
+from psycopg2.extensions import connection as PGConnection
+
+
+def lsn_to_int(lsn: str) -> int:
+    """
+    Convert a textual WAL position ('16/B374D848') to a comparable integer.
+    """
+    high, low = lsn.split("/")
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+def select_primary_wal_lsn(conn: PGConnection) -> int:
+    """
+    Current WAL write position of the primary.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_current_wal_lsn()::text;")
+        return lsn_to_int(cursor.fetchone()[0])
+
+
+def select_replica_status(conn: PGConnection) -> Tuple[bool, Optional[int]]:
+    """
+    Whether the server is a standby, and the WAL position it has replayed up to.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_is_in_recovery(), pg_last_wal_replay_lsn()::text;")
+        in_recovery, replay_lsn = cursor.fetchone()
+        return in_recovery, lsn_to_int(replay_lsn) if replay_lsn else None
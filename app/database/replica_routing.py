@@ -0,0 +1,289 @@
+import asyncio
+import logging
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.constants import REPLICA_HEALTH_CHECK_SECONDS, REPLICA_MAX_LAG_SECONDS
+
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except ImportError:  # optional, only needed for REDIS_URL
+    redis = None
+
+
+@dataclass
+class ReplicaState:
+    dsn: str
+    healthy: bool = False
+    # Everything committed on the primary before this time has been replayed
+    caught_up_at: float = 0.0
+    lag_seconds: Optional[float] = None
+
+
+class InMemoryWriteLog:
+    """
+    Users' writes in flight and last write times, for a single process.
+    """
+
+    def __init__(self) -> None:
+        self._last_writes: Dict[str, float] = {}
+        self._pending_writes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def begin(self, user_id: str) -> None:
+        with self._lock:
+            self._pending_writes[user_id] = self._pending_writes.get(user_id, 0) + 1
+
+    def end(self, user_id: str, written_at: float) -> None:
+        with self._lock:
+            self._last_writes[user_id] = written_at
+            if self._pending_writes.get(user_id, 0) > 1:
+                self._pending_writes[user_id] -= 1
+            else:
+                self._pending_writes.pop(user_id, None)
+
+    def note(self, user_id: str, written_at: float) -> None:
+        with self._lock:
+            self._last_writes[user_id] = written_at
+
+    def state(self, user_id: str) -> Tuple[bool, float]:
+        """
+        Whether the user has a write in flight, and the time of their last write.
+        """
+        with self._lock:
+            return user_id in self._pending_writes, self._last_writes.get(user_id, 0.0)
+
+    def expire(self, before: float) -> None:
+        with self._lock:
+            self._last_writes = {
+                user_id: written_at
+                for user_id, written_at in self._last_writes.items()
+                if written_at > before
+            }
+
+
+class RedisWriteLog:
+    """
+    Users' writes in flight and last write times shared by every API worker, so
+    a read handled by one worker sees a write committed through another.
+    Last write times expire on their own once every healthy replica has them.
+    """
+
+    # A crashed worker never ends its writes; the in-flight count expires instead
+    PENDING_TTL_SECONDS = 60
+
+    def __init__(self, url: str) -> None:
+        self._client = redis.Redis.from_url(url)
+
+    def begin(self, user_id: str) -> None:
+        key = f"rw:pending:{user_id}"
+        with self._client.pipeline() as pipe:
+            pipe.incr(key)
+            pipe.expire(key, self.PENDING_TTL_SECONDS)
+            pipe.execute()
+
+    def end(self, user_id: str, written_at: float) -> None:
+        key = f"rw:pending:{user_id}"
+        with self._client.pipeline() as pipe:
+            self._set_last_write(pipe, user_id, written_at)
+            pipe.decr(key)
+            remaining = pipe.execute()[-1]
+        if remaining <= 0:
+            # Also clears a count gone negative after the key expired mid-write
+            self._client.delete(key)
+
+    def note(self, user_id: str, written_at: float) -> None:
+        with self._client.pipeline() as pipe:
+            self._set_last_write(pipe, user_id, written_at)
+            pipe.execute()
+
+    def _set_last_write(self, pipe, user_id: str, written_at: float) -> None:
+        ttl_ms = math.ceil(REPLICA_MAX_LAG_SECONDS * 1000) + 1000
+        pipe.set(f"rw:last:{user_id}", repr(written_at), px=ttl_ms)
+
+    def state(self, user_id: str) -> Tuple[bool, float]:
+        pending, last_write = self._client.mget(f"rw:pending:{user_id}", f"rw:last:{user_id}")
+        return int(pending or 0) > 0, float(last_write or 0.0)
+
+    def expire(self, before: float) -> None:
+        pass
+
+
+def create_write_log(redis_url: Optional[str] = None):
+    """
+    Write times shared across workers through Redis when REDIS_URL is set,
+    otherwise local to this process.
+    """
+    redis_url = redis_url or os.getenv("REDIS_URL")
+    if redis_url:
+        if redis is None:
+            logger.warning("REDIS_URL is set but the redis package is not installed, tracking writes per process")
+        else:
+            return RedisWriteLog(redis_url)
+    return InMemoryWriteLog()
+
+
+class ReplicaRouter:
+    """
+    Chooses where reads go: a healthy, caught-up replica, or the primary.
+
+    Each health check samples the primary's WAL position with a timestamp and
+    each replica's replayed position. A replica that has replayed the sample
+    taken at time t has every write committed before t, which gives its lag
+    and `caught_up_at` without comparing server clocks.
+
+    Read-your-writes: while a user has a write in flight, and afterwards until
+    a replica has caught up past the time it committed, their reads go to the
+    primary. Writes are tracked in a write log shared by all API workers when
+    REDIS_URL is set (per process otherwise, which only holds with a single
+    worker); once older than REPLICA_MAX_LAG_SECONDS every healthy replica has
+    them, so they are dropped. If the write log cannot be reached, reads go to
+    the primary.
+    """
+
+    def __init__(self, dsns: Optional[List[str]] = None, write_log=None) -> None:
+        self._dsns = dsns
+        self._replicas: Dict[str, ReplicaState] = {dsn: ReplicaState(dsn=dsn) for dsn in dsns or []}
+        self._samples: Deque[Tuple[float, int]] = deque(maxlen=64)
+        self._write_log = write_log
+        self._lock = threading.Lock()
+
+    @property
+    def replicas(self) -> Dict[str, ReplicaState]:
+        # Read on first use, after the app has loaded its .env
+        if self._dsns is None:
+            self._dsns = [dsn.strip() for dsn in os.getenv("DB_REPLICA_DSNS", "").split(",") if dsn.strip()]
+            self._replicas = {dsn: ReplicaState(dsn=dsn) for dsn in self._dsns}
+        return self._replicas
+
+    @property
+    def write_log(self):
+        # Chosen on first use, after the app has loaded its .env
+        if self._write_log is None:
+            self._write_log = create_write_log()
+        return self._write_log
+
+    def begin_write(self, user_id: str) -> None:
+        if not self.replicas:
+            return
+        try:
+            self.write_log.begin(str(user_id))
+        except Exception as e:
+            logger.error(f"Could not record write start for user {user_id}: {e}", exc_info=True)
+
+    def note_write(self, user_id: str) -> None:
+        """
+        Record a write committed outside a tracked request, e.g. from a streamed response.
+        """
+        if not self.replicas:
+            return
+        try:
+            self.write_log.note(str(user_id), time.time())
+        except Exception as e:
+            logger.error(f"Could not record write for user {user_id}: {e}", exc_info=True)
+
+    def end_write(self, user_id: str) -> None:
+        """
+        Called once the write has committed (or failed), records its time.
+        """
+        if not self.replicas:
+            return
+        try:
+            self.write_log.end(str(user_id), time.time())
+        except Exception as e:
+            logger.error(f"Could not record write end for user {user_id}: {e}", exc_info=True)
+
+    def mark_unhealthy(self, dsn: str) -> None:
+        with self._lock:
+            self.replicas[dsn].healthy = False
+
+    def choose(self, user_id: Optional[str] = None) -> Optional[str]:
+        """
+        DSN of a replica that can serve the user's reads, or None for the primary.
+        """
+        if not self.replicas:
+            return None
+        last_write = 0.0
+        if user_id:
+            try:
+                pending, last_write = self.write_log.state(str(user_id))
+            except Exception as e:
+                logger.error(f"Write log unavailable, reading from the primary: {e}", exc_info=True)
+                return None
+            if pending:
+                return None
+        with self._lock:
+            candidates = [
+                replica.dsn for replica in self.replicas.values()
+                if replica.healthy and replica.caught_up_at >= last_write
+            ]
+        return random.choice(candidates) if candidates else None
+
+    def primary_wal_lsn(self) -> int:
+        """
+        The primary's current WAL position, for the health check.
+        """
+        raise NotImplementedError
+
+    def replica_status(self, dsn: str) -> Tuple[bool, Optional[int]]:
+        """
+        Whether the server at dsn is in recovery, and the WAL position it has replayed.
+        """
+        raise NotImplementedError
+
+    def check(self) -> None:
+        if not self.replicas:
+            return
+
+        sampled_at = time.time()
+        try:
+            primary_lsn = self.primary_wal_lsn()
+        except Exception as e:
+            logger.error(f"Replica check could not reach the primary: {e}", exc_info=True)
+            return
+
+        with self._lock:
+            self._samples.append((sampled_at, primary_lsn))
+            samples = list(self._samples)
+
+        for replica in list(self.replicas.values()):
+            try:
+                in_recovery, replay_lsn = self.replica_status(replica.dsn)
+            except Exception as e:
+                logger.warning(f"Replica {replica.dsn.split('@')[-1]} is unreachable: {e}")
+                self.mark_unhealthy(replica.dsn)
+                continue
+
+            caught_up_at = max(
+                (t for t, lsn in samples if replay_lsn is not None and lsn <= replay_lsn),
+                default=0.0,
+            )
+            lag = sampled_at - caught_up_at if caught_up_at else None
+            with self._lock:
+                replica.caught_up_at = caught_up_at
+                replica.lag_seconds = lag
+                replica.healthy = bool(in_recovery) and lag is not None and lag <= REPLICA_MAX_LAG_SECONDS
+
+        try:
+            self.write_log.expire(sampled_at - REPLICA_MAX_LAG_SECONDS)
+        except Exception as e:
+            logger.error(f"Could not expire write log: {e}", exc_info=True)
+
+    async def run(self, interval: float = REPLICA_HEALTH_CHECK_SECONDS) -> None:
+        """
+        Check replicas every `interval` seconds until cancelled.
+        """
+        if not self.replicas:
+            return
+        while True:
+            await asyncio.to_thread(self.check)
+            await asyncio.sleep(interval)
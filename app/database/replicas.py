@@ -0,0 +1,59 @@
+import logging
+from typing import Optional, Tuple
+
+from psycopg2.extensions import connection as PGConnection
+
+from app.database.connection import PostgresConnection
+from app.database.replica_queries import select_primary_wal_lsn, select_replica_status
+from app.database.replica_routing import ReplicaRouter
+
+
+logger = logging.getLogger(__name__)
+
+
+class PostgresReplicaRouter(ReplicaRouter):
+    """
+    ReplicaRouter whose health check queries the primary and the replicas.
+    """
+
+    def primary_wal_lsn(self) -> int:
+        with PostgresConnection(connect_timeout=3, pooled=False) as conn:
+            return select_primary_wal_lsn(conn)
+
+    def replica_status(self, dsn: str) -> Tuple[bool, Optional[int]]:
+        with PostgresConnection(dsn=dsn, connect_timeout=3, pooled=False) as conn:
+            return select_replica_status(conn)
+
+
+replica_router = PostgresReplicaRouter()
+
+
+class ReadConnection:
+    """
+    Read-only unit of work for GET endpoints. Uses a replica that is healthy
+    and has the user's latest writes, falling back to the primary when none
+    qualifies or the chosen replica cannot be reached.
+    Pass pooled=False for long reads that should not hold a pool slot.
+    """
+
+    def __init__(self, user_id: Optional[str] = None, pooled: bool = True) -> None:
+        self._user_id = user_id
+        self._pooled = pooled
+        self._connection: Optional[PostgresConnection] = None
+
+    def __enter__(self) -> PGConnection:
+        dsn = replica_router.choose(self._user_id)
+        if dsn:
+            self._connection = PostgresConnection(dsn=dsn, connect_timeout=3, pooled=self._pooled, readonly=True)
+            try:
+                return self._connection.__enter__()
+            except Exception as e:
+                logger.warning(f"Replica unavailable, reading from the primary: {e}")
+                self._connection.close_connection()
+                replica_router.mark_unhealthy(dsn)
+
+        self._connection = PostgresConnection(pooled=self._pooled, readonly=True)
+        return self._connection.__enter__()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._connection.__exit__(exc_type, exc_val, exc_tb)
@@ -0,0 +1,114 @@
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+from psycopg2.extensions import connection as PGConnection
+import psycopg2.extras
+
+
+def search_user_chats_query(
+    conn: PGConnection,
+    user_id: UUID,
+    search_text: str,
+    limit: int,
+    workspace_id: Optional[UUID] = None,
+    folder_id: Optional[UUID] = None,
+    after_rank: Optional[float] = None,
+    after_key: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Full-text search over a user's chat titles and message bodies.
+
+    Title and message hits are ranked together (title matches weigh double) and
+    ordered by (rank DESC, hit_key DESC), where hit_key is "<conversation_id>:<message_id>"
+    and message_id is 0 for title hits. Passing the rank and hit_key of the last row
+    of a page as after_rank / after_key returns the next page (keyset pagination).
+    Snippets are only highlighted for the rows of the returned page.
+
+    Args:
+        conn: Database connection
+        user_id: UUID of the user whose chats are searched
+        search_text: User query, parsed with websearch_to_tsquery
+        limit: Page size, one extra row is fetched to detect further pages
+        workspace_id: Only search chats in this workspace
+        folder_id: Only search chats in this folder
+        after_rank: Rank of the last hit of the previous page
+        after_key: hit_key of the last hit of the previous page
+
+    Returns:
+        Up to limit + 1 hits, best first
+    """
+    query = """
+    WITH q AS (
+        SELECT websearch_to_tsquery('english', %(search_text)s) AS query
+    ),
+    scoped AS (
+        SELECT conversation_id, title, title_vector
+        FROM conversations
+        WHERE user_id = %(user_id)s
+        AND (%(workspace_id)s::uuid IS NULL OR workspace_id = %(workspace_id)s)
+        AND (%(folder_id)s::uuid IS NULL OR folder_id = %(folder_id)s)
+    ),
+    hits AS (
+        SELECT
+            c.conversation_id,
+            NULL::bigint AS message_id,
+            'title' AS match_type,
+            c.title AS document,
+            (ts_rank_cd(c.title_vector, q.query) * 2)::real AS rank
+        FROM scoped c, q
+        WHERE c.title_vector @@ q.query
+
+        UNION ALL
+
+        SELECT
+            m.conversation_id,
+            m.message_id,
+            'message' AS match_type,
+            m.content AS document,
+            ts_rank_cd(m.search_vector, q.query)::real AS rank
+        FROM messages m
+        JOIN scoped c ON c.conversation_id = m.conversation_id, q
+        WHERE m.search_vector @@ q.query
+    ),
+    page AS (
+        SELECT
+            hits.*,
+            hits.conversation_id::text || ':' || COALESCE(hits.message_id, 0)::text AS hit_key
+        FROM hits
+        WHERE %(after_rank)s::real IS NULL
+        OR (
+            hits.rank,
+            hits.conversation_id::text || ':' || COALESCE(hits.message_id, 0)::text
+        ) < (%(after_rank)s::real, %(after_key)s::text)
+        ORDER BY hits.rank DESC, hit_key DESC
+        LIMIT %(limit)s + 1
+    )
+    SELECT
+        p.conversation_id,
+        p.message_id,
+        p.match_type,
+        c.title,
+        p.rank,
+        p.hit_key,
+        ts_headline(
+            'english',
+            p.document,
+            q.query,
+            'StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=10, MaxFragments=2'
+        ) AS snippet
+    FROM page p
+    JOIN scoped c ON c.conversation_id = p.conversation_id, q
+    ORDER BY p.rank DESC, p.hit_key DESC;
+    """
+    params = {
+        "search_text": search_text,
+        "user_id": user_id,
+        "workspace_id": workspace_id,
+        "folder_id": folder_id,
+        "after_rank": after_rank,
+        "after_key": after_key,
+        "limit": limit,
+    }
+
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+        cursor.execute(query, params)
+        return [dict(row) for row in cursor.fetchall()]
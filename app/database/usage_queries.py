@@ -0,0 +1,67 @@
+from datetime import date
+from typing import List, Tuple
+from uuid import UUID
+from psycopg2.extensions import connection as PGConnection
+import psycopg2.extras
+
+
+def upsert_usage_aggregates(
+    conn: PGConnection, rows: List[Tuple[UUID, UUID, date, int, int, int, int]]
+) -> None:
+    """
+    Add accumulated usage to the daily per-user, per-model aggregates in one statement.
+    Each element in rows should be a tuple:
+    (user_id, model_id, day, requests, prompt_tokens, completion_tokens, cached_tokens)
+    Cost is priced here from the model's per-million token prices, cached input
+    tokens at the cached price when the model has one.
+    """
+    if not rows:
+        return
+
+    query = """
+    INSERT INTO usage_daily (
+        user_id, model_id, day, requests, prompt_tokens, completion_tokens, cached_tokens, cost_usd
+    )
+    SELECT
+        v.user_id, v.model_id, v.day, v.requests, v.prompt_tokens, v.completion_tokens, v.cached_tokens,
+        (
+            (v.prompt_tokens - v.cached_tokens) * COALESCE(m.input_price_per_million, 0)
+            + v.cached_tokens * COALESCE(m.cached_input_price_per_million, m.input_price_per_million, 0)
+            + v.completion_tokens * COALESCE(m.output_price_per_million, 0)
+        ) / 1000000
+    FROM (VALUES %s) AS v (user_id, model_id, day, requests, prompt_tokens, completion_tokens, cached_tokens)
+    LEFT JOIN models m ON m.model_id = v.model_id
+    ON CONFLICT (user_id, model_id, day) DO UPDATE
+    SET requests = usage_daily.requests + EXCLUDED.requests,
+        prompt_tokens = usage_daily.prompt_tokens + EXCLUDED.prompt_tokens,
+        completion_tokens = usage_daily.completion_tokens + EXCLUDED.completion_tokens,
+        cached_tokens = usage_daily.cached_tokens + EXCLUDED.cached_tokens,
+        cost_usd = usage_daily.cost_usd + EXCLUDED.cost_usd;
+    """
+    template = "(%s::uuid, %s::uuid, %s::date, %s::bigint, %s::bigint, %s::bigint, %s::bigint)"
+    with conn.cursor() as cursor:
+        psycopg2.extras.execute_values(cursor, query, rows, template=template)
+
+
+def select_user_usage(conn: PGConnection, user_id: UUID, start: date, end: date) -> List[dict]:
+    """
+    Daily usage per model for the user between start and end (inclusive), newest first.
+    """
+    query = """
+    SELECT
+        u.day,
+        u.model_id,
+        m.model_name,
+        u.requests,
+        u.prompt_tokens,
+        u.completion_tokens,
+        u.cached_tokens,
+        u.cost_usd
+    FROM usage_daily u
+    LEFT JOIN models m ON m.model_id = u.model_id
+    WHERE u.user_id = %s AND u.day BETWEEN %s AND %s
+    ORDER BY u.day DESC, m.model_name;
+    """
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+        cursor.execute(query, (user_id, start, end))
+        return [dict(row) for row in cursor.fetchall()]
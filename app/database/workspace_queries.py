@@ -4,13 +4,15 @@ from fastapi import HTTPException, status
 from psycopg2.extensions import connection as PGConnection
 import psycopg2.extras
 
+from app.constants import MAX_WORKSPACES_PER_USER
 from app.custom_exceptions import WorkspaceLimitExceeded
+from app.database.prepared import execute_prepared
 from app.schemas.workspaces import DeletionMode
 
 
 def get_user_workspace_count(conn: PGConnection, user_id: UUID) -> int:
     """
-    Get the number of workspaces a user currently has.
+    Get the number of workspaces a user currently has, from the trigger-maintained counter.
 
     Args:
         conn (PGConnection): PostgreSQL database connection
@@ -20,20 +22,24 @@ def get_user_workspace_count(conn: PGConnection, user_id: UUID) -> int:
         int: Number of workspaces owned by the user
     """
     query = """
-    SELECT COUNT(*)
-    FROM workspaces
-    WHERE user_id = %s;
+    SELECT workspace_count
+    FROM users
+    WHERE id = %s;
     """
 
     with conn.cursor() as cursor:
-        cursor.execute(query, (user_id,))
-        return cursor.fetchone()[0]
+        execute_prepared(cursor, "get_user_workspace_count", query, (user_id,))
+        row = cursor.fetchone()
+        return row[0] if row else 0
 
 
 def create_workspace_query(
     conn: PGConnection, user_id: UUID, name: str) -> Dict[str, Any]:
     """
     Create a new workspace and return the inserted record.
+    The workspace limit is checked inside the INSERT against the user's workspace_count,
+    whose row is locked first: concurrent creations for the same user queue up and
+    each sees the count left by the previous one, so the limit cannot be overshot.
 
     Args:
         conn (PGConnection): PostgreSQL database connection
@@ -43,19 +49,22 @@ def create_workspace_query(
     Returns:
         Dict[str, Any]: Dictionary containing the created workspace details
     """
-    current_count = get_user_workspace_count(conn, user_id)
-    if current_count >= 5:
-        raise WorkspaceLimitExceeded()
-
     query = """
+    WITH owner AS (
+        SELECT id, workspace_count
+        FROM users
+        WHERE id = %(user_id)s
+        FOR UPDATE
+    )
     INSERT INTO workspaces (
         user_id,
         name
     )
-    VALUES (
-        %s,
-        %s
-    )
+    SELECT
+        owner.id,
+        %(name)s
+    FROM owner
+    WHERE owner.workspace_count < %(limit)s
     RETURNING 
         workspace_id,
         user_id,
@@ -64,21 +73,30 @@ def create_workspace_query(
     """
 
     with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
-        cursor.execute(query, (user_id, name))
+        cursor.execute(
+            query, {"user_id": user_id, "name": name, "limit": MAX_WORKSPACES_PER_USER}
+        )
         workspace = cursor.fetchone()
-        conn.commit()
+        if not workspace:
+            raise WorkspaceLimitExceeded()
         return workspace
 
 
 def delete_workspace_query(
-    conn: PGConnection, workspace_id: UUID, mode: DeletionMode = DeletionMode.ARCHIVE
+    conn: PGConnection,
+    workspace_id: UUID,
+    user_id: UUID,
+    mode: DeletionMode = DeletionMode.ARCHIVE,
 ) -> bool:
     """
     Delete a workspace with specified deletion mode.
+    Contents are moved or deleted in the same statement as the workspace,
+    scoped to workspaces owned by the user.
 
     Args:
         conn: PostgreSQL database connection
         workspace_id: ID of the workspace to delete
+        user_id: ID of the user requesting deletion
         mode: DeletionMode specifying how to handle workspace contents.
              Defaults to ARCHIVE which preserves contents in global space.
 
@@ -86,127 +104,143 @@ def delete_workspace_query(
         bool: True if workspace was found and deleted
     """
     # SQL queries
-    archive_contents_query = """
-        UPDATE conversations 
-        SET workspace_id = NULL
-        WHERE workspace_id = %s
-    """
-
-    delete_contents_query = """
-        DELETE FROM conversations
-        WHERE workspace_id = %s
-    """
-    
-    archive_folders_query = """
-        UPDATE folders
-        SET workspace_id = NULL
-        WHERE workspace_id = %s
-    """
-
-    delete_folders_query = """
-        DELETE FROM folders
-        WHERE workspace_id = %s
+    archive_and_delete_query = """
+        WITH target AS (
+            SELECT workspace_id
+            FROM workspaces
+            WHERE workspace_id = %s AND user_id = %s
+            FOR UPDATE
+        ),
+        archived_chats AS (
+            UPDATE conversations 
+            SET workspace_id = NULL
+            WHERE workspace_id IN (SELECT workspace_id FROM target)
+        ),
+        archived_folders AS (
+            UPDATE folders
+            SET workspace_id = NULL
+            WHERE workspace_id IN (SELECT workspace_id FROM target)
+        )
+        DELETE FROM workspaces
+        WHERE workspace_id IN (SELECT workspace_id FROM target)
     """
 
-    delete_workspace_query = """
+    delete_with_contents_query = """
+        WITH target AS (
+            SELECT workspace_id
+            FROM workspaces
+            WHERE workspace_id = %s AND user_id = %s
+            FOR UPDATE
+        ),
+        deleted_chats AS (
+            DELETE FROM conversations
+            WHERE workspace_id IN (SELECT workspace_id FROM target)
+        ),
+        deleted_folders AS (
+            DELETE FROM folders
+            WHERE workspace_id IN (SELECT workspace_id FROM target)
+        )
         DELETE FROM workspaces
-        WHERE workspace_id = %s
+        WHERE workspace_id IN (SELECT workspace_id FROM target)
     """
 
-    try:
-        with conn.cursor() as cursor:
-            if mode == DeletionMode.ARCHIVE:
-                # Move contents to global space first
-                cursor.execute(archive_contents_query, (workspace_id,))
-                cursor.execute(archive_folders_query, (workspace_id,))
-
-            else:  # PERMANENT deletion
-                # Delete all contents first
-                cursor.execute(delete_contents_query, (workspace_id,))
-                cursor.execute(delete_folders_query, (workspace_id,))
-
-
-            # Then delete the workspace
-            cursor.execute(delete_workspace_query, (workspace_id,))
-            rows_affected = cursor.rowcount
-            conn.commit()
-
-            return rows_affected > 0
+    query = (
+        archive_and_delete_query
+        if mode == DeletionMode.ARCHIVE
+        else delete_with_contents_query
+    )
 
-    except Exception as e:
-        conn.rollback()
-        raise e
+    with conn.cursor() as cursor:
+        cursor.execute(query, (workspace_id, user_id))
+        return cursor.rowcount > 0
 
 
 def get_workspace_chats_query(
-    conn: PGConnection, workspace_id: UUID
-) -> Optional[Dict[str, Any]]:
+    conn: PGConnection, workspace_id: UUID, user_id: UUID
+) -> Optional[str]:
     """
     Retrieves complete workspace contents including chats and folders.
 
     Args:
         conn (PGConnection): PostgreSQL database connection
         workspace_id (UUID): ID of the workspace
+        user_id (UUID): ID of the user, the workspace must belong to them
 
     Returns:
-        Optional[Dict[str, Any]]: Complete workspace data if found, None if workspace doesn't exist
+        Optional[str]: Workspace data as JSON text (WorkspaceChats shape) if found,
+        None if workspace doesn't exist
     """
     query = """
     WITH workspace_data AS (
         SELECT 
             w.workspace_id,
             w.name,
+            w.chat_count,
             w.created_at,
             w.updated_at
         FROM workspaces w
-        WHERE w.workspace_id = %s
+        WHERE w.workspace_id = %s AND w.user_id = %s
     ),
     workspace_chats AS (
         SELECT 
             c.conversation_id,
             c.title,
+            c.message_count,
+            c.last_message_at,
             c.created_at,
             c.updated_at
         FROM conversations c
-        WHERE c.workspace_id = %s
+        WHERE c.workspace_id = %s AND c.user_id = %s
         ORDER BY c.created_at DESC
     )
     SELECT 
-        wd.*,
-        COALESCE(
-            jsonb_agg(
-                jsonb_build_object(
-                    'conversation_id', wc.conversation_id,
-                    'title', wc.title,
-                    'created_at', wc.created_at,
-                    'updated_at', wc.updated_at
-                )
-            ) FILTER (WHERE wc.conversation_id IS NOT NULL),
-            '[]'
-        ) as chats
+        jsonb_build_object(
+            'workspace_id', wd.workspace_id,
+            'name', wd.name,
+            'chat_count', wd.chat_count,
+            'created_at', wd.created_at,
+            'updated_at', wd.updated_at,
+            'chats', COALESCE(
+                jsonb_agg(
+                    jsonb_build_object(
+                        'conversation_id', wc.conversation_id,
+                        'title', wc.title,
+                        'message_count', wc.message_count,
+                        'last_message_at', wc.last_message_at,
+                        'created_at', wc.created_at,
+                        'updated_at', wc.updated_at
+                    ) ORDER BY wc.created_at DESC
+                ) FILTER (WHERE wc.conversation_id IS NOT NULL),
+                '[]'::jsonb
+            )
+        )::text AS workspace
     FROM workspace_data wd
     LEFT JOIN workspace_chats wc ON true
     GROUP BY 
         wd.workspace_id,
         wd.name,
+        wd.chat_count,
         wd.created_at,
         wd.updated_at;
     """
 
-    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-        cursor.execute(query, (workspace_id, workspace_id))
-        result = cursor.fetchone()
+    with conn.cursor() as cursor:
+        execute_prepared(
+            cursor, "get_workspace_chats", query, (workspace_id, user_id, workspace_id, user_id)
+        )
+        row = cursor.fetchone()
 
-        return result
+        return row[0] if row else None
 
 
 def get_workspace_folders_query(
     conn: PGConnection, 
-    workspace_id: UUID
-) -> Dict[str, Any]:
+    workspace_id: UUID,
+    user_id: UUID
+) -> str:
     """
     Retrieves workspace information along with all its folders and their conversations.
-    Returns a structured response matching the WorkspaceFoldersResponse model.
+    Returns JSON text matching the WorkspaceFoldersResponse model, built by Postgres.
     """
     query = """
     WITH workspace_info AS (
@@ -217,7 +251,7 @@ def get_workspace_folders_query(
             w.created_at,
             w.updated_at
         FROM workspaces w
-        WHERE w.workspace_id = %s
+        WHERE w.workspace_id = %s AND w.user_id = %s
     ),
     folder_conversations AS (
         -- Aggregate conversations for each folder
@@ -228,6 +262,8 @@ def get_workspace_folders_query(
                     jsonb_build_object(
                         'conversation_id', c.conversation_id,
                         'title', c.title,
+                        'message_count', c.message_count,
+                        'last_message_at', c.last_message_at,
                         'created_at', c.created_at,
                         'updated_at', c.updated_at
                     ) ORDER BY c.updated_at DESC
@@ -236,34 +272,39 @@ def get_workspace_folders_query(
             ) as conversations
         FROM folders f
         LEFT JOIN conversations c ON c.folder_id = f.folder_id
-        WHERE f.workspace_id = %s
+        WHERE f.workspace_id = %s AND f.user_id = %s
         GROUP BY f.folder_id
     )
     SELECT 
-        wi.workspace_id,
-        wi.name,
-        wi.created_at,
-        wi.updated_at,
-        COALESCE(
-            jsonb_agg(
-                jsonb_build_object(
-                    'folder_id', f.folder_id,
-                    'name', f.name,
-                    'created_at', f.created_at,
-                    'updated_at', f.updated_at,
-                    'conversations', COALESCE(fc.conversations, '[]'::jsonb)
-                ) ORDER BY f.created_at DESC
-            ) FILTER (WHERE f.folder_id IS NOT NULL),
-            '[]'::jsonb
-        ) as folders
+        jsonb_build_object(
+            'workspace_id', wi.workspace_id,
+            'name', wi.name,
+            'created_at', wi.created_at,
+            'updated_at', wi.updated_at,
+            'folders', COALESCE(
+                jsonb_agg(
+                    jsonb_build_object(
+                        'folder_id', f.folder_id,
+                        'name', f.name,
+                        'chat_count', f.chat_count,
+                        'created_at', f.created_at,
+                        'updated_at', f.updated_at,
+                        'conversations', COALESCE(fc.conversations, '[]'::jsonb)
+                    ) ORDER BY f.created_at DESC
+                ) FILTER (WHERE f.folder_id IS NOT NULL),
+                '[]'::jsonb
+            )
+        )::text AS workspace
     FROM workspace_info wi
     LEFT JOIN folders f ON f.workspace_id = wi.workspace_id
     LEFT JOIN folder_conversations fc ON f.folder_id = fc.folder_id
     GROUP BY wi.workspace_id, wi.name, wi.created_at, wi.updated_at;
     """
 
-    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-        cur.execute(query, (workspace_id, workspace_id))
+    with conn.cursor() as cur:
+        execute_prepared(
+            cur, "get_workspace_folders", query, (workspace_id, user_id, workspace_id, user_id)
+        )
         result = cur.fetchone()
         
         if not result:
@@ -272,7 +313,7 @@ def get_workspace_folders_query(
                 detail="Workspace not found"
             )
             
-        return dict(result)
+        return result[0]
 
 
 def get_user_workspaces_query(
@@ -292,6 +333,7 @@ def get_user_workspaces_query(
     SELECT 
         workspace_id,
         name,
+        chat_count,
         created_at
     FROM workspaces 
     WHERE user_id = %s
@@ -299,6 +341,6 @@ def get_user_workspaces_query(
     """
 
     with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
-        cursor.execute(query, (user_id,))
+        execute_prepared(cursor, "get_user_workspaces", query, (user_id,))
         return [dict(row) for row in cursor.fetchall()]
 
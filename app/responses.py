@@ -0,0 +1,43 @@
+from typing import Any, AsyncIterator, Generator, TypeVar
+
+import anyio
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+
+T = TypeVar("T")
+
+
+class RawJSONResponse(Response):
+    """
+    Sends JSON that was already serialised elsewhere (usually built by Postgres
+    with json_agg / json_build_object) straight to the client, without parsing
+    it into Python objects and encoding it again.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return content.encode("utf-8")
+
+
+async def iterate_closing(lines: Generator[T, None, None]) -> AsyncIterator[T]:
+    """
+    Body iterator for a StreamingResponse over a blocking generator: each item
+    is produced in the threadpool, and the generator is closed as soon as the
+    stream ends, including when the client disconnects mid-stream. Its
+    `with` blocks (connections, named cursors) are exited right away instead
+    of whenever the abandoned generator is garbage collected.
+    """
+    done = object()
+    try:
+        while True:
+            line = await run_in_threadpool(next, lines, done)
+            if line is done:
+                break
+            yield line
+    finally:
+        # The disconnect cancels this task; shield so close() still runs
+        with anyio.CancelScope(shield=True):
+            await run_in_threadpool(lines.close)
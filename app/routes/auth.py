@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Request
-from app.auth.dependencies import get_or_create_user
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from app.auth.dependencies import get_current_claims, get_or_create_user
 from app.auth.google_auth import oauth, get_google_user_info
+from app.auth.token_cache import revoked_tokens
 from app.auth.utils import create_access_token
+from app.database.auth_queries import insert_revoked_token
 from app.database.connection import PostgresConnection
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(tags=["auth"])
 
 @router.get("/google/login")
@@ -32,3 +37,23 @@ async def auth_callback(request: Request):
 
     return {"access_token": token, "token_type": "bearer"}
 
+
+@router.post(
+    "/auth/logout",
+    status_code=status.HTTP_204_NO_CONTENT,
+    description="Revoke the current access token",
+)
+async def logout(claims: dict = Depends(get_current_claims)):
+    jti = claims.get("jti")
+    if not jti:
+        # Tokens issued before jti was added simply run out at their exp
+        return
+
+    try:
+        with PostgresConnection() as conn:
+            insert_revoked_token(conn, jti, claims["sub"], claims["exp"])
+    except Exception as e:
+        logger.error(f"Error revoking token: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to revoke token")
+
+    revoked_tokens.revoke(jti, claims["exp"])
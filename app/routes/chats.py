@@ -1,25 +1,70 @@
+import asyncio
 import logging
-from typing import List
+import math
+import threading
+import time
+from typing import AsyncIterator, Iterator, List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import ValidationError
-from app.auth.dependencies import get_current_user
-from app.database.chat_queries import delete_chat_query, insert_chat, insert_chat_messages, select_chat_by_id, select_chat_context_by_id, select_user_chat_titles_and_count_single_row, update_chat_title_query, update_conversation_model
+from app.auth.dependencies import ensure_current_user, get_current_user, track_user_writes
+from app.custom_exceptions import ConversationArchived, RateLimitExceeded
+from app.database.chat_queries import (
+    delete_chat_query,
+    insert_chat_messages,
+    insert_chat_with_messages,
+    select_chat_by_id,
+    select_chat_context_by_id,
+    select_chat_header_by_id,
+    select_chat_page_by_id,
+    select_message,
+    select_user_chat_titles_and_count_single_row,
+    stream_chat_messages,
+    update_active_branch,
+    update_chat_title_query,
+    update_conversation_model,
+)
 from app.database.connection import PostgresConnection
+from app.database.replicas import ReadConnection, replica_router
+from app.responses import RawJSONResponse, iterate_closing
 import psycopg2.extras
 
-from app.routes.constant import ASSISTANT_ROLE, DEFAULT_MODEL, USER_ROLE
-from app.services.generate_title import get_chat_title
-from app.services.model_services import get_reply_from_model
+from app.routes.constant import (
+    ASSISTANT_ROLE,
+    DEFAULT_CHAT_PAGE_SIZE,
+    DEFAULT_CHAT_TITLE,
+    DEFAULT_MODEL,
+    DISCONNECT_POLL_SECONDS,
+    MAX_CHAT_PAGE_SIZE,
+    MAX_COMPARE_MODELS,
+    USER_ROLE,
+)
+from app.database.job_queries import enqueue_job
+from app.services.constants import (
+    JOB_KIND_GENERATE_TITLE,
+    JOB_PRIORITY_HIGH,
+    PERSIST_TRUNCATED_REPLIES,
+)
+from app.services.model_services import ModelReply, get_reply_from_model
+from app.services.prompt_registry import prompt_registry
+from app.services.rate_limiter import rate_limiter
+from app.services.usage import usage_accumulator
 
 psycopg2.extras.register_uuid()
 
 from app.schemas.chats import (
+    ActiveBranchResponse,
+    CompareEvent,
+    CompareModelsRequest,
     CreateChatRequest,
     CreateChatResponse,
     CreateMessageRequest,
+    EditMessageRequest,
     MessageResponse,
     PaginatedChatResponse,
+    RegenerateMessageRequest,
+    SwitchBranchRequest,
     UpdateChatTitleRequest,
     UpdateChatTitleResponse,
 )
@@ -27,7 +72,99 @@ from app.schemas.chats import (
 logger = logging.getLogger(__name__)
 
 
-router = APIRouter(prefix="/api/chats", tags=["chats"], dependencies=[Depends(get_current_user)])
+router = APIRouter(prefix="/api/chats", tags=["chats"], dependencies=[Depends(track_user_writes)])
+
+
+def enforce_rate_limit(user_id: UUID, model_id: UUID, estimated_tokens: int) -> None:
+    """
+    Reject with 429 and Retry-After before any provider call or write if the user is over a limit.
+    """
+    enforce_rate_limits(user_id, [model_id], estimated_tokens)
+
+
+def enforce_rate_limits(user_id: UUID, model_ids: List[UUID], estimated_tokens: int) -> None:
+    """
+    Like enforce_rate_limit for a request sent to several models: a 429 leaves
+    nothing charged for any of them.
+    """
+    try:
+        rate_limiter.check_all(user_id, model_ids, estimated_tokens)
+    except RateLimitExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=e.message,
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+
+
+async def get_reply_unless_disconnected(http_request: Request, **kwargs) -> ModelReply:
+    """
+    Run the provider call in a thread while polling the client connection.
+    If the client goes away the call is cancelled, so the provider stops
+    generating and the event loop is never blocked waiting on it.
+    """
+    cancel_event = threading.Event()
+    call = asyncio.ensure_future(
+        asyncio.to_thread(get_reply_from_model, cancel_event=cancel_event, **kwargs)
+    )
+    while not call.done():
+        done, _ = await asyncio.wait({call}, timeout=DISCONNECT_POLL_SECONDS)
+        if not done and not cancel_event.is_set() and await http_request.is_disconnected():
+            cancel_event.set()
+    return call.result()
+
+
+async def generate_turn(
+    http_request: Request,
+    current_user: str,
+    conversation_id: UUID,
+    model_id: UUID,
+    persona_id: Optional[str],
+    chat_history: list,
+    estimated_tokens: int,
+    parent_message_id: Optional[int],
+    user_content: Optional[str] = None,
+    switch_model: bool = False,
+) -> Optional[List[MessageResponse]]:
+    """
+    Get a reply for chat_history and store it under parent_message_id, preceded by
+    the user message when user_content is given. The stored messages become the
+    active branch. With switch_model, model_id also becomes the conversation's
+    current model. Returns None if the client disconnected and nothing was stored.
+
+    No transaction is open while waiting on the provider; all writes of the
+    turn commit together afterwards.
+    """
+    # Call LLM to generate a response, cancelled if the client disconnects
+    reply = await get_reply_unless_disconnected(
+        http_request,
+        model_id=model_id,
+        chat=chat_history,
+        persona_id=persona_id,
+    )
+    usage_accumulator.add(current_user, model_id, reply.usage)
+    rate_limiter.record(current_user, model_id, estimated_tokens, reply.usage)
+
+    if reply.truncated and not (PERSIST_TRUNCATED_REPLIES and reply.content):
+        return None
+
+    # Prepare messages: user first, then assistant
+    messages_data = []
+    if user_content is not None:
+        messages_data.append((conversation_id, USER_ROLE, None, user_content))
+    messages_data.append(
+        (conversation_id, ASSISTANT_ROLE, model_id, reply.content, reply.usage, reply.truncated)
+    )
+
+    with PostgresConnection() as conn:
+        if switch_model:
+            # Update DB so this model becomes the new default
+            update_conversation_model(conn, conversation_id, current_user, model_id)
+            logger.info(f"Switched conversation {conversation_id} to model {model_id}")
+
+        # Insert all messages in one query
+        inserted_messages = insert_chat_messages(conn, messages_data, parent_message_id=parent_message_id)
+    return [MessageResponse(**msg) for msg in inserted_messages]
 
 
 @router.post(
@@ -36,54 +173,78 @@ router = APIRouter(prefix="/api/chats", tags=["chats"], dependencies=[Depends(ge
     status_code=status.HTTP_201_CREATED,
     description="Creates a new chat",
 )
-async def create_chat(request: CreateChatRequest):
-    try:
+async def create_chat(
+    request: CreateChatRequest,
+    http_request: Request,
+    current_user: str = Depends(get_current_user),
+):
+    ensure_current_user(request.user_id, current_user)
+    if request.persona_id and not prompt_registry.exists(request.persona_id):
+        raise HTTPException(status_code=400, detail="Unknown persona")
 
-        generated_title = get_chat_title(request.initial_message)
+    chat = [
+        {"role": USER_ROLE, "content": request.initial_message},
+    ]
+    current_model = DEFAULT_MODEL
 
-        chat = [
-            {"role": USER_ROLE, "content": request.initial_message},
-        ]
-        current_model = DEFAULT_MODEL
+    if request.model_id:
+        current_model = request.model_id
 
-        if request.model_id:
-            current_model = request.model_id
-                
-        # Call LLM to generate a response
-        llm_response = get_reply_from_model(model_id=current_model, chat=chat)
+    estimated_tokens = prompt_registry.estimate_prompt_tokens(request.persona_id, chat)
+    enforce_rate_limit(current_user, current_model, estimated_tokens)
+
+    try:
+        # Call LLM to generate a response, cancelled if the client disconnects
+        reply = await get_reply_unless_disconnected(
+            http_request, model_id=current_model, chat=chat, persona_id=request.persona_id
+        )
 
     except Exception as e:
-        logger.error(f"Error during LLM call for title generation: {e}", exc_info=True)
+        logger.error(f"Error during LLM call for chat creation: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to generate chat response")
 
+    usage_accumulator.add(current_user, current_model, reply.usage)
+    rate_limiter.record(current_user, current_model, estimated_tokens, reply.usage)
+
+    if reply.truncated and not (PERSIST_TRUNCATED_REPLIES and reply.content):
+        # Nobody is listening and there is nothing worth keeping
+        return Response(status_code=499)
+
+    # Chat, messages and title job are committed together or not at all
+
     try:
         with PostgresConnection() as conn:  # TODO replace with async connection
-            # Insert chat record
-            chat_record = insert_chat(
-                conn, request.user_id, current_model, generated_title, request.workspace_id
+            # Conversation and both messages in one statement
+            # The title is generated by a background job, the chat starts with a placeholder
+            chat_record = insert_chat_with_messages(
+                conn,
+                current_user,
+                current_model,
+                DEFAULT_CHAT_TITLE,
+                request.initial_message,
+                reply.content,
+                usage=reply.usage,
+                workspace_id=request.workspace_id,
+                persona_id=request.persona_id,
+                truncated=reply.truncated,
             )
+            if not chat_record:
+                raise HTTPException(status_code=404, detail="Workspace not found")
 
-            # Prepare messages: user first, then assistant
-            messages_data = [
-                (
-                    chat_record["conversation_id"],
-                    USER_ROLE,
-                    None,
-                    request.initial_message,
-                ),
-                (
-                    chat_record["conversation_id"],
-                    ASSISTANT_ROLE,
-                    current_model,
-                    llm_response,
-                ),
-            ]
-
-            # Insert both messages in one query
-            inserted_messages = insert_chat_messages(conn, messages_data)
             # Convert inserted messages to Pydantic models
-            messages = [MessageResponse(**msg) for msg in inserted_messages]
+            messages = [MessageResponse(**msg) for msg in chat_record["messages"]]
+
+            title_job = enqueue_job(
+                conn,
+                JOB_KIND_GENERATE_TITLE,
+                {"conversation_id": str(chat_record["conversation_id"])},
+                user_id=current_user,
+                priority=JOB_PRIORITY_HIGH,
+            )
             
+    except HTTPException:
+        raise
+
     except ValidationError as e:
         raise HTTPException(status_code=400, detail=e.errors())
 
@@ -96,7 +257,9 @@ async def create_chat(request: CreateChatRequest):
         conversation_id=chat_record["conversation_id"],
         current_model_id=current_model,
         workspace_id=request.workspace_id,
-        title=generated_title,
+        persona_id=request.persona_id,
+        title=DEFAULT_CHAT_TITLE,
+        title_job_id=title_job["job_id"],
         messages=messages,
     )
 
@@ -109,70 +272,386 @@ async def create_chat(request: CreateChatRequest):
     status_code=status.HTTP_201_CREATED,
     description="Creates a new message in a chat",
 )
-async def create_message(request: CreateMessageRequest):
+async def create_message(
+    request: CreateMessageRequest,
+    http_request: Request,
+    current_user: str = Depends(get_current_user),
+):
     try:
         with PostgresConnection() as conn:  # TODO replace with async connection
 
             # Retrieve conversation context to get model_id and existing messages
-            chat_record = select_chat_context_by_id(conn, request.conversation_id)
+            chat_record = select_chat_context_by_id(conn, request.conversation_id, current_user)
             if not chat_record:
                 logger.info(
                     f"Chat context for conversation_id {request.conversation_id} not found."
                 )
                 raise HTTPException(status_code=404, detail="Conversation not found")
 
-            current_model = chat_record["current_model_id"]
-            chat_history = chat_record["messages"]
-            chat_history.append({"role": USER_ROLE, "content": request.content})
+        current_model = chat_record["current_model_id"]
+        chat_history = chat_record["messages"]
+        chat_history.append({"role": USER_ROLE, "content": request.content})
+
+        # If the request has a new model_id, switch conversation's current_model_id
+        # when the turn is stored. Otherwise, we keep using the existing one.
+        switch_model = bool(request.model_id and request.model_id != current_model)
+        if switch_model:
+            current_model = request.model_id
+
+        estimated_tokens = prompt_registry.estimate_prompt_tokens(
+            chat_record["persona_id"], chat_history
+        )
+        enforce_rate_limit(current_user, current_model, estimated_tokens)
+
+        messages = await generate_turn(
+            http_request,
+            current_user,
+            request.conversation_id,
+            current_model,
+            chat_record["persona_id"],
+            chat_history,
+            estimated_tokens,
+            parent_message_id=chat_record["leaf_message_id"],
+            user_content=request.content,
+            switch_model=switch_model,
+        )
+        if messages is None:
+            # Nobody is listening and there is nothing worth keeping
+            return Response(status_code=499)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(
+            f"Error in creating message for conversation {request.conversation_id}: {e}",
+            exc_info=True,
+        )
+        raise HTTPException(
+            status_code=500, detail="Failed to process message creation"
+        )
+
+    return messages
+
+
+def store_assistant_reply(
+    conversation_id: UUID, model_id: UUID, reply: ModelReply, parent_message_id: int
+) -> MessageResponse:
+    with PostgresConnection() as conn:
+        inserted = insert_chat_messages(
+            conn,
+            [(conversation_id, ASSISTANT_ROLE, model_id, reply.content, reply.usage, reply.truncated)],
+            parent_message_id=parent_message_id,
+            keep_active_branch=True,
+        )
+    return MessageResponse(**inserted[0])
 
-            # If the request has a new model_id, switch conversation's current_model_id
-            # Otherwise, we keep using the existing one.
-            if request.model_id and request.model_id != current_model:
-                # Update DB so this model becomes the new default
-                update_conversation_model(
-                    conn, request.conversation_id, request.model_id
-                )
-                current_model = request.model_id
-                logger.info(
-                    f"Switched conversation {request.conversation_id} to model {current_model}"
-                )
 
-            # Call LLM to generate a response
-            llm_response = get_reply_from_model(
-                model_id=current_model, chat=chat_history
+async def compare_ndjson(
+    request: CompareModelsRequest,
+    user_message: MessageResponse,
+    chat_history: list,
+    persona_id: Optional[str],
+    estimated_tokens: int,
+    current_user: str,
+) -> AsyncIterator[str]:
+    """
+    NDJSON body of a compare request. All models are called at once and each
+    reply is stored and sent as soon as it completes, so the whole comparison
+    takes as long as the slowest model. If the client disconnects, the calls
+    still running are cancelled.
+    """
+    yield CompareEvent(type="user_message", message=user_message).model_dump_json() + "\n"
+
+    started = time.perf_counter()
+    cancel_events = {model_id: threading.Event() for model_id in request.model_ids}
+
+    async def complete(model_id: UUID):
+        try:
+            reply = await asyncio.to_thread(
+                get_reply_from_model,
+                model_id=model_id,
+                chat=chat_history,
+                persona_id=persona_id,
+                cancel_event=cancel_events[model_id],
+            )
+            usage_accumulator.add(current_user, model_id, reply.usage)
+            rate_limiter.record(current_user, model_id, estimated_tokens, reply.usage)
+            message = await asyncio.to_thread(
+                store_assistant_reply,
+                request.conversation_id,
+                model_id,
+                reply,
+                user_message.message_id,
             )
+            # Stored after the request's own write tracking has ended
+            replica_router.note_write(current_user)
+            latency_ms = int((time.perf_counter() - started) * 1000)
+            return CompareEvent(type="reply", model_id=model_id, message=message, latency_ms=latency_ms)
+        except Exception as e:
+            logger.error(f"Compare call to model {model_id} failed: {e}", exc_info=True)
+            return CompareEvent(type="error", model_id=model_id, detail="Failed to generate a reply")
 
-            # Prepare messages: user first, then assistant
-            messages_data = [
-                (request.conversation_id, USER_ROLE, None, request.content),
-                (request.conversation_id, ASSISTANT_ROLE, current_model, llm_response),
-            ]
+    try:
+        for next_event in asyncio.as_completed([complete(model_id) for model_id in request.model_ids]):
+            event = await next_event
+            yield event.model_dump_json() + "\n"
+    finally:
+        for cancel_event in cancel_events.values():
+            cancel_event.set()
 
-            # Insert both messages in one query
-            inserted_messages = insert_chat_messages(conn, messages_data)
 
-            # Convert inserted messages to Pydantic models
-            messages = [MessageResponse(**msg) for msg in inserted_messages]
+@router.post(
+    "/compare/",
+    status_code=status.HTTP_200_OK,
+    description="Send one user turn to several models at once, streams NDJSON as replies complete",
+)
+async def compare_models(request: CompareModelsRequest, current_user: str = Depends(get_current_user)):
+    """
+    Stores the user message once, then one sibling assistant message per model.
+    The first reply to complete becomes the active branch, the others can be
+    switched to. The conversation's current model is left unchanged.
+    """
+    if len(request.model_ids) > MAX_COMPARE_MODELS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_COMPARE_MODELS} models can be compared at once"
+        )
 
+    try:
+        with PostgresConnection() as conn:
+            chat_record = select_chat_context_by_id(conn, request.conversation_id, current_user)
+            if not chat_record:
+                raise HTTPException(status_code=404, detail="Conversation not found")
+
+            chat_history = chat_record["messages"]
+            chat_history.append({"role": USER_ROLE, "content": request.content})
+            persona_id = chat_record["persona_id"]
+
+            estimated_tokens = prompt_registry.estimate_prompt_tokens(persona_id, chat_history)
+            enforce_rate_limits(current_user, request.model_ids, estimated_tokens)
+
+            inserted = insert_chat_messages(
+                conn,
+                [(request.conversation_id, USER_ROLE, None, request.content)],
+                parent_message_id=chat_record["leaf_message_id"],
+            )
+            user_message = MessageResponse(**inserted[0])
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(
-            f"Error in creating message for conversation {request.conversation_id}: {e}",
+            f"Error starting model comparison for conversation {request.conversation_id}: {e}",
             exc_info=True,
         )
-        raise HTTPException(
-            status_code=500, detail="Failed to process message creation"
+        raise HTTPException(status_code=500, detail="Failed to start model comparison")
+
+    return StreamingResponse(
+        compare_ndjson(
+            request, user_message, chat_history, persona_id, estimated_tokens, current_user
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.post(
+    "/{chat_id}/messages/{message_id}/regenerate/",
+    response_model=List[MessageResponse],
+    status_code=status.HTTP_201_CREATED,
+    description="Generate a new reply as a sibling of an assistant message",
+)
+async def regenerate_message(
+    chat_id: UUID,
+    message_id: int,
+    request: RegenerateMessageRequest,
+    http_request: Request,
+    current_user: str = Depends(get_current_user),
+):
+    """
+    The new reply answers the same user message and becomes the active branch;
+    the old one stays available as a sibling.
+    """
+    try:
+        with PostgresConnection() as conn:
+            message = select_message(conn, chat_id, current_user, message_id)
+            if not message:
+                raise HTTPException(status_code=404, detail="Message not found")
+            if message["role"] != ASSISTANT_ROLE or message["parent_message_id"] is None:
+                raise HTTPException(status_code=400, detail="Only assistant replies can be regenerated")
+
+            context = select_chat_context_by_id(
+                conn, chat_id, current_user, from_message_id=message["parent_message_id"]
+            )
+
+        model_id = request.model_id or message["current_model_id"]
+        estimated_tokens = prompt_registry.estimate_prompt_tokens(
+            message["persona_id"], context["messages"]
+        )
+        enforce_rate_limit(current_user, model_id, estimated_tokens)
+
+        messages = await generate_turn(
+            http_request,
+            current_user,
+            chat_id,
+            model_id,
+            message["persona_id"],
+            context["messages"],
+            estimated_tokens,
+            parent_message_id=message["parent_message_id"],
+        )
+        if messages is None:
+            return Response(status_code=499)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error regenerating message {message_id} in chat {chat_id}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to regenerate message")
+
+    return messages
+
+
+@router.post(
+    "/{chat_id}/messages/{message_id}/edit/",
+    response_model=List[MessageResponse],
+    status_code=status.HTTP_201_CREATED,
+    description="Edit a user message as a new branch and get a reply to it",
+)
+async def edit_message(
+    chat_id: UUID,
+    message_id: int,
+    request: EditMessageRequest,
+    http_request: Request,
+    current_user: str = Depends(get_current_user),
+):
+    """
+    The edited message is stored as a sibling of the original, so the original
+    and everything after it stay available as another branch.
+    """
+    try:
+        with PostgresConnection() as conn:
+            message = select_message(conn, chat_id, current_user, message_id)
+            if not message:
+                raise HTTPException(status_code=404, detail="Message not found")
+            if message["role"] != USER_ROLE:
+                raise HTTPException(status_code=400, detail="Only user messages can be edited")
+
+            chat_history = []
+            if message["parent_message_id"] is not None:
+                context = select_chat_context_by_id(
+                    conn, chat_id, current_user, from_message_id=message["parent_message_id"]
+                )
+                chat_history = context["messages"]
+
+        chat_history.append({"role": USER_ROLE, "content": request.content})
+
+        model_id = request.model_id or message["current_model_id"]
+        estimated_tokens = prompt_registry.estimate_prompt_tokens(
+            message["persona_id"], chat_history
+        )
+        enforce_rate_limit(current_user, model_id, estimated_tokens)
+
+        messages = await generate_turn(
+            http_request,
+            current_user,
+            chat_id,
+            model_id,
+            message["persona_id"],
+            chat_history,
+            estimated_tokens,
+            parent_message_id=message["parent_message_id"],
+            user_content=request.content,
         )
+        if messages is None:
+            return Response(status_code=499)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error editing message {message_id} in chat {chat_id}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to edit message")
 
     return messages
 
 
+@router.put(
+    "/{chat_id}/branch/",
+    response_model=ActiveBranchResponse,
+    status_code=status.HTTP_200_OK,
+    description="Switch the branch a chat shows and continues from",
+)
+async def switch_branch(
+    chat_id: UUID,
+    request: SwitchBranchRequest,
+    current_user: str = Depends(get_current_user),
+):
+    try:
+        with PostgresConnection() as conn:
+            leaf_id = update_active_branch(conn, chat_id, current_user, request.message_id)
+    except Exception as e:
+        logger.error(f"Error switching branch of chat {chat_id}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to switch branch")
+
+    if leaf_id is None:
+        raise HTTPException(status_code=404, detail="Message not found")
+
+    return ActiveBranchResponse(conversation_id=chat_id, active_leaf_message_id=leaf_id)
+
+
+def stream_chat_ndjson(chat_id: UUID, user_id: str, header: str) -> Iterator[str]:
+    """
+    NDJSON body for a streamed chat: the conversation header line, then one line per message.
+    Runs in Starlette's threadpool and holds its own connection for the lifetime of
+    the stream; send it through iterate_closing so the connection goes back to the
+    pool when the client disconnects.
+    """
+    yield header + "\n"
+    with ReadConnection(user_id) as conn:
+        for line in stream_chat_messages(conn, chat_id, user_id):
+            yield line + "\n"
+
+
 @router.get(
     "/{chat_id}/", status_code=status.HTTP_200_OK, description="Get whole chat by ID"
 )
-async def get_chat_by(chat_id: UUID):
+async def get_chat_by(
+    chat_id: UUID,
+    before: Optional[int] = Query(default=None, description="Only messages with message_id lower than this"),
+    after: Optional[int] = Query(default=None, description="Only messages with message_id higher than this"),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_CHAT_PAGE_SIZE),
+    stream: bool = Query(default=False, description="Stream the whole chat as NDJSON"),
+    current_user: str = Depends(get_current_user),
+):
+    """
+    Without paging parameters the whole chat is returned in one JSON document.
+    With `limit`, `before` or `after` one keyset page is returned (latest messages by default).
+    With `stream=true` the chat is streamed as NDJSON from a server-side cursor.
+    """
+    paginated = limit is not None or before is not None or after is not None
+
+    def read_chat(conn) -> Optional[str]:
+        if stream:
+            return select_chat_header_by_id(conn, chat_id, current_user)
+        if paginated:
+            return select_chat_page_by_id(
+                conn,
+                chat_id,
+                current_user,
+                limit or DEFAULT_CHAT_PAGE_SIZE,
+                before=before,
+                after=after,
+            )
+        return select_chat_by_id(conn, chat_id, current_user)
+
     try:
-        with PostgresConnection() as conn:
-            chat = select_chat_by_id(conn, chat_id)
+        try:
+            with ReadConnection(current_user) as conn:
+                chat = read_chat(conn)
+        except ConversationArchived:
+            # Rehydrating writes, so it happens on the primary
+            with PostgresConnection() as conn:
+                chat = read_chat(conn)
+            replica_router.note_write(current_user)
     except Exception as e:
         logger.error(
             f"Database error when retrieving chat {chat_id}: {e}", exc_info=True
@@ -185,7 +664,14 @@ async def get_chat_by(chat_id: UUID):
         logger.info(f"Chat {chat_id} not found")
         raise HTTPException(status_code=404, detail="Chat not found")
 
-    return chat
+    if stream:
+        return StreamingResponse(
+            iterate_closing(stream_chat_ndjson(chat_id, current_user, chat)),
+            media_type="application/x-ndjson",
+        )
+
+    # The chat is JSON text built by Postgres, send it through untouched
+    return RawJSONResponse(content=chat)
 
 
 @router.put(
@@ -194,16 +680,24 @@ async def get_chat_by(chat_id: UUID):
     status_code=status.HTTP_200_OK,
     description="Update chat title",
 )
-async def update_chat_title(chat_id: UUID, request: UpdateChatTitleRequest):
+async def update_chat_title(
+    chat_id: UUID,
+    request: UpdateChatTitleRequest,
+    current_user: str = Depends(get_current_user),
+):
     try:
         with PostgresConnection() as conn:
-            updated_record = update_chat_title_query(conn, chat_id, request.new_title)
+            updated_record = update_chat_title_query(
+                conn, chat_id, current_user, request.new_title
+            )
             if not updated_record:
                 logger.info(f"Chat {chat_id} not found for title update")
                 raise HTTPException(status_code=404, detail="Chat not found")
 
         response = UpdateChatTitleResponse(**updated_record)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error updating chat title for {chat_id}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to update chat title")
@@ -216,14 +710,16 @@ async def update_chat_title(chat_id: UUID, request: UpdateChatTitleRequest):
     status_code=status.HTTP_204_NO_CONTENT,
     description="Delete chat by ID",
 )
-async def delete_chat(chat_id: UUID):
+async def delete_chat(chat_id: UUID, current_user: str = Depends(get_current_user)):
     try:
         with PostgresConnection() as conn:
-            deleted = delete_chat_query(conn, chat_id)
+            deleted = delete_chat_query(conn, chat_id, current_user)
             if not deleted:
                 logger.info(f"Chat {chat_id} not found for deletion")
                 raise HTTPException(status_code=404, detail="Chat not found")
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error deleting chat {chat_id}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to delete chat")
@@ -239,16 +735,18 @@ async def get_user_global_chats(
     user_id: UUID,
     limit: int = Query(default=10, ge=1),
     offset: int = Query(default=0, ge=0),
+    current_user: str = Depends(get_current_user),
 ):
     """
     Return paginated conversations for a given user,
     along with the total_count in the same response.
     """
+    ensure_current_user(user_id, current_user)
     try:
         # Using a context manager for a synchronous DB connection
-        with PostgresConnection() as conn:
+        with ReadConnection(current_user) as conn:
             result = select_user_chat_titles_and_count_single_row(
-                conn, user_id, limit, offset
+                conn, current_user, limit, offset
             )
     except Exception as e:
         logger.error(f"DB error fetching chats for user {user_id}: {e}", exc_info=True)
@@ -3,4 +3,27 @@ ASSISTANT_ROLE = 'assistant'
 SYSTEM_ROLE = 'system'
 
 # llama3-8b model
-DEFAULT_MODEL = '55555555-5555-5555-5555-555555555555'
\ No newline at end of file
+DEFAULT_MODEL = '55555555-5555-5555-5555-555555555555'
+
+# Title of a new chat until the background title job replaces it
+DEFAULT_CHAT_TITLE = 'New Chat'
+
+# Keyset pagination of chat messages
+DEFAULT_CHAT_PAGE_SIZE = 50
+MAX_CHAT_PAGE_SIZE = 500
+
+# Models one compare request can fan out to
+MAX_COMPARE_MODELS = 4
+
+# Seconds between client disconnect checks while waiting for a reply
+DISCONNECT_POLL_SECONDS = 0.5
+
+# Usage reports
+DEFAULT_USAGE_REPORT_DAYS = 30
+MAX_USAGE_REPORT_DAYS = 366
+
+# Rows fetched per round trip while streaming an export
+EXPORT_BATCH_SIZE = 1000
+
+# Largest import request body, as uploaded (compressed or not)
+MAX_IMPORT_BYTES = 2 * 1024 * 1024 * 1024
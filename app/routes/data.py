@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import tempfile
+from datetime import datetime, timezone
+from typing import BinaryIO, Dict, Iterator
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+
+from app.auth.dependencies import get_current_user, track_user_writes
+from app.custom_exceptions import ImportRejected, WorkspaceLimitExceeded
+from app.database.connection import PostgresConnection
+from app.database.export_queries import stream_user_export
+from app.database.import_queries import import_ndjson
+from app.database.replicas import ReadConnection
+from app.responses import iterate_closing
+from app.routes.constant import EXPORT_BATCH_SIZE, MAX_IMPORT_BYTES
+from app.schemas.data import Compression, ImportResponse
+from app.services.ndjson import compression_available, encode_lines, open_lines
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/data", tags=["data"], dependencies=[Depends(track_user_writes)])
+
+EXPORT_MEDIA_TYPES = {
+    Compression.NONE: ("application/x-ndjson", "ndjson"),
+    Compression.GZIP: ("application/gzip", "ndjson.gz"),
+    Compression.ZSTD: ("application/zstd", "ndjson.zst"),
+}
+
+
+def export_lines(user_id: str) -> Iterator[str]:
+    # A dedicated connection: an export can outlast many requests' worth of pool slots
+    with ReadConnection(user_id, pooled=False) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ;")
+        try:
+            yield from stream_user_export(conn, user_id, EXPORT_BATCH_SIZE)
+        except Exception as e:
+            # Headers are already sent, the client sees a truncated body
+            logger.error(f"Export for user {user_id} failed mid-stream: {e}", exc_info=True)
+            raise
+
+
+@router.get(
+    "/export/",
+    status_code=status.HTTP_200_OK,
+    description="Stream all of the user's workspaces, folders, chats and messages as NDJSON",
+)
+async def export_data(
+    compression: Compression = Query(default=Compression.NONE),
+    current_user: str = Depends(get_current_user),
+):
+    """
+    One JSON object per line, each with a "type": a header, then workspaces,
+    folders, every conversation followed by its messages, and an "end" line
+    with the number of lines in between, missing if the stream broke off. Read from one
+    snapshot and streamed as it is read, so any account size is exported in
+    constant memory.
+    """
+    if not compression_available(compression):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{compression.value} compression is not available on this server"
+        )
+
+    media_type, extension = EXPORT_MEDIA_TYPES[compression]
+    filename = f"llm-labs-export-{datetime.now(timezone.utc):%Y%m%d%H%M%S}.{extension}"
+    return StreamingResponse(
+        iterate_closing(encode_lines(export_lines(current_user), compression)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def import_file(user_id: str, upload: BinaryIO) -> Dict[str, int]:
+    with PostgresConnection() as conn:
+        return import_ndjson(conn, user_id, open_lines(upload))
+
+
+@router.post(
+    "/import/",
+    response_model=ImportResponse,
+    status_code=status.HTTP_201_CREATED,
+    description="Import workspaces, folders, chats and messages from an NDJSON export",
+)
+async def import_data(request: Request, current_user: str = Depends(get_current_user)):
+    """
+    The request body is an export file (plain, gzip or zstd). Everything in it
+    is added to the current user's account under new ids, all or nothing.
+    The body is spooled to disk first, then loaded with COPY in one transaction.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as upload:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > MAX_IMPORT_BYTES:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Import files are limited to {MAX_IMPORT_BYTES} bytes"
+                )
+            upload.write(chunk)
+        upload.seek(0)
+
+        try:
+            counts = await asyncio.to_thread(import_file, current_user, upload)
+        except (ImportRejected, WorkspaceLimitExceeded) as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        except Exception as e:
+            logger.error(f"Error importing data for user {current_user}: {e}", exc_info=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to import data"
+            )
+
+    return ImportResponse(**counts)
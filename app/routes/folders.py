@@ -1,18 +1,25 @@
 import logging
 from typing import List
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse
 
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import ensure_current_user, get_current_user, track_user_writes
 from app.database.connection import PostgresConnection
+from app.database.replicas import ReadConnection
+from app.database.job_queries import enqueue_job
+from app.responses import RawJSONResponse
 from app.database.folder_queries import create_folder_query, delete_folder_query, get_user_global_folders_query
 from app.schemas.folders import CreateFolderRequest, DeleteFolderRequest, FolderInfo, FolderResponse
-from app.schemas.movements import LocationType
+from app.schemas.jobs import JobResponse
+from app.schemas.movements import ItemType, LocationType
+from app.schemas.workspaces import DeletionMode
+from app.services.constants import JOB_KIND_BULK_DELETE, JOB_PRIORITY_LOW
 
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/folders", tags=["folders"], dependencies=[Depends(get_current_user)])
+router = APIRouter(prefix="/api/folders", tags=["folders"], dependencies=[Depends(track_user_writes)])
 
 
 @router.post(
@@ -21,11 +28,12 @@ router = APIRouter(prefix="/api/folders", tags=["folders"], dependencies=[Depend
     status_code=status.HTTP_201_CREATED,
     description='Creates a new folder in either a workspace or global space, if global the id will be NULL'
 )
-async def create_folder(request: CreateFolderRequest):
+async def create_folder(request: CreateFolderRequest, current_user: str = Depends(get_current_user)):
     """
     Create a new folder in either a workspace or global space.
     Folders cannot be created inside other folders.
     """
+    ensure_current_user(request.user_id, current_user)
     try:
         with PostgresConnection() as conn:
             # Validate location type
@@ -38,10 +46,15 @@ async def create_folder(request: CreateFolderRequest):
             folder = create_folder_query(
                 conn=conn,
                 name=request.name,
-                user_id=request.user_id,
+                user_id=current_user,
                 location_type=request.location.type,
                 workspace_id=request.location.id  # Will be None for global space
             )
+            if not folder:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Workspace not found for the user",
+                )
             
             return FolderResponse(**folder)
     
@@ -64,7 +77,9 @@ async def create_folder(request: CreateFolderRequest):
 )
 async def delete_folder(
     folder_id: UUID,
-    request: DeleteFolderRequest
+    request: DeleteFolderRequest,
+    background: bool = Query(default=False, description="Run the deletion as a background job and return 202 with the job"),
+    current_user: str = Depends(get_current_user),
 ):
     """
     Delete a folder with specified deletion mode:
@@ -75,13 +90,34 @@ async def delete_folder(
     try:
         # Use default mode if request not provided
         mode = request.mode if request else DeletionMode.ARCHIVE
+
+        if background:
+            with PostgresConnection() as conn:
+                job = enqueue_job(
+                    conn,
+                    JOB_KIND_BULK_DELETE,
+                    {"item_type": ItemType.FOLDER.value, "item_id": str(folder_id), "mode": mode.value},
+                    user_id=current_user,
+                    priority=JOB_PRIORITY_LOW,
+                )
+            return ORJSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content=JobResponse(**job).model_dump(mode="json"),
+            )
         
         with PostgresConnection() as conn:
-            delete_folder_query(
+            deleted = delete_folder_query(
                 conn=conn,
                 folder_id=folder_id,
+                user_id=current_user,
                 mode=mode
             )
+
+        if not deleted:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Folder not found"
+            )
             
     except HTTPException:
         raise
@@ -101,18 +137,20 @@ async def delete_folder(
 )
 async def get_user_global_folders(
     user_id: UUID,
+    current_user: str = Depends(get_current_user),
 ) -> List[FolderInfo]:
     """
     Retrieves all personal folders and their conversations for the specified user.
     These are folders that don't belong to any workspace.
     """
+    ensure_current_user(user_id, current_user)
     try:
-        with PostgresConnection() as conn:
+        with ReadConnection(current_user) as conn:
             folders = get_user_global_folders_query(
                 conn=conn,
-                user_id=user_id
+                user_id=current_user
             )
-            return folders
+            return RawJSONResponse(content=folders)
             
     except HTTPException:
         raise
@@ -0,0 +1,35 @@
+import logging
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.auth.dependencies import get_current_user
+from app.database.connection import PostgresConnection
+from app.database.job_queries import select_job_for_user
+from app.schemas.jobs import JobStatusResponse
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"], dependencies=[Depends(get_current_user)])
+
+
+@router.get(
+    "/{job_id}",
+    response_model=JobStatusResponse,
+    status_code=status.HTTP_200_OK,
+    description="Get the status and result of a background job",
+)
+async def get_job_status(job_id: int, current_user: str = Depends(get_current_user)):
+    try:
+        with PostgresConnection() as conn:
+            job = select_job_for_user(conn, job_id, current_user)
+    except Exception as e:
+        logger.error(f"Error retrieving job {job_id}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve job"
+        )
+
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+
+    return JobStatusResponse(**job)
@@ -5,9 +5,11 @@ from fastapi.security import HTTPBearer
 
 
 from app.auth.dependencies import get_current_user
-from app.database.connection import PostgresConnection
+from app.database.replicas import ReadConnection
 from app.database.model_queries import get_all_models
-from app.schemas.models import ModelInfo
+from app.schemas.models import CancellationStats, ModelInfo, PromptCacheStats
+from app.services.cancellation import cancellation_stats
+from app.services.prompt_assembly import prompt_cache_stats
 
 
 logger = logging.getLogger(__name__)
@@ -24,7 +26,7 @@ router = APIRouter(prefix="/api/models", tags=["models"], dependencies=[Depends(
 def list_models():
     """List all available models."""
     try:
-        with PostgresConnection() as conn:
+        with ReadConnection() as conn:
             rows = get_all_models(conn)
     except Exception as e:
         logger.critical(f"Database error when retrieving models: {e}", exc_info=True)
@@ -35,3 +37,25 @@ def list_models():
     models = [ModelInfo(**rows) for rows in rows]
 
     return models
+
+
+@router.get(
+    "/prompt-cache/",
+    response_model=List[PromptCacheStats],
+    status_code=status.HTTP_200_OK,
+    description="Cached vs uncached prompt tokens per model, for this server process",
+)
+def get_prompt_cache_stats():
+    """Provider prompt cache usage since the process started."""
+    return prompt_cache_stats.snapshot()
+
+
+@router.get(
+    "/cancellations/",
+    response_model=List[CancellationStats],
+    status_code=status.HTTP_200_OK,
+    description="Replies cancelled on client disconnect per model, for this server process",
+)
+def get_cancellation_stats():
+    """Cancelled replies and the completion tokens they are estimated to have saved."""
+    return cancellation_stats.snapshot()
@@ -1,6 +1,6 @@
 import logging
 from fastapi import APIRouter, Depends, HTTPException, status
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_user, track_user_writes
 from app.custom_exceptions import MovementError
 from app.database.connection import PostgresConnection
 
@@ -8,7 +8,7 @@ from app.database.movement_queries import move_item
 from app.schemas.movements import MoveRequest, MoveResponse
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/api/move", tags=["movement"], dependencies=[Depends(get_current_user)])
+router = APIRouter(prefix="/api/move", tags=["movement"], dependencies=[Depends(track_user_writes)])
 
 @router.post(
     "/",
@@ -16,7 +16,7 @@ router = APIRouter(prefix="/api/move", tags=["movement"], dependencies=[Depends(
     description="Move an item (chat or folder) to a new location",
     status_code=status.HTTP_201_CREATED,
 )
-async def move_item_route(request: MoveRequest):
+async def move_item_route(request: MoveRequest, current_user: str = Depends(get_current_user)):
     """
     Handles the movement of items (chats or folders) between different locations.
     This endpoint orchestrates the movement process by:
@@ -27,12 +27,13 @@ async def move_item_route(request: MoveRequest):
     try:
         # Establish database connection using context manager
         with PostgresConnection() as conn:
-            # The move_item function will handle getting the current location
-            # and performing the move in a single operation
+            # The move_item function will handle getting the current location,
+            # checking ownership and performing the move in a single statement
             new_location, previous_location = move_item(
                 conn=conn,
                 item_type=request.item_type,
                 item_id=request.item_id,
+                user_id=current_user,
                 destination=request.destination
             )
             
@@ -0,0 +1,31 @@
+import logging
+from typing import List
+from fastapi import APIRouter, Depends, status
+
+from app.auth.dependencies import get_current_user
+from app.schemas.personas import PersonaInfo
+from app.services.prompt_registry import prompt_registry
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/personas", tags=["personas"], dependencies=[Depends(get_current_user)])
+
+
+@router.get(
+    "/",
+    response_model=List[PersonaInfo],
+    status_code=status.HTTP_200_OK,
+    description="List the system prompt personas a chat can be created with",
+)
+def list_personas():
+    """List all personas with their system prompt token counts."""
+    return [
+        PersonaInfo(
+            persona_id=persona.persona_id,
+            name=persona.name,
+            description=persona.description,
+            token_count=persona.token_count,
+        )
+        for persona in prompt_registry.all()
+    ]
@@ -0,0 +1,76 @@
+import logging
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.auth.dependencies import get_current_user, track_user_writes
+from app.custom_exceptions import QuizPipelineError
+from app.database.connection import PostgresConnection
+from app.database.job_queries import enqueue_job
+from app.schemas.jobs import JobResponse
+from app.schemas.quizzes import CreateQuizRequest, QuizResponse
+from app.services.constants import JOB_KIND_QUIZ_PIPELINE, JOB_PRIORITY_NORMAL
+from app.services.quiz_pipeline import CheckpointStore, QuizPipeline, quiz_checkpoint_scope
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/quizzes", tags=["quizzes"], dependencies=[Depends(track_user_writes)])
+
+
+@router.post(
+    "/",
+    response_model=QuizResponse,
+    status_code=status.HTTP_201_CREATED,
+    description="Generate a quiz with the research, question, distractor, quality check and formatter agents",
+)
+async def create_quiz(request: CreateQuizRequest, current_user: str = Depends(get_current_user)):
+    try:
+        checkpoints = CheckpointStore() if request.use_checkpoints else None
+        pipeline = QuizPipeline(checkpoints=checkpoints)
+        state = await pipeline.run(
+            request.topic,
+            request.num_questions,
+            checkpoint_scope=quiz_checkpoint_scope(current_user, request.topic, request.num_questions),
+        )
+    except QuizPipelineError as e:
+        logger.error(f"Quiz pipeline failed: {e.message}")
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=e.message)
+    except Exception as e:
+        logger.error(f"Unexpected error during quiz generation: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to generate quiz"
+        )
+
+    return QuizResponse(
+        final_quiz=state["final_quiz"],
+        questions=state["quiz_with_distractors"],
+        quality_check_results=state["quality_check_results"],
+        timings=state["timings"],
+        checkpoint_hits=state["checkpoint_hits"],
+    )
+
+
+@router.post(
+    "/jobs/",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    description="Queue quiz generation as a background job, poll /api/jobs/{job_id} for the quiz",
+)
+async def create_quiz_job(request: CreateQuizRequest, current_user: str = Depends(get_current_user)):
+    try:
+        with PostgresConnection() as conn:
+            job = enqueue_job(
+                conn,
+                JOB_KIND_QUIZ_PIPELINE,
+                request.model_dump(),
+                user_id=current_user,
+                priority=JOB_PRIORITY_NORMAL,
+            )
+    except Exception as e:
+        logger.error(f"Error queueing quiz job: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to queue quiz generation"
+        )
+
+    return JobResponse(**job)
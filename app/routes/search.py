@@ -0,0 +1,85 @@
+import logging
+from typing import Optional, Tuple
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.auth.dependencies import get_current_user
+from app.database.replicas import ReadConnection
+from app.database.search_queries import search_user_chats_query
+from app.schemas.search import SearchHit, SearchResponse
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/search", tags=["search"], dependencies=[Depends(get_current_user)])
+
+
+def encode_cursor(rank: float, hit_key: str) -> str:
+    return f"{rank!r}|{hit_key}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        rank, hit_key = cursor.split("|", 1)
+        return float(rank), hit_key
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+@router.get(
+    "/",
+    response_model=SearchResponse,
+    status_code=status.HTTP_200_OK,
+    description=(
+        "Full-text search over the user's chat titles and messages. Archived chats match on "
+        "their title only: their messages are searchable again once the chat is opened"
+    ),
+)
+async def search_chats(
+    q: str = Query(..., min_length=1, max_length=256),
+    workspace_id: Optional[UUID] = Query(default=None),
+    folder_id: Optional[UUID] = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=50),
+    cursor: Optional[str] = Query(default=None),
+    current_user: str = Depends(get_current_user),
+):
+    """
+    Ranked search results with highlighted snippets, best first.
+    Follow `next_cursor` for further pages. Archived conversations keep their
+    title in `conversations` but not their rows in `messages`, so only their
+    title can match until they are rehydrated.
+    """
+    after_rank, after_key = decode_cursor(cursor) if cursor else (None, None)
+
+    try:
+        with ReadConnection(current_user) as conn:
+            rows = search_user_chats_query(
+                conn,
+                current_user,
+                q,
+                limit,
+                workspace_id=workspace_id,
+                folder_id=folder_id,
+                after_rank=after_rank,
+                after_key=after_key,
+            )
+    except Exception as e:
+        logger.error(f"Error searching chats: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to search chats"
+        )
+
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor(last["rank"], last["hit_key"])
+
+    return SearchResponse(
+        results=[SearchHit(**row) for row in page],
+        next_cursor=next_cursor,
+    )
@@ -0,0 +1,86 @@
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.auth.dependencies import get_current_user
+from app.database.archive_queries import select_storage_metrics
+from app.database.replicas import ReadConnection
+from app.database.usage_queries import select_user_usage
+from app.routes.constant import DEFAULT_USAGE_REPORT_DAYS, MAX_USAGE_REPORT_DAYS
+from app.schemas.usage import StorageMetrics, UsageReport, UsageRow, UsageTotals
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/usage", tags=["usage"], dependencies=[Depends(get_current_user)])
+
+
+@router.get(
+    "/",
+    response_model=UsageReport,
+    status_code=status.HTTP_200_OK,
+    description="Token usage and cost per model and day for the current user",
+)
+async def get_usage_report(
+    start: Optional[date] = Query(default=None),
+    end: Optional[date] = Query(default=None),
+    current_user: str = Depends(get_current_user),
+):
+    """
+    Daily usage between start and end (inclusive, UTC days), the last
+    DEFAULT_USAGE_REPORT_DAYS by default. The newest usage can take up to
+    one accumulator flush interval to show up.
+    """
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=DEFAULT_USAGE_REPORT_DAYS - 1)
+    if start > end or (end - start).days >= MAX_USAGE_REPORT_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"start must be before end and cover at most {MAX_USAGE_REPORT_DAYS} days"
+        )
+
+    try:
+        with ReadConnection(current_user) as conn:
+            rows = select_user_usage(conn, current_user, start, end)
+    except Exception as e:
+        logger.error(f"Error retrieving usage for user {current_user}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve usage"
+        )
+
+    days = [UsageRow(**row) for row in rows]
+    totals = UsageTotals()
+    for row in days:
+        totals.requests += row.requests
+        totals.prompt_tokens += row.prompt_tokens
+        totals.completion_tokens += row.completion_tokens
+        totals.cached_tokens += row.cached_tokens
+        totals.cost_usd += row.cost_usd
+
+    return UsageReport(start=start, end=end, totals=totals, days=days)
+
+
+@router.get(
+    "/storage/",
+    response_model=StorageMetrics,
+    status_code=status.HTTP_200_OK,
+    description="Size of the current user's hot and archived conversation storage",
+)
+async def get_storage_metrics(current_user: str = Depends(get_current_user)):
+    """
+    Message counts and sizes of the user's hot conversations and of their
+    conversations archived to compressed storage.
+    """
+    try:
+        with ReadConnection(current_user) as conn:
+            metrics = select_storage_metrics(conn, current_user)
+    except Exception as e:
+        logger.error(f"Error retrieving storage metrics for user {current_user}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve storage metrics"
+        )
+
+    return StorageMetrics(**metrics)
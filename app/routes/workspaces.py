@@ -1,10 +1,15 @@
 import logging
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse
 
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import ensure_current_user, get_current_user, track_user_writes
 from app.custom_exceptions import WorkspaceLimitExceeded
 from app.database.connection import PostgresConnection
+from app.database.replicas import ReadConnection
+from app.database.job_queries import enqueue_job
+from app.responses import RawJSONResponse
+from app.schemas.jobs import JobResponse
 from app.database.workspace_queries import (
     create_workspace_query,
     delete_workspace_query,
@@ -20,12 +25,13 @@ from app.schemas.workspaces import (
     WorkspaceFoldersResponse,
     WorkspaceResponse,
 )
+from app.services.constants import JOB_KIND_BULK_DELETE, JOB_PRIORITY_LOW
 
 
 logger = logging.getLogger(__name__)
 
 
-router = APIRouter(prefix="/api/workspaces", tags=["workspaces"], dependencies=[Depends(get_current_user)])
+router = APIRouter(prefix="/api/workspaces", tags=["workspaces"], dependencies=[Depends(track_user_writes)])
 
 
 @router.post(
@@ -34,10 +40,11 @@ router = APIRouter(prefix="/api/workspaces", tags=["workspaces"], dependencies=[
     status_code=status.HTTP_201_CREATED, 
     description='Creates a new workspace'
 )
-async def create_workspace(request: CreateWorkspaceRequest):
+async def create_workspace(request: CreateWorkspaceRequest, current_user: str = Depends(get_current_user)):
+    ensure_current_user(request.user_id, current_user)
     try:
         with PostgresConnection() as conn:
-            workspace = create_workspace_query(conn, request.user_id, request.name)
+            workspace = create_workspace_query(conn, current_user, request.name)
     except WorkspaceLimitExceeded as e:
         # Return a 400 Bad Request error if the workspace limit is exceeded.
         raise HTTPException(status_code=400, detail=e.message)
@@ -53,10 +60,11 @@ async def create_workspace(request: CreateWorkspaceRequest):
     response_model=UserWorkspacesResponse,
     description="Get all workspaces for a user"
 )
-async def get_user_workspaces(user_id: UUID):
+async def get_user_workspaces(user_id: UUID, current_user: str = Depends(get_current_user)):
+    ensure_current_user(user_id, current_user)
     try:
-        with PostgresConnection() as conn:
-            workspaces = get_user_workspaces_query(conn, user_id)
+        with ReadConnection(current_user) as conn:
+            workspaces = get_user_workspaces_query(conn, current_user)
         return UserWorkspacesResponse(workspaces=workspaces)
             
     except Exception as e:
@@ -73,13 +81,30 @@ async def get_user_workspaces(user_id: UUID):
 )
 async def delete_workspace(
     workspace_id: UUID,
-    request: DeleteWorkspaceRequest
+    request: DeleteWorkspaceRequest,
+    background: bool = Query(default=False, description="Run the deletion as a background job and return 202 with the job"),
+    current_user: str = Depends(get_current_user),
 ):
     try:
+        if background:
+            with PostgresConnection() as conn:
+                job = enqueue_job(
+                    conn,
+                    JOB_KIND_BULK_DELETE,
+                    {"item_type": "workspace", "item_id": str(workspace_id), "mode": request.mode.value},
+                    user_id=current_user,
+                    priority=JOB_PRIORITY_LOW,
+                )
+            return ORJSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content=JobResponse(**job).model_dump(mode="json"),
+            )
+
         with PostgresConnection() as conn:
             workspace_existed = delete_workspace_query(
                 conn, 
                 workspace_id, 
+                current_user,
                 request.mode
             )
             
@@ -104,10 +129,10 @@ async def delete_workspace(
     response_model=WorkspaceChats,
     description="Retrieves all chats within a workspace."
 )
-async def get_workspace_chats(workspace_id: UUID):
+async def get_workspace_chats(workspace_id: UUID, current_user: str = Depends(get_current_user)):
     try:
-        with PostgresConnection() as conn:
-            result = get_workspace_chats_query(conn, workspace_id)
+        with ReadConnection(current_user) as conn:
+            result = get_workspace_chats_query(conn, workspace_id, current_user)
             
             if not result:
                 raise HTTPException(
@@ -115,7 +140,7 @@ async def get_workspace_chats(workspace_id: UUID):
                     detail="Workspace not found"
                 )
             
-            return WorkspaceChats(**result)
+            return RawJSONResponse(content=result)
             
     except HTTPException:
         raise
@@ -132,11 +157,11 @@ async def get_workspace_chats(workspace_id: UUID):
     response_model=WorkspaceFoldersResponse,
     description="Retrieve workspace with all folders and their conversations"
 )
-async def get_workspace_folders(workspace_id: UUID):
+async def get_workspace_folders(workspace_id: UUID, current_user: str = Depends(get_current_user)):
     try:
-        with PostgresConnection() as conn:
-            workspace_data = get_workspace_folders_query(conn, workspace_id)
-            return WorkspaceFoldersResponse(**workspace_data)
+        with ReadConnection(current_user) as conn:
+            workspace_data = get_workspace_folders_query(conn, workspace_id, current_user)
+            return RawJSONResponse(content=workspace_data)
             
     except HTTPException:
         raise
@@ -5,7 +5,10 @@ from pydantic import BaseModel, Field, field_validator
 
 # Request model for creating a new chat 
 class CreateChatRequest(BaseModel):
-    user_id: UUID
+    user_id: Optional[UUID] = Field(
+        default=None,
+        description="Optional; the authenticated user is always used and a different id is rejected"
+    )
     model_id: Optional[UUID] = Field(
         default=None,
         description="Defaults to DEFAULT_MODEL if null, otherwise set to model_id"
@@ -14,6 +17,10 @@ class CreateChatRequest(BaseModel):
         default=None,
         description="Defaults to None if chat is in global space, otherwise set to workspace_id"
     )
+    persona_id: Optional[str] = Field(
+        default=None,
+        description="System prompt persona from /api/personas/, defaults to the general assistant"
+    )
     initial_message: str
     
     @field_validator('initial_message')
@@ -31,17 +38,27 @@ class CreateChatRequest(BaseModel):
 # Response model for a single message
 class MessageResponse(BaseModel):
     message_id: int
+    parent_message_id: Optional[int] = None
     conversation_id: UUID
     role: str
     content: str
     model_id: Optional[UUID] = None 
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    truncated: bool = False
 
 # Response model for a chat including its messages
 class CreateChatResponse(BaseModel):
     conversation_id: UUID
     current_model_id: UUID
     workspace_id:  Optional[UUID] = None
+    persona_id: Optional[str] = None
     title: str
+    title_job_id: Optional[int] = Field(
+        default=None,
+        description="Background job generating the real title, poll /api/jobs/{job_id}"
+    )
     messages: List[MessageResponse] = []
 
     
@@ -54,6 +71,63 @@ class CreateMessageRequest(BaseModel):
         description="Defaults to last used model if null, otherwise set to new model_id"
     )
 
+class CompareModelsRequest(BaseModel):
+    conversation_id: UUID
+    content: str
+    model_ids: List[UUID] = Field(..., min_length=2, description="Models to send the same turn to")
+
+    @field_validator('content')
+    @classmethod
+    def validate_content_not_empty(cls, v: str) -> str:
+        v = v.strip()
+        if not v:
+            raise ValueError('Message cannot be empty or contain only whitespace')
+        return v
+
+    @field_validator('model_ids')
+    @classmethod
+    def validate_unique_models(cls, v: List[UUID]) -> List[UUID]:
+        if len(set(v)) != len(v):
+            raise ValueError('model_ids must not contain duplicates')
+        return v
+
+# One NDJSON line of a compare response: the stored user message first,
+# then one reply or error per model in completion order
+class CompareEvent(BaseModel):
+    type: str  # user_message | reply | error
+    model_id: Optional[UUID] = None
+    message: Optional[MessageResponse] = None
+    latency_ms: Optional[int] = None
+    detail: Optional[str] = None
+
+class RegenerateMessageRequest(BaseModel):
+    model_id: Optional[UUID] = Field(
+        default=None,
+        description="Defaults to the conversation's current model"
+    )
+
+class EditMessageRequest(BaseModel):
+    content: str
+    model_id: Optional[UUID] = Field(
+        default=None,
+        description="Defaults to the conversation's current model"
+    )
+
+    @field_validator('content')
+    @classmethod
+    def validate_content_not_empty(cls, v: str) -> str:
+        v = v.strip()
+        if not v:
+            raise ValueError('Message cannot be empty or contain only whitespace')
+        return v
+
+class SwitchBranchRequest(BaseModel):
+    message_id: int = Field(..., description="Any message of the branch to show, usually a sibling")
+
+class ActiveBranchResponse(BaseModel):
+    conversation_id: UUID
+    active_leaf_message_id: int
+
 class ChatTitlesResponse(BaseModel): # not being used
     conversation_id: UUID
     title: str
@@ -68,6 +142,8 @@ class UpdateChatTitleResponse(BaseModel):
 class ChatTitles(BaseModel):
     conversation_id: UUID
     title: str
+    message_count: int = 0
+    last_message_at: Optional[datetime.datetime] = None
 
 class PaginatedChatResponse(BaseModel):
     total_count: int
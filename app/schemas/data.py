@@ -0,0 +1,15 @@
+from enum import Enum
+from pydantic import BaseModel
+
+
+class Compression(str, Enum):
+    NONE = "none"
+    GZIP = "gzip"
+    ZSTD = "zstd"
+
+
+class ImportResponse(BaseModel):
+    workspaces: int
+    folders: int
+    conversations: int
+    messages: int
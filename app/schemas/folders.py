@@ -10,7 +10,10 @@ from app.schemas.movements import Location
 
 class CreateFolderRequest(BaseModel):
     name: str
-    user_id: UUID
+    user_id: Optional[UUID] = Field(
+        default=None,
+        description="Optional; the authenticated user is always used and a different id is rejected"
+    )
     location: Location  # Using your existing Location model
 
 class FolderResponse(BaseModel):
@@ -34,12 +37,15 @@ class DeleteFolderRequest(BaseModel):
 class ChatInFolder(BaseModel):
     conversation_id: UUID
     title: str
+    message_count: int = 0
+    last_message_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
 
 class FolderInfo(BaseModel):  # Renamed from FolderWithChats and removed workspace_id
     folder_id: UUID
     name: str
+    chat_count: int = 0
     created_at: datetime
     updated_at: datetime
     conversations: List[ChatInFolder] = []  # Default empty list
\ No newline at end of file
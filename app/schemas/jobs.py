@@ -0,0 +1,28 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any, Optional
+from pydantic import BaseModel
+
+
+class JobStatus(str, Enum):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+
+class JobResponse(BaseModel):
+    job_id: int
+    kind: str
+    status: JobStatus
+    created_at: datetime
+
+
+class JobStatusResponse(JobResponse):
+    priority: int
+    attempts: int
+    max_attempts: int
+    last_error: Optional[str] = None
+    result: Optional[Any] = None
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
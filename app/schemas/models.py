@@ -4,4 +4,19 @@ from pydantic import BaseModel
 
 class ModelInfo(BaseModel):
     model_id: UUID
-    model_name: str
\ No newline at end of file
+    model_name: str
+
+class PromptCacheStats(BaseModel):
+    model_name: str
+    requests: int
+    prompt_tokens: int
+    cached_tokens: int
+    uncached_tokens: int
+    cache_hit_ratio: float
+
+
+class CancellationStats(BaseModel):
+    model_name: str
+    cancelled: int
+    tokens_before_cancel: int
+    estimated_tokens_saved: int
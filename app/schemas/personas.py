@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+
+class PersonaInfo(BaseModel):
+    persona_id: str
+    name: str
+    description: str
+    token_count: int
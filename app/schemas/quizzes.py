@@ -0,0 +1,27 @@
+from typing import Any, Dict, List
+from pydantic import BaseModel, Field, field_validator
+
+
+class CreateQuizRequest(BaseModel):
+    topic: str = Field(..., max_length=1000, description="What the quiz should be about, including audience or focus if any")
+    num_questions: int = Field(default=10, ge=1, le=50)
+    use_checkpoints: bool = Field(
+        default=True,
+        description="Reuse recent research on the same topic, and resume your own earlier run of the same quiz"
+    )
+
+    @field_validator('topic')
+    @classmethod
+    def validate_topic_not_empty(cls, v: str) -> str:
+        v = v.strip()
+        if not v:
+            raise ValueError('Topic cannot be empty or contain only whitespace')
+        return v
+
+
+class QuizResponse(BaseModel):
+    final_quiz: str = Field(description="Formatted quiz in Markdown")
+    questions: List[Dict[str, Any]] = Field(description="Questions with correct answers and distractors")
+    quality_check_results: List[str] = []
+    timings: Dict[str, float] = Field(description="Seconds spent per stage, plus the total")
+    checkpoint_hits: Dict[str, int] = Field(default={}, description="Calls per stage served from checkpoints")
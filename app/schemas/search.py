@@ -0,0 +1,26 @@
+from enum import Enum
+from uuid import UUID
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class MatchType(str, Enum):
+    TITLE = 'title'
+    MESSAGE = 'message'
+
+
+class SearchHit(BaseModel):
+    conversation_id: UUID
+    message_id: Optional[int] = None  # None for title matches
+    match_type: MatchType
+    title: str
+    snippet: str = Field(description="Matching text with terms wrapped in <mark></mark>")
+    rank: float
+
+
+class SearchResponse(BaseModel):
+    results: List[SearchHit] = []
+    next_cursor: Optional[str] = Field(
+        default=None,
+        description="Pass as `cursor` to fetch the next page, null on the last page"
+    )
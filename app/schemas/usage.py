@@ -0,0 +1,41 @@
+from datetime import date
+from decimal import Decimal
+from typing import List, Optional
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class UsageRow(BaseModel):
+    day: date
+    model_id: UUID
+    model_name: Optional[str] = None
+    requests: int
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+    cost_usd: Decimal
+
+
+class UsageTotals(BaseModel):
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    cost_usd: Decimal = Decimal(0)
+
+
+class UsageReport(BaseModel):
+    start: date
+    end: date
+    totals: UsageTotals
+    days: List[UsageRow]
+
+
+class StorageMetrics(BaseModel):
+    hot_conversations: int
+    hot_messages: int
+    hot_bytes: int
+    cold_conversations: int
+    cold_messages: int
+    cold_raw_bytes: int
+    cold_compressed_bytes: int
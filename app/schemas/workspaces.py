@@ -11,7 +11,10 @@ class WorkspaceBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
 
 class CreateWorkspaceRequest(WorkspaceBase):
-    user_id: UUID
+    user_id: Optional[UUID] = Field(
+        default=None,
+        description="Optional; the authenticated user is always used and a different id is rejected"
+    )
 
 
 class WorkspaceResponse(WorkspaceBase):
@@ -23,6 +26,8 @@ class WorkspaceResponse(WorkspaceBase):
 class WorkspaceChat(BaseModel):
     conversation_id: UUID
     title: str
+    message_count: int = 0
+    last_message_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
     
@@ -30,6 +35,7 @@ class WorkspaceChat(BaseModel):
 class WorkspaceChats(BaseModel):
     workspace_id: UUID
     name: str
+    chat_count: int = 0
     created_at: datetime
     updated_at: datetime
     chats: List[WorkspaceChat] = []  # Default empty list
@@ -38,6 +44,7 @@ class WorkspaceChats(BaseModel):
 class Workspace(BaseModel):
     workspace_id: UUID
     name: str
+    chat_count: int = 0
     created_at: datetime
 
 class UserWorkspacesResponse(BaseModel):
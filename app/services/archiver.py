@@ -0,0 +1,59 @@
+import logging
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from app.database.archive_queries import (
+    compress_payload,
+    insert_conversation_archive,
+    lock_idle_conversation,
+    select_conversation_messages_json,
+    select_idle_conversations,
+)
+from app.database.connection import PostgresConnection
+from app.services.constants import ARCHIVE_BATCH_SIZE, ARCHIVE_IDLE_DAYS
+
+
+logger = logging.getLogger(__name__)
+
+
+def archive_conversation(conversation_id: UUID, idle_days: int = ARCHIVE_IDLE_DAYS) -> Optional[Dict[str, int]]:
+    """
+    Move one conversation's messages into a compressed archive, in one transaction.
+    Skipped (None) if it was archived, deleted or got a new message since it was picked.
+    """
+    with PostgresConnection() as conn:
+        if not lock_idle_conversation(conn, conversation_id, idle_days):
+            return None
+        messages_json, message_count = select_conversation_messages_json(conn, conversation_id)
+        raw = messages_json.encode("utf-8")
+        codec, payload = compress_payload(raw)
+        insert_conversation_archive(conn, conversation_id, codec, payload, len(raw), message_count)
+    return {"messages": message_count, "raw_bytes": len(raw), "compressed_bytes": len(payload)}
+
+
+def archive_idle_conversations(idle_days: int = ARCHIVE_IDLE_DAYS, limit: int = ARCHIVE_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Archive up to `limit` conversations idle for `idle_days`, each in its own
+    short transaction so no lock is held across the batch.
+    """
+    with PostgresConnection() as conn:
+        candidates = select_idle_conversations(conn, idle_days, limit)
+
+    totals = {"conversations": 0, "messages": 0, "raw_bytes": 0, "compressed_bytes": 0, "candidates": len(candidates)}
+    for conversation_id in candidates:
+        try:
+            archived = archive_conversation(conversation_id, idle_days)
+        except Exception as e:
+            logger.error(f"Could not archive conversation {conversation_id}: {e}", exc_info=True)
+            continue
+        if archived is None:
+            continue
+        totals["conversations"] += 1
+        for key, value in archived.items():
+            totals[key] += value
+
+    logger.info(
+        f"Archived {totals['conversations']} conversations, "
+        f"{totals['raw_bytes']} bytes compressed to {totals['compressed_bytes']}"
+    )
+    return totals
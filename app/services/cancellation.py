@@ -0,0 +1,56 @@
+import threading
+from typing import Any, Dict, List
+
+
+class CancellationStats:
+    """
+    Per-model counts of replies cancelled because the client disconnected.
+    Tokens saved are estimated as the model's average completion length
+    (from replies that finished) minus what was generated before cancelling.
+    """
+
+    def __init__(self) -> None:
+        self._models: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, model_name: str) -> Dict[str, int]:
+        return self._models.setdefault(
+            model_name,
+            {
+                "completed": 0,
+                "completion_tokens": 0,
+                "cancelled": 0,
+                "tokens_before_cancel": 0,
+                "estimated_tokens_saved": 0,
+            },
+        )
+
+    def record_completed(self, model_name: str, completion_tokens: int) -> None:
+        with self._lock:
+            stats = self._stats(model_name)
+            stats["completed"] += 1
+            stats["completion_tokens"] += completion_tokens
+
+    def record_cancelled(self, model_name: str, generated_tokens: int) -> None:
+        with self._lock:
+            stats = self._stats(model_name)
+            average = stats["completion_tokens"] // stats["completed"] if stats["completed"] else 0
+            stats["cancelled"] += 1
+            stats["tokens_before_cancel"] += generated_tokens
+            stats["estimated_tokens_saved"] += max(0, average - generated_tokens)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "model_name": model_name,
+                    "cancelled": stats["cancelled"],
+                    "tokens_before_cancel": stats["tokens_before_cancel"],
+                    "estimated_tokens_saved": stats["estimated_tokens_saved"],
+                }
+                for model_name, stats in sorted(self._models.items())
+                if stats["cancelled"]
+            ]
+
+
+cancellation_stats = CancellationStats()
@@ -4,6 +4,8 @@ SERVICE_CONFIG = {
     "openai": {
         "base_url": "https://api.openai.com/v1",
         "api_key_env_var": "OPENAI_API_KEY",
+        "prompt_cache_key": True,  # accepts a prompt_cache_key routing hint
+        "stream_usage": True,  # reports usage on the last chunk with stream_options.include_usage
     },
     "groq": {
         "base_url": "https://api.groq.com/openai/v1",
@@ -12,5 +14,70 @@ SERVICE_CONFIG = {
     "deepseek": {
         "base_url": "https://api.deepseek.com",
         "api_key_env_var": "DEEPSEEK_API_KEY",
+        "stream_usage": True,
     }
-}
\ No newline at end of file
+}
+
+# (service, model_name) candidates per quiz pipeline stage.
+# Fan-out stages spread their per-question calls across all listed providers.
+QUIZ_PIPELINE_MODELS = {
+    "research": [("openai", "gpt-4o-mini")],
+    "questions": [("openai", "gpt-4o-mini")],
+    "distractors": [
+        ("groq", "llama-3.3-70b-versatile"),
+        ("openai", "gpt-4o-mini"),
+        ("deepseek", "deepseek-chat"),
+    ],
+    "quality_check": [
+        ("openai", "gpt-4o-mini"),
+        ("deepseek", "deepseek-chat"),
+        ("groq", "llama-3.3-70b-versatile"),
+    ],
+    "format": [("openai", "gpt-4o-mini")],
+}
+
+# Stored quiz stage outputs are reused for this long, then ignored and purged
+QUIZ_CHECKPOINT_TTL_SECONDS = 24 * 3600
+CHECKPOINT_PURGE_INTERVAL_SECONDS = 3600
+
+
+# Background job kinds handled by worker.py
+JOB_KIND_GENERATE_TITLE = "generate_title"
+JOB_KIND_QUIZ_PIPELINE = "quiz_pipeline"
+JOB_KIND_BULK_DELETE = "bulk_delete"
+JOB_KIND_ARCHIVE_CONVERSATIONS = "archive_conversations"
+JOB_KIND_PURGE_CHECKPOINTS = "purge_checkpoints"
+JOB_KIND_PURGE_JOBS = "purge_jobs"
+
+# Higher priority jobs are claimed first
+JOB_PRIORITY_HIGH = 10
+JOB_PRIORITY_NORMAL = 0
+JOB_PRIORITY_LOW = -10
+
+# Seconds a claimed job stays invisible to other workers without a heartbeat
+JOB_VISIBILITY_TIMEOUT_SECONDS = 300
+JOB_HEARTBEAT_SECONDS = 60
+
+# Succeeded and failed jobs (and their results) are kept this long, then purged in batches
+JOB_RETENTION_DAYS = 7
+JOB_PURGE_BATCH_SIZE = 5000
+JOB_PURGE_INTERVAL_SECONDS = 3600
+
+# Seconds between flushes of in-memory token usage to usage_daily
+USAGE_FLUSH_INTERVAL_SECONDS = 15
+
+# Token bucket limits per user across all models, and per user for each model.
+# Buckets hold one minute of budget and refill continuously.
+RATE_LIMIT_USER_REQUESTS_PER_MINUTE = 30
+RATE_LIMIT_USER_TOKENS_PER_MINUTE = 100_000
+RATE_LIMIT_MODEL_REQUESTS_PER_MINUTE = 20
+RATE_LIMIT_MODEL_TOKENS_PER_MINUTE = 60_000
+
+# Keep the partial assistant text (flagged truncated) when the client disconnects mid-reply
+PERSIST_TRUNCATED_REPLIES = True
+
+# Conversations without a new message for this many days are moved to
+# conversation_archives, a batch per archiver run, runs an interval apart
+ARCHIVE_IDLE_DAYS = 14
+ARCHIVE_BATCH_SIZE = 200
+ARCHIVE_INTERVAL_SECONDS = 3600
@@ -1,11 +1,15 @@
 import logging
-from app.routes.constant import SYSTEM_ROLE, USER_ROLE
+from app.routes.constant import USER_ROLE
 from app.services.model_services import get_client_for_service
+from app.services.prompt_assembly import assemble_messages
 from app.services.prompts import CHAT_TITLE_PROMPT
 
 
 logger = logging.getLogger(__name__)
 
+TITLE_GENERATION_ERROR = "-- TITLE GENERATION ERROR --"
+LONG_TITLE_ERROR = "-- LONG TITLE ERROR --"
+
 
 def get_chat_title(initial_message) -> str:
     """
@@ -13,10 +17,9 @@ def get_chat_title(initial_message) -> str:
     """
     try:
         client = get_client_for_service("groq") # TODO add to constants
-        chat = [
-            {"role": SYSTEM_ROLE, "content": CHAT_TITLE_PROMPT},
-            {"role": USER_ROLE, "content": initial_message},
-        ]
+        chat = assemble_messages(
+            CHAT_TITLE_PROMPT, [{"role": USER_ROLE, "content": initial_message}]
+        )
 
     except Exception as e:
         logger.error(f"Error setting up client or preparing chat for title generation: {e}", exc_info=True)
@@ -31,7 +34,7 @@ def get_chat_title(initial_message) -> str:
         
     except Exception as e:
         logger.error(f"LLM call failed during title generation: {e}", exc_info=True)
-        return "-- TITLE GENERATION ERROR --" # TODO Handle this in a better way
+        return TITLE_GENERATION_ERROR # TODO Handle this in a better way
 
     try:
         title = response.choices[0].message.content.strip()
@@ -39,7 +42,7 @@ def get_chat_title(initial_message) -> str:
         
         if len(title.split()) > 8: # For now, we are limiting the title to 8 words (db limit 100 chars)
             logger.warning(f"Generated title is unusually long: {title}")
-            title = "-- LONG TITLE ERROR --" # TODO Handle this in a better way
+            title = LONG_TITLE_ERROR # TODO Handle this in a better way
         
         return str(title)
     except Exception as e:
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+from psycopg2.extensions import connection as PGConnection
+
+from app.constants import INVALIDATION_FALLBACK_TTL_SECONDS, INVALIDATION_RECONNECT_SECONDS
+from app.database.connection import PostgresConnection
+from app.database.invalidation_queries import listen_for_invalidations
+
+
+logger = logging.getLogger(__name__)
+
+InvalidationHandler = Callable[[str], None]
+
+V = TypeVar("V")
+
+
+class InvalidationBus:
+    """
+    Cross-process cache invalidation over Postgres LISTEN/NOTIFY. Triggers
+    publish '<entity>:<key>' when a write commits (migrations/012); every API
+    process listens on one dedicated primary connection and calls the handlers
+    subscribed to the entity, on the event loop, within milliseconds.
+
+    Events sent while the listener is disconnected are lost. Caches therefore
+    only trust entries stored since the listener last connected, and fall back
+    to INVALIDATION_FALLBACK_TTL_SECONDS for the rest (see is_fresh). Processes
+    that do not run the listener, such as job workers, always use the TTL.
+    Subscribers whose state is not a TTL cache pass `resync`, called after
+    every (re)connect and every fallback TTL while disconnected.
+    """
+
+    def __init__(self) -> None:
+        self._handlers: Dict[str, List[InvalidationHandler]] = {}
+        self._resyncs: List[Callable[[], None]] = []
+        self._connected_since: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self._connected_since is not None
+
+    def subscribe(
+        self, entity: str, handler: InvalidationHandler, resync: Optional[Callable[[], None]] = None
+    ) -> None:
+        with self._lock:
+            self._handlers.setdefault(entity, []).append(handler)
+            if resync is not None:
+                self._resyncs.append(resync)
+
+    def is_fresh(self, stored_at: float) -> bool:
+        """
+        Whether an entry stored at `stored_at` (time.monotonic()) can still be
+        served: it is kept current by events if stored while connected,
+        otherwise it is only trusted for the fallback TTL.
+        """
+        connected_since = self._connected_since
+        if connected_since is not None and stored_at >= connected_since:
+            return True
+        return time.monotonic() - stored_at < INVALIDATION_FALLBACK_TTL_SECONDS
+
+    def dispatch(self, payload: str) -> None:
+        entity, _, key = payload.partition(":")
+        with self._lock:
+            handlers = list(self._handlers.get(entity, ()))
+        for handler in handlers:
+            try:
+                handler(key)
+            except Exception as e:
+                logger.error(f"Invalidation handler for '{payload}' failed: {e}", exc_info=True)
+
+    def resync(self) -> None:
+        with self._lock:
+            resyncs = list(self._resyncs)
+        for resync in resyncs:
+            try:
+                resync()
+            except Exception as e:
+                logger.error(f"Invalidation resync failed: {e}", exc_info=True)
+
+    def _connect(self, database: PostgresConnection) -> PGConnection:
+        database.connect()
+        conn = database.connection
+        conn.autocommit = True
+        listen_for_invalidations(conn)
+        return conn
+
+    async def _listen(self, conn: PGConnection) -> None:
+        """
+        Dispatch notifications as the connection's socket becomes readable,
+        until the connection fails.
+        """
+        loop = asyncio.get_running_loop()
+        lost = loop.create_future()
+
+        def on_readable() -> None:
+            try:
+                conn.poll()
+            except Exception as e:
+                if not lost.done():
+                    lost.set_exception(e)
+                return
+            while conn.notifies:
+                self.dispatch(conn.notifies.pop(0).payload)
+
+        fileno = conn.fileno()
+        loop.add_reader(fileno, on_readable)
+        try:
+            await lost
+        finally:
+            loop.remove_reader(fileno)
+
+    async def run(self) -> None:
+        """
+        Listen until cancelled, reconnecting after connection failures.
+        """
+        last_resync = time.monotonic()  # state was loaded at startup
+        while True:
+            database = PostgresConnection(pooled=False, keepalive_seconds=10)
+            try:
+                conn = await asyncio.to_thread(self._connect, database)
+            except Exception as e:
+                logger.warning(f"Invalidation listener cannot connect, using the fallback TTL: {e}")
+                database.close_connection()
+                if time.monotonic() - last_resync >= INVALIDATION_FALLBACK_TTL_SECONDS:
+                    await asyncio.to_thread(self.resync)
+                    last_resync = time.monotonic()
+                await asyncio.sleep(INVALIDATION_RECONNECT_SECONDS)
+                continue
+
+            # Everything from here on is received; catch up on what was missed before
+            self._connected_since = time.monotonic()
+            await asyncio.to_thread(self.resync)
+            last_resync = time.monotonic()
+            logger.info("Invalidation listener connected")
+            try:
+                await self._listen(conn)
+            except Exception as e:
+                logger.warning(f"Invalidation listener disconnected: {e}")
+            finally:
+                self._connected_since = None
+                try:
+                    database.close_connection()
+                except Exception:
+                    pass
+
+
+invalidation_bus = InvalidationBus()
+
+
+class InvalidatingCache(Generic[V]):
+    """
+    In-process cache whose entries are evicted by invalidation events for
+    `entity` (key '*' clears it) and expire after the fallback TTL while the
+    listener is down. It is also cleared whenever the listener (re)connects.
+
+    Loads race with events: read `generation` before loading from the
+    database and pass it to put, which drops the value if anything was
+    evicted in between.
+    """
+
+    def __init__(self, entity: str, bus: InvalidationBus = invalidation_bus) -> None:
+        self._bus = bus
+        self._entries: Dict[str, Tuple[V, float]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        bus.subscribe(entity, self.evict, resync=lambda: self.evict("*"))
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: str) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if not self._bus.is_fresh(stored_at):
+                del self._entries[key]
+                return None
+            return value
+
+    def put(self, key: str, value: V, generation: int) -> None:
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (value, time.monotonic())
+
+    def evict(self, key: str) -> None:
+        with self._lock:
+            self._generation += 1
+            if key == "*":
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
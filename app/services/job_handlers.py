@@ -0,0 +1,207 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+from uuid import UUID
+
+from app.database.chat_queries import select_first_user_message, update_chat_title_query
+from app.database.connection import PostgresConnection
+from app.database.folder_queries import delete_folder_query
+from app.database.job_queries import delete_finished_jobs, ensure_job_scheduled
+from app.database.pipeline_queries import delete_expired_checkpoints
+from app.database.workspace_queries import delete_workspace_query
+from app.routes.constant import DEFAULT_CHAT_TITLE
+from app.schemas.movements import ItemType
+from app.schemas.workspaces import DeletionMode
+from app.services.archiver import archive_idle_conversations
+from app.services.constants import (
+    ARCHIVE_BATCH_SIZE,
+    ARCHIVE_IDLE_DAYS,
+    ARCHIVE_INTERVAL_SECONDS,
+    CHECKPOINT_PURGE_INTERVAL_SECONDS,
+    JOB_KIND_ARCHIVE_CONVERSATIONS,
+    JOB_KIND_BULK_DELETE,
+    JOB_KIND_GENERATE_TITLE,
+    JOB_KIND_PURGE_CHECKPOINTS,
+    JOB_KIND_PURGE_JOBS,
+    JOB_KIND_QUIZ_PIPELINE,
+    JOB_PRIORITY_LOW,
+    JOB_PURGE_BATCH_SIZE,
+    JOB_PURGE_INTERVAL_SECONDS,
+    JOB_RETENTION_DAYS,
+    QUIZ_CHECKPOINT_TTL_SECONDS,
+)
+from app.services.generate_title import LONG_TITLE_ERROR, TITLE_GENERATION_ERROR, get_chat_title
+from app.services.quiz_pipeline import CheckpointStore, QuizPipeline, quiz_checkpoint_scope
+
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+def _set_generated_title(chat_id: UUID, user_id: UUID) -> Dict[str, Any]:
+    with PostgresConnection() as conn:
+        initial_message = select_first_user_message(conn, chat_id, user_id)
+    if initial_message is None:
+        return {"updated": False}
+
+    title = get_chat_title(initial_message)
+    if title == TITLE_GENERATION_ERROR:
+        # Raise so the worker retries instead of storing the error marker
+        raise RuntimeError("Title generation failed")
+    if title == LONG_TITLE_ERROR:
+        return {"updated": False, "title": title}
+
+    with PostgresConnection() as conn:
+        # Leave the title alone if the user renamed the chat while the job was queued
+        updated = update_chat_title_query(conn, chat_id, user_id, title, expected_title=DEFAULT_CHAT_TITLE)
+    return {"updated": updated is not None, "title": title}
+
+
+async def generate_title_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Payload: {"conversation_id": <uuid>}
+    Generates the title from the chat's first user message and stores it
+    in place of the placeholder title.
+    """
+    chat_id = UUID(job["payload"]["conversation_id"])
+    return await asyncio.to_thread(_set_generated_title, chat_id, job["user_id"])
+
+
+async def quiz_pipeline_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Payload: {"topic": <str>, "num_questions": <int>, "use_checkpoints": <bool>}
+    Runs the quiz pipeline. Checkpoints make a retried job resume where the last attempt stopped.
+    """
+    payload = job["payload"]
+    checkpoints = CheckpointStore() if payload.get("use_checkpoints", True) else None
+    state = await QuizPipeline(checkpoints=checkpoints).run(
+        payload["topic"],
+        payload["num_questions"],
+        checkpoint_scope=quiz_checkpoint_scope(job["user_id"], payload["topic"], payload["num_questions"]),
+    )
+    return {
+        "final_quiz": state["final_quiz"],
+        "questions": state["quiz_with_distractors"],
+        "quality_check_results": state["quality_check_results"],
+        "timings": state["timings"],
+        "checkpoint_hits": state["checkpoint_hits"],
+    }
+
+
+def _bulk_delete(item_type: str, item_id: UUID, user_id: UUID, mode: DeletionMode) -> Dict[str, Any]:
+    with PostgresConnection() as conn:
+        if item_type == ItemType.FOLDER.value:
+            deleted = delete_folder_query(conn, item_id, user_id, mode)
+        else:
+            deleted = delete_workspace_query(conn, item_id, user_id, mode)
+    return {"deleted": deleted}
+
+
+async def bulk_delete_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Payload: {"item_type": "workspace" | "folder", "item_id": <uuid>, "mode": "archive" | "permanent"}
+    Deletes a workspace or folder with all its contents.
+    """
+    payload = job["payload"]
+    return await asyncio.to_thread(
+        _bulk_delete,
+        payload["item_type"],
+        UUID(payload["item_id"]),
+        job["user_id"],
+        DeletionMode(payload["mode"]),
+    )
+
+
+def _reschedule(job_id: int, kind: str, payload: Dict[str, Any], delay: int) -> None:
+    # Recurring jobs schedule their successor also after a failure, so the
+    # schedule never stops; one attempt per run, the next run is the retry
+    with PostgresConnection() as conn:
+        ensure_job_scheduled(
+            conn,
+            kind,
+            payload,
+            priority=JOB_PRIORITY_LOW,
+            max_attempts=1,
+            delay_seconds=delay,
+            exclude_job_id=job_id,
+        )
+
+
+def _archive_and_reschedule(job_id: int, idle_days: int, limit: int) -> Dict[str, Any]:
+    delay = ARCHIVE_INTERVAL_SECONDS
+    try:
+        totals = archive_idle_conversations(idle_days, limit)
+        # A full batch means more are waiting: run again right away
+        if totals["candidates"] >= limit:
+            delay = 0
+        return totals
+    finally:
+        _reschedule(job_id, JOB_KIND_ARCHIVE_CONVERSATIONS, {"idle_days": idle_days, "limit": limit}, delay)
+
+
+async def archive_conversations_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Payload: {"idle_days": <int>, "limit": <int>}, both optional
+    Archives a batch of idle conversations and schedules the next run.
+    """
+    payload = job["payload"]
+    return await asyncio.to_thread(
+        _archive_and_reschedule,
+        job["job_id"],
+        payload.get("idle_days", ARCHIVE_IDLE_DAYS),
+        payload.get("limit", ARCHIVE_BATCH_SIZE),
+    )
+
+
+def _purge_checkpoints_and_reschedule(job_id: int) -> Dict[str, Any]:
+    try:
+        with PostgresConnection() as conn:
+            return {"deleted": delete_expired_checkpoints(conn, QUIZ_CHECKPOINT_TTL_SECONDS)}
+    finally:
+        _reschedule(job_id, JOB_KIND_PURGE_CHECKPOINTS, {}, CHECKPOINT_PURGE_INTERVAL_SECONDS)
+
+
+async def purge_checkpoints_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Payload: {}
+    Deletes quiz checkpoints past their TTL and schedules the next run.
+    """
+    return await asyncio.to_thread(_purge_checkpoints_and_reschedule, job["job_id"])
+
+
+def _purge_jobs_and_reschedule(job_id: int, retention_days: int, limit: int) -> Dict[str, Any]:
+    delay = JOB_PURGE_INTERVAL_SECONDS
+    try:
+        with PostgresConnection() as conn:
+            deleted = delete_finished_jobs(conn, retention_days, limit)
+        # A full batch means more are waiting: run again right away
+        if deleted >= limit:
+            delay = 0
+        return {"deleted": deleted}
+    finally:
+        _reschedule(job_id, JOB_KIND_PURGE_JOBS, {"retention_days": retention_days, "limit": limit}, delay)
+
+
+async def purge_jobs_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Payload: {"retention_days": <int>, "limit": <int>}, both optional
+    Deletes a batch of jobs finished more than retention_days ago and schedules the next run.
+    """
+    payload = job["payload"]
+    return await asyncio.to_thread(
+        _purge_jobs_and_reschedule,
+        job["job_id"],
+        payload.get("retention_days", JOB_RETENTION_DAYS),
+        payload.get("limit", JOB_PURGE_BATCH_SIZE),
+    )
+
+
+JOB_HANDLERS: Dict[str, JobHandler] = {
+    JOB_KIND_GENERATE_TITLE: generate_title_job,
+    JOB_KIND_QUIZ_PIPELINE: quiz_pipeline_job,
+    JOB_KIND_BULK_DELETE: bulk_delete_job,
+    JOB_KIND_ARCHIVE_CONVERSATIONS: archive_conversations_job,
+    JOB_KIND_PURGE_CHECKPOINTS: purge_checkpoints_job,
+    JOB_KIND_PURGE_JOBS: purge_jobs_job,
+}
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import os
+import socket
+from typing import Any, Dict, Optional, Set
+
+from app.database.connection import PostgresConnection
+from app.database.job_queries import claim_job, complete_job, extend_job_lock, fail_job
+from app.services.constants import JOB_HEARTBEAT_SECONDS, JOB_VISIBILITY_TIMEOUT_SECONDS
+from app.services.job_handlers import JOB_HANDLERS
+
+
+logger = logging.getLogger(__name__)
+
+
+def _claim(worker_id: str) -> Optional[Dict[str, Any]]:
+    with PostgresConnection() as conn:
+        return claim_job(conn, worker_id, JOB_VISIBILITY_TIMEOUT_SECONDS)
+
+
+def _heartbeat(job_id: int, worker_id: str) -> bool:
+    with PostgresConnection() as conn:
+        return extend_job_lock(conn, job_id, worker_id, JOB_VISIBILITY_TIMEOUT_SECONDS)
+
+
+def _complete(job_id: int, worker_id: str, result: Any) -> bool:
+    with PostgresConnection() as conn:
+        return complete_job(conn, job_id, worker_id, result)
+
+
+def _fail(job_id: int, worker_id: str, error: str, retry_delay: int) -> Optional[str]:
+    with PostgresConnection() as conn:
+        return fail_job(conn, job_id, worker_id, error, retry_delay)
+
+
+class JobWorker:
+    """
+    Polls the jobs table and runs up to `concurrency` jobs at a time.
+    Running jobs heartbeat their visibility timeout; if the worker dies, the
+    timeout lapses and another worker picks the job up again. A job whose lock
+    is lost (heartbeats failing past the timeout, or the job reclaimed) has its
+    handler cancelled and its result dropped, as the new holder runs it again.
+    """
+
+    def __init__(self, concurrency: int = 4, poll_interval: float = 1.0) -> None:
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._concurrency = concurrency
+        self._poll_interval = poll_interval
+        self._stopping = asyncio.Event()
+        self._running: Set[asyncio.Task] = set()
+
+    def stop(self) -> None:
+        logger.info(f"Worker {self.worker_id} stopping after current jobs")
+        self._stopping.set()
+
+    async def _keep_alive(self, job_id: int, handler_task: asyncio.Task) -> None:
+        """
+        Extend the job's lock until cancelled; cancel handler_task and return
+        once the lock is lost.
+        """
+        loop = asyncio.get_running_loop()
+        extended_at = loop.time()
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            try:
+                held = await asyncio.to_thread(_heartbeat, job_id, self.worker_id)
+            except Exception as e:
+                logger.error(f"Heartbeat for job {job_id} failed: {e}", exc_info=True)
+                # Keep trying while the last extension still holds the lock
+                held = loop.time() - extended_at < JOB_VISIBILITY_TIMEOUT_SECONDS
+            else:
+                extended_at = loop.time()
+            if not held:
+                logger.warning(f"Lost the lock on job {job_id}, cancelling its handler")
+                handler_task.cancel()
+                return
+
+    async def _process(self, job: Dict[str, Any]) -> None:
+        job_id = job["job_id"]
+        handler = JOB_HANDLERS.get(job["kind"])
+
+        if handler is None or job["attempts"] > job["max_attempts"]:
+            error = (
+                f"No handler for job kind '{job['kind']}'"
+                if handler is None
+                else "Visibility timeout expired on the last attempt"
+            )
+            await asyncio.to_thread(_fail, job_id, self.worker_id, error, 0)
+            logger.error(f"Job {job_id} failed: {error}")
+            return
+
+        handler_task = asyncio.create_task(handler(job))
+        heartbeat = asyncio.create_task(self._keep_alive(job_id, handler_task))
+        try:
+            result = await handler_task
+        except asyncio.CancelledError:
+            if not heartbeat.done() or heartbeat.cancelled():
+                raise
+            # Cancelled for a lost lock: the job is someone else's now, record nothing
+            logger.warning(f"Job {job_id} ({job['kind']}) abandoned after losing its lock")
+        except Exception as e:
+            retry_delay = 5 * 2 ** (job["attempts"] - 1)
+            status = await asyncio.to_thread(_fail, job_id, self.worker_id, str(e), retry_delay)
+            logger.error(
+                f"Job {job_id} ({job['kind']}) attempt {job['attempts']} failed, now {status}: {e}",
+                exc_info=True,
+            )
+        else:
+            if await asyncio.to_thread(_complete, job_id, self.worker_id, result):
+                logger.info(f"Job {job_id} ({job['kind']}) succeeded")
+            else:
+                logger.warning(f"Job {job_id} ({job['kind']}) finished after losing its lock, result dropped")
+        finally:
+            heartbeat.cancel()
+
+    async def run(self) -> None:
+        logger.info(f"Worker {self.worker_id} started with concurrency {self._concurrency}")
+
+        while not self._stopping.is_set():
+            if len(self._running) >= self._concurrency:
+                await asyncio.wait(self._running, return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            try:
+                job = await asyncio.to_thread(_claim, self.worker_id)
+            except Exception as e:
+                logger.error(f"Error claiming job: {e}", exc_info=True)
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self._poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self._process(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+        if self._running:
+            await asyncio.wait(self._running)
+        logger.info(f"Worker {self.worker_id} stopped")
@@ -1,16 +1,54 @@
 import logging
 import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
 from openai import OpenAI
 from app.database.connection import PostgresConnection
 from app.database.model_queries import get_model_name_and_service_by_id
-from app.routes.constant import SYSTEM_ROLE
 from app.services.constants import SERVICE_CONFIG
-from app.services.prompts import CV_BUILDER_PROMPT_CLAUDE, SYSTEM_PROMPT
+from app.services.prompt_assembly import (
+    assemble_messages,
+    cache_request_options,
+    extract_usage,
+    prompt_cache_stats,
+)
+from app.services.cancellation import cancellation_stats
+from app.services.invalidation import InvalidatingCache
+from app.services.prompt_registry import count_tokens, prompt_registry
 
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class ModelReply:
+    content: str
+    usage: Dict[str, int]  # prompt_tokens, completion_tokens, cached_tokens
+    truncated: bool = False  # cancelled before the model finished
+
+
+# model_id -> {"model_name", "service"}, evicted when a models row changes
+model_info_cache: InvalidatingCache[Dict[str, str]] = InvalidatingCache("model")
+
+
+def get_model_info(model_id: str) -> Dict[str, str]:
+    """
+    Name and service of a model, from the cache or the database.
+    """
+    key = str(model_id)
+    model_info = model_info_cache.get(key)
+    if model_info is None:
+        generation = model_info_cache.generation
+        with PostgresConnection() as conn:
+            model_data = get_model_name_and_service_by_id(conn, model_id)
+        if model_data is None:
+            raise ValueError(f"Unknown model {model_id}")
+        model_info = {"model_name": model_data["model_name"], "service": model_data["service"]}
+        model_info_cache.put(key, model_info, generation)
+    return model_info
+
+
 def get_client_for_service(service: str) -> OpenAI:
     try:
         config = SERVICE_CONFIG[service]
@@ -34,16 +72,85 @@ def get_client_for_service(service: str) -> OpenAI:
 
 
 
-def get_reply_from_model(model_id: str, chat: list[str]) -> str:
+def _stream_reply(
+    client: OpenAI,
+    service: str,
+    model_name: str,
+    messages: list,
+    system_prompt: str,
+    estimated_prompt_tokens: int,
+    cancel_event: threading.Event,
+) -> ModelReply:
+    """
+    Stream the completion, checking cancel_event between chunks. On cancel the
+    HTTP stream is closed, which makes the provider stop generating.
+    """
+    stream_options = (
+        {"stream_options": {"include_usage": True}}
+        if SERVICE_CONFIG[service].get("stream_usage")
+        else {}
+    )
+    stream = client.chat.completions.create(
+        model=model_name,
+        messages=messages,
+        stream=True,
+        **stream_options,
+        **cache_request_options(service, system_prompt),
+    )
+
+    parts = []
+    usage = None
+    truncated = False
+    try:
+        for chunk in stream:
+            if cancel_event.is_set():
+                truncated = True
+                break
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+            if chunk.usage:
+                usage = extract_usage(chunk)
+    finally:
+        stream.close()
+
+    content = "".join(parts)
+    if usage is None:
+        # Cancelled before the usage chunk, or a provider that does not report it
+        usage = {
+            "prompt_tokens": estimated_prompt_tokens,
+            "completion_tokens": count_tokens(content),
+            "cached_tokens": 0,
+        }
+
+    if truncated:
+        cancellation_stats.record_cancelled(model_name, usage["completion_tokens"])
+        logger.info(
+            f"Cancelled {model_name} reply after {usage['completion_tokens']} tokens, client disconnected"
+        )
+    else:
+        cancellation_stats.record_completed(model_name, usage["completion_tokens"])
+
+    return ModelReply(content=content, usage=usage, truncated=truncated)
+
+
+def get_reply_from_model(
+    model_id: str,
+    chat: list[str],
+    persona_id: Optional[str] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> ModelReply:
     """
     Main entrypoint to retrieve a reply from the specified model.
+    The system prompt is the conversation's persona, the default one if None.
+    With a cancel_event the reply is streamed and stops as soon as the event is
+    set, returning the partial text flagged as truncated.
+    Returns the reply text with the provider's token usage.
     """
     try:
-        with PostgresConnection() as conn:
-            model_data = get_model_name_and_service_by_id(conn, model_id)
-            service = model_data['service']
-            model_name = model_data['model_name']
-            logger.info(f"Retrieved model info: model_name={model_name}, service={service}")
+        model_data = get_model_info(model_id)
+        service = model_data['service']
+        model_name = model_data['model_name']
+        logger.info(f"Retrieved model info: model_name={model_name}, service={service}")
     except Exception as e:
         logger.error(f"Database error or model lookup failure for model_id {model_id}: {e}", exc_info=True)
         raise
@@ -56,23 +163,43 @@ def get_reply_from_model(model_id: str, chat: list[str]) -> str:
         raise
 
     try:
-        system_prompt = SYSTEM_PROMPT
-        # if model_name == "deepseek-r1-distill-llama-70b":
-        #     system_prompt = CV_BUILDER_PROMPT_CLAUDE
-            
-        # Prepend system prompt to chat sequence
-        chat.insert(0, {"role": SYSTEM_ROLE, "content": system_prompt })
+        persona = prompt_registry.get(persona_id)
+        system_prompt = persona.system_prompt
+
+        # Static system prompt first so the provider's prefix cache can hit
+        messages = assemble_messages(system_prompt, chat)
+
+        if cancel_event is not None:
+            reply = _stream_reply(
+                client,
+                service,
+                model_name,
+                messages,
+                system_prompt,
+                prompt_registry.estimate_prompt_tokens(persona_id, chat),
+                cancel_event,
+            )
+            prompt_cache_stats.record(model_name, reply.usage)
+            return reply
 
         response = client.chat.completions.create(
             model=model_name,
-            messages=chat
+            messages=messages,
+            **cache_request_options(service, system_prompt),
         )
         # Validate response structure before accessing
         if not response.choices or not response.choices[0].message:
             raise ValueError("Incomplete response received from LLM service.")
 
-        reply = response.choices[0].message.content
-        return reply
+        usage = extract_usage(response)
+        prompt_cache_stats.record(model_name, usage)
+        logger.info(
+            f"Usage for {model_name} ({persona.persona_id}, system prompt {persona.token_count} tokens): "
+            f"prompt={usage['prompt_tokens']} "
+            f"cached={usage['cached_tokens']} completion={usage['completion_tokens']}"
+        )
+
+        return ModelReply(content=response.choices[0].message.content, usage=usage)
     except Exception as e:
         logger.error(f"Error during chat completion call for model {model_name}: {e}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
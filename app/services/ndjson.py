@@ -0,0 +1,88 @@
+import gzip
+import zlib
+from typing import BinaryIO, Iterable, Iterator
+
+from app.schemas.data import Compression
+
+try:
+    import zstandard
+except ImportError:  # optional, zstd (de)compression is then unavailable
+    zstandard = None
+
+# Bytes of NDJSON collected before handing them to the compressor
+CHUNK_BYTES = 64 * 1024
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def compression_available(compression: Compression) -> bool:
+    return compression != Compression.ZSTD or zstandard is not None
+
+
+def encode_lines(lines: Iterable[str], compression: Compression = Compression.NONE) -> Iterator[bytes]:
+    """
+    Join JSON text lines into NDJSON, compressed as a single gzip or zstd
+    stream, yielding chunks of roughly CHUNK_BYTES. Closing this generator
+    closes `lines` too, if it is a generator.
+    """
+    if compression == Compression.GZIP:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip header
+        compress, flush = compressor.compress, compressor.flush
+    elif compression == Compression.ZSTD:
+        compressor = zstandard.ZstdCompressor(level=3).compressobj()
+        compress, flush = compressor.compress, compressor.flush
+    else:
+        compress, flush = (lambda data: data), (lambda: b"")
+
+    buffer = []
+    size = 0
+    try:
+        for line in lines:
+            data = line.encode("utf-8") + b"\n"
+            buffer.append(data)
+            size += len(data)
+            if size >= CHUNK_BYTES:
+                chunk = compress(b"".join(buffer))
+                buffer, size = [], 0
+                if chunk:
+                    yield chunk
+    finally:
+        close = getattr(lines, "close", None)
+        if close is not None:
+            close()
+    chunk = compress(b"".join(buffer)) + flush()
+    if chunk:
+        yield chunk
+
+
+def detect_compression(stream: BinaryIO) -> Compression:
+    """
+    Tell gzip and zstd streams from plain NDJSON by their magic bytes.
+    The stream must be seekable; it is left at the start.
+    """
+    head = stream.read(4)
+    stream.seek(0)
+    if head.startswith(GZIP_MAGIC):
+        return Compression.GZIP
+    if head.startswith(ZSTD_MAGIC):
+        return Compression.ZSTD
+    return Compression.NONE
+
+
+def open_lines(stream: BinaryIO) -> BinaryIO:
+    """
+    Wrap a seekable NDJSON stream, plain or compressed, in a reader that
+    decompresses as it is read.
+
+    Raises:
+        ValueError: the stream is zstd compressed and zstandard is not installed
+    """
+    compression = detect_compression(stream)
+    if compression == Compression.GZIP:
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    if compression == Compression.ZSTD:
+        if zstandard is None:
+            raise ValueError("zstd compression is not available on this server")
+        return zstandard.ZstdDecompressor().stream_reader(stream)
+    return stream
@@ -0,0 +1,101 @@
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List
+
+from app.routes.constant import SYSTEM_ROLE
+from app.services.constants import SERVICE_CONFIG
+
+
+logger = logging.getLogger(__name__)
+
+
+def assemble_messages(system_prompt: str, chat: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """
+    Build the message list sent to a provider.
+
+    Provider-side prompt caching matches on an exact prefix, so the static part
+    goes first and is byte-identical on every request: the system prompt exactly
+    as stored (nothing per-request such as dates or user names is interpolated
+    into it), followed by the history oldest first with only role and content.
+    The caller's `chat` list is not modified.
+    """
+    messages = [{"role": SYSTEM_ROLE, "content": system_prompt}]
+    messages.extend({"role": m["role"], "content": m["content"]} for m in chat)
+    return messages
+
+
+def prompt_cache_key(system_prompt: str) -> str:
+    return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:32]
+
+
+def cache_request_options(service: str, system_prompt: str) -> Dict[str, Any]:
+    """
+    Provider-specific cache hints to pass to chat.completions.create.
+    OpenAI routes requests with the same prompt_cache_key to the same cache;
+    DeepSeek and Groq cache matching prefixes automatically and take no hint.
+    """
+    if SERVICE_CONFIG.get(service, {}).get("prompt_cache_key"):
+        return {"extra_body": {"prompt_cache_key": prompt_cache_key(system_prompt)}}
+    return {}
+
+
+def extract_usage(response: Any) -> Dict[str, int]:
+    """
+    Normalise the usage block of an OpenAI-compatible response.
+    Cached input tokens are reported as usage.prompt_tokens_details.cached_tokens
+    by OpenAI and as usage.prompt_cache_hit_tokens by DeepSeek.
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details is not None else None
+    if cached is None:
+        cached = getattr(usage, "prompt_cache_hit_tokens", None)
+
+    return {
+        "prompt_tokens": usage.prompt_tokens or 0,
+        "completion_tokens": usage.completion_tokens or 0,
+        "cached_tokens": cached or 0,
+    }
+
+
+class PromptCacheStats:
+    """
+    Per-model counters of cached vs uncached input tokens for this process.
+    """
+
+    def __init__(self) -> None:
+        self._models: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model_name: str, usage: Dict[str, int]) -> None:
+        with self._lock:
+            stats = self._models.setdefault(
+                model_name, {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0}
+            )
+            stats["requests"] += 1
+            stats["prompt_tokens"] += usage["prompt_tokens"]
+            stats["cached_tokens"] += usage["cached_tokens"]
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "model_name": model_name,
+                    "requests": stats["requests"],
+                    "prompt_tokens": stats["prompt_tokens"],
+                    "cached_tokens": stats["cached_tokens"],
+                    "uncached_tokens": stats["prompt_tokens"] - stats["cached_tokens"],
+                    "cache_hit_ratio": (
+                        stats["cached_tokens"] / stats["prompt_tokens"]
+                        if stats["prompt_tokens"] else 0.0
+                    ),
+                }
+                for model_name, stats in sorted(self._models.items())
+            ]
+
+
+prompt_cache_stats = PromptCacheStats()
@@ -0,0 +1,109 @@
+import logging
+import math
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from app.services import prompts
+
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # optional, token counts fall back to an estimate
+    tiktoken = None
+
+
+DEFAULT_PERSONA_ID = "assistant"
+
+# persona_id -> (name, description, template name in app/services/prompts.py)
+PERSONA_DEFINITIONS = {
+    DEFAULT_PERSONA_ID: ("Assistant", "General purpose assistant", "SYSTEM_PROMPT"),
+    "cv_builder": ("CV Builder", "Step by step, job-specific CV writing", "CV_BUILDER_PROMPT_CLAUDE"),
+    "cv_builder_r1": ("CV Builder (R1)", "CV writing tuned for reasoning models", "CV_BUILDER_PROMPT_R1"),
+    "cv_builder_gpt": ("CV Builder (GPT)", "CV writing tuned for GPT models", "CV_BUILDER_PROMPT_GPT"),
+}
+
+
+@dataclass(frozen=True)
+class Persona:
+    persona_id: str
+    name: str
+    description: str
+    system_prompt: str
+    token_count: int
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count with tiktoken's cl100k_base when installed, otherwise the
+    usual ~4 characters per token estimate.
+    """
+    if tiktoken is not None:
+        return len(tiktoken.get_encoding("cl100k_base").encode(text))
+    return math.ceil(len(text) / 4)
+
+
+class PromptRegistry:
+    """
+    System prompts keyed by persona_id, rendered and counted once.
+    The rendered prompt is the exact string sent to providers, so it stays
+    byte-identical across requests and keeps the prompt prefix cacheable.
+    """
+
+    def __init__(self) -> None:
+        self._personas: Dict[str, Persona] = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        personas = {}
+        for persona_id, (name, description, template) in PERSONA_DEFINITIONS.items():
+            system_prompt = getattr(prompts, template).strip()
+            personas[persona_id] = Persona(
+                persona_id=persona_id,
+                name=name,
+                description=description,
+                system_prompt=system_prompt,
+                token_count=count_tokens(system_prompt),
+            )
+        with self._lock:
+            self._personas = personas
+        logger.info(f"Loaded {len(personas)} personas into the prompt registry")
+
+    def _ensure_loaded(self) -> None:
+        # Processes without the API lifespan (the job worker) load on first use
+        if not self._personas:
+            with self._lock:
+                if self._personas:
+                    return
+            self.load()
+
+    def exists(self, persona_id: str) -> bool:
+        self._ensure_loaded()
+        return persona_id in self._personas
+
+    def get(self, persona_id: Optional[str] = None) -> Persona:
+        """
+        Return the persona, or the default one when persona_id is None or unknown
+        (e.g. a persona that was removed after conversations were created with it).
+        """
+        self._ensure_loaded()
+        persona = self._personas.get(persona_id or DEFAULT_PERSONA_ID)
+        if persona is None:
+            logger.warning(f"Unknown persona '{persona_id}', using '{DEFAULT_PERSONA_ID}'")
+            persona = self._personas[DEFAULT_PERSONA_ID]
+        return persona
+
+    def estimate_prompt_tokens(self, persona_id: Optional[str], chat: List[Dict[str, str]]) -> int:
+        """
+        Prompt size of a request: the persona's precomputed count plus the history.
+        """
+        return self.get(persona_id).token_count + sum(count_tokens(m["content"]) for m in chat)
+
+    def all(self) -> List[Persona]:
+        self._ensure_loaded()
+        return list(self._personas.values())
+
+
+prompt_registry = PromptRegistry()
@@ -0,0 +1,381 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from openai import OpenAI
+
+from app.custom_exceptions import QuizPipelineError
+from app.database.connection import PostgresConnection
+from app.database.pipeline_queries import insert_checkpoints, select_checkpoints
+from app.routes.constant import USER_ROLE
+from app.services.agent_instructions import (
+    DISTRACTOR_GENERATOR_INSTRUCTIONS,
+    FORMATTER_INSTRUCTIONS,
+    QUALITY_CHECKER_INSTRUCTIONS,
+    QUESTION_GENERATOR_INSTRUCTIONS,
+    RESEARCHER_INSTRUCTIONS,
+)
+from app.services.constants import QUIZ_CHECKPOINT_TTL_SECONDS, QUIZ_PIPELINE_MODELS
+from app.services.model_services import get_client_for_service
+from app.services.prompt_assembly import (
+    assemble_messages,
+    cache_request_options,
+    extract_usage,
+    prompt_cache_stats,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def extract_json(text: str, opening: str, closing: str) -> Any:
+    """
+    Parse the outermost JSON array/object in a model reply, ignoring any prose or
+    code fences around it.
+    """
+    start = text.find(opening)
+    end = text.rfind(closing)
+    if start == -1 or end <= start:
+        raise ValueError(f"No JSON {opening}{closing} found in model output")
+    return json.loads(text[start:end + 1])
+
+
+def build_research_input(state: dict, item: Any) -> str:
+    # Only the topic, so research is reused by quizzes of any length on the same topic
+    return f"Quiz topic request: {state['user_request']}"
+
+
+def build_questions_input(state: dict, item: Any) -> str:
+    return (
+        f"state['research_results']:\n{state['research_results']}\n\n"
+        f"Create exactly {state['num_questions']} questions. Respond with only a JSON array, "
+        "one object per question with the keys: id, question, type, difficulty, "
+        "correct_answer, explanation."
+    )
+
+
+def build_distractors_input(state: dict, item: Any) -> str:
+    return (
+        f"Question:\n{json.dumps(item)}\n\n"
+        "Respond with only a JSON object containing all fields of the question plus "
+        "a `distractors` list. Leave `distractors` empty for question types that do not use options."
+    )
+
+
+def build_quality_check_input(state: dict, item: Any) -> str:
+    return f"Quiz item to review:\n{json.dumps(item)}"
+
+
+def build_format_input(state: dict, item: Any) -> str:
+    reviews = "\n\n".join(state["quality_check_results"])
+    return (
+        f"Quiz topic request: {state['user_request']}\n\n"
+        f"state['quiz_with_distractors']:\n{json.dumps(state['quiz_with_distractors'])}\n\n"
+        f"state['quality_check_results']:\n{reviews}"
+    )
+
+
+def parse_questions(text: str) -> List[dict]:
+    questions = extract_json(text, "[", "]")
+    if not isinstance(questions, list) or not questions:
+        raise ValueError("Question generator returned no questions")
+    return questions
+
+
+def parse_question_with_distractors(text: str) -> dict:
+    return extract_json(text, "{", "}")
+
+
+def parse_text(text: str) -> str:
+    return text.strip()
+
+
+@dataclass(frozen=True)
+class PipelineStage:
+    """
+    One agent of the pipeline. It reads from and writes to the shared state dict.
+    A stage with `fan_out_key` runs once per item of that state list, concurrently,
+    and stores the list of results under `output_key`. A `shared` stage's
+    checkpoints are reused by any run with the same inputs; the others only by
+    runs with the same checkpoint scope.
+    """
+    name: str
+    instructions: str
+    output_key: str
+    build_input: Callable[[dict, Any], str]
+    parse_output: Callable[[str], Any]
+    depends_on: Tuple[str, ...] = ()
+    fan_out_key: Optional[str] = None
+    timeout: float = 60.0
+    max_attempts: int = 3
+    shared: bool = False
+
+
+QUIZ_STAGES = (
+    PipelineStage(
+        name="research",
+        instructions=RESEARCHER_INSTRUCTIONS,
+        output_key="research_results",
+        build_input=build_research_input,
+        parse_output=parse_text,
+        timeout=120.0,
+        shared=True,
+    ),
+    PipelineStage(
+        name="questions",
+        instructions=QUESTION_GENERATOR_INSTRUCTIONS,
+        output_key="quiz_questions",
+        build_input=build_questions_input,
+        parse_output=parse_questions,
+        depends_on=("research",),
+        timeout=120.0,
+    ),
+    PipelineStage(
+        name="distractors",
+        instructions=DISTRACTOR_GENERATOR_INSTRUCTIONS,
+        output_key="quiz_with_distractors",
+        build_input=build_distractors_input,
+        parse_output=parse_question_with_distractors,
+        depends_on=("questions",),
+        fan_out_key="quiz_questions",
+    ),
+    PipelineStage(
+        name="quality_check",
+        instructions=QUALITY_CHECKER_INSTRUCTIONS,
+        output_key="quality_check_results",
+        build_input=build_quality_check_input,
+        parse_output=parse_text,
+        depends_on=("distractors",),
+        fan_out_key="quiz_with_distractors",
+    ),
+    PipelineStage(
+        name="format",
+        instructions=FORMATTER_INSTRUCTIONS,
+        output_key="final_quiz",
+        build_input=build_format_input,
+        parse_output=parse_text,
+        depends_on=("quality_check",),
+        timeout=120.0,
+    ),
+)
+
+
+def sha256_hex(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def checkpoint_key(stage: PipelineStage, content: str, model: str, scope: Optional[str] = None) -> str:
+    """
+    Content address of one stage call: (stage, instructions hash, inputs hash, model),
+    preceded by the run's scope unless the stage is shared.
+    """
+    parts = [stage.name, sha256_hex(stage.instructions), sha256_hex(content), model]
+    if scope is not None and not stage.shared:
+        parts.insert(0, scope)
+    return sha256_hex("\x1f".join(parts))
+
+
+def quiz_checkpoint_scope(user_id: Any, topic: str, num_questions: int) -> str:
+    """
+    Checkpoint scope of one user's quiz request: questions and later stages are
+    only reused by the same user asking for the same topic and length again.
+    """
+    return sha256_hex("\x1f".join(["quiz", str(user_id), topic, str(num_questions)]))
+
+
+class CheckpointStore:
+    """
+    Persists stage outputs in pipeline_checkpoints, reused for up to
+    `ttl_seconds` (expired rows are purged by a recurring job). Failures are
+    logged and treated as cache misses, they never fail a quiz.
+    """
+
+    def __init__(self, ttl_seconds: int = QUIZ_CHECKPOINT_TTL_SECONDS) -> None:
+        self._ttl_seconds = ttl_seconds
+
+    def load(self, keys: List[str]) -> Dict[str, Any]:
+        try:
+            with PostgresConnection() as conn:
+                return select_checkpoints(conn, keys, self._ttl_seconds)
+        except Exception as e:
+            logger.error(f"Could not load quiz checkpoints: {e}", exc_info=True)
+            return {}
+
+    def save(self, checkpoints: List[Tuple[str, str, str, Any]]) -> None:
+        try:
+            with PostgresConnection() as conn:
+                insert_checkpoints(conn, checkpoints)
+        except Exception as e:
+            logger.error(f"Could not save quiz checkpoints: {e}", exc_info=True)
+
+
+def resolve_levels(stages: Tuple[PipelineStage, ...]) -> List[List[PipelineStage]]:
+    """
+    Group stages into levels so every stage only depends on stages of earlier levels.
+    Stages of the same level run concurrently.
+    """
+    remaining = {stage.name: stage for stage in stages}
+    done: set = set()
+    levels = []
+    while remaining:
+        level = [
+            stage for stage in remaining.values()
+            if all(dep in done for dep in stage.depends_on)
+        ]
+        if not level:
+            raise ValueError(f"Unresolvable stage dependencies: {sorted(remaining)}")
+        levels.append(level)
+        for stage in level:
+            done.add(stage.name)
+            del remaining[stage.name]
+    return levels
+
+
+class QuizPipeline:
+    """
+    Runs the quiz agents as a DAG over a shared state dict.
+    Per-question stages fan out concurrently across the configured providers,
+    so a quiz costs roughly one model latency per level instead of one per call.
+
+    Every call's output is checkpointed by content address, so a rerun for the
+    same topic reuses earlier research and a failed run picks up where it
+    stopped when rerun with the same checkpoint scope.
+    """
+
+    def __init__(
+        self,
+        stages: Tuple[PipelineStage, ...] = QUIZ_STAGES,
+        models: Dict[str, List[Tuple[str, str]]] = QUIZ_PIPELINE_MODELS,
+        checkpoints: Optional[CheckpointStore] = None,
+    ) -> None:
+        self._levels = resolve_levels(stages)
+        self._models = models
+        self._checkpoints = checkpoints
+        self._clients: Dict[str, OpenAI] = {}
+
+    def _client(self, service: str) -> OpenAI:
+        if service not in self._clients:
+            self._clients[service] = get_client_for_service(service)
+        return self._clients[service]
+
+    def _provider(self, stage: PipelineStage, index: int, attempt: int) -> Tuple[str, str]:
+        # Deterministic spread: item i starts on provider i, retries move to the next one
+        candidates = self._models[stage.name]
+        return candidates[(index + attempt) % len(candidates)]
+
+    def _candidate_keys(self, stage: PipelineStage, content: str, index: int, scope: Optional[str]) -> List[str]:
+        # Keys for every provider the item may have run on, in attempt order
+        return [
+            checkpoint_key(stage, content, "/".join(self._provider(stage, index, attempt)), scope)
+            for attempt in range(stage.max_attempts)
+        ]
+
+    async def _complete(self, stage: PipelineStage, service: str, model: str, content: str) -> str:
+        client = self._client(service)
+        messages = assemble_messages(stage.instructions, [{"role": USER_ROLE, "content": content}])
+        response = await asyncio.wait_for(
+            asyncio.to_thread(
+                client.chat.completions.create,
+                model=model,
+                messages=messages,
+                timeout=stage.timeout,
+                **cache_request_options(service, stage.instructions),
+            ),
+            timeout=stage.timeout,
+        )
+        if not response.choices or not response.choices[0].message:
+            raise ValueError("Incomplete response received from LLM service.")
+        prompt_cache_stats.record(model, extract_usage(response))
+        return response.choices[0].message.content
+
+    async def _run_item(
+        self,
+        stage: PipelineStage,
+        content: str,
+        index: int,
+        scope: Optional[str],
+        cached: Dict[str, Any],
+        completed: List[Tuple[str, str, str, Any]],
+    ) -> Any:
+        for key in self._candidate_keys(stage, content, index, scope):
+            if key in cached:
+                return cached[key]
+
+        last_error: Optional[Exception] = None
+
+        for attempt in range(stage.max_attempts):
+            service, model = self._provider(stage, index, attempt)
+            try:
+                reply = await self._complete(stage, service, model, content)
+                output = stage.parse_output(reply)
+                model_ref = f"{service}/{model}"
+                completed.append((checkpoint_key(stage, content, model_ref, scope), stage.name, model_ref, output))
+                return output
+            except Exception as e:
+                last_error = e
+                logger.warning(
+                    f"Quiz stage {stage.name}[{index}] attempt {attempt + 1} on {service}/{model} failed: {e}"
+                )
+                if attempt + 1 < stage.max_attempts:
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+
+        raise QuizPipelineError(
+            f"Stage '{stage.name}' failed after {stage.max_attempts} attempts: {last_error}"
+        )
+
+    async def _run_stage(self, stage: PipelineStage, state: dict) -> None:
+        started = time.perf_counter()
+
+        items = state[stage.fan_out_key] if stage.fan_out_key else [None]
+        contents = [stage.build_input(state, item) for item in items]
+        scope = state["checkpoint_scope"]
+
+        cached: Dict[str, Any] = {}
+        if self._checkpoints:
+            keys = [
+                key
+                for i, content in enumerate(contents)
+                for key in self._candidate_keys(stage, content, i, scope)
+            ]
+            cached = await asyncio.to_thread(self._checkpoints.load, keys)
+
+        completed: List[Tuple[str, str, str, Any]] = []
+        try:
+            results = await asyncio.gather(
+                *(
+                    self._run_item(stage, content, i, scope, cached, completed)
+                    for i, content in enumerate(contents)
+                )
+            )
+        finally:
+            # Items that finished are kept even if a sibling failed, so a rerun resumes from them
+            if self._checkpoints and completed:
+                await asyncio.to_thread(self._checkpoints.save, completed)
+
+        state[stage.output_key] = list(results) if stage.fan_out_key else results[0]
+        state["checkpoint_hits"][stage.name] = len(items) - len(completed)
+        state["timings"][stage.name] = round(time.perf_counter() - started, 3)
+        logger.info(
+            f"Quiz stage {stage.name} finished in {state['timings'][stage.name]}s "
+            f"({state['checkpoint_hits'][stage.name]}/{len(items)} from checkpoints)"
+        )
+
+    async def run(self, user_request: str, num_questions: int, checkpoint_scope: Optional[str] = None) -> dict:
+        state = {
+            "user_request": user_request,
+            "num_questions": num_questions,
+            "checkpoint_scope": checkpoint_scope,
+            "timings": {},
+            "checkpoint_hits": {},
+        }
+        started = time.perf_counter()
+
+        for level in self._levels:
+            await asyncio.gather(*(self._run_stage(stage, state) for stage in level))
+
+        state["timings"]["total"] = round(time.perf_counter() - started, 3)
+        return state
@@ -0,0 +1,216 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from app.custom_exceptions import RateLimitExceeded
+from app.services.constants import (
+    RATE_LIMIT_MODEL_REQUESTS_PER_MINUTE,
+    RATE_LIMIT_MODEL_TOKENS_PER_MINUTE,
+    RATE_LIMIT_USER_REQUESTS_PER_MINUTE,
+    RATE_LIMIT_USER_TOKENS_PER_MINUTE,
+)
+
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except ImportError:  # optional, only needed for REDIS_URL
+    redis = None
+
+
+@dataclass(frozen=True)
+class BucketCharge:
+    key: str
+    capacity: float
+    rate: float  # refill per second
+    cost: float
+
+
+class InMemoryBucketBackend:
+    """
+    Token buckets for a single process.
+    """
+
+    def __init__(self) -> None:
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def _level(self, charge: BucketCharge, now: float) -> float:
+        tokens, updated = self._buckets.get(charge.key, (charge.capacity, now))
+        return min(charge.capacity, tokens + max(0.0, now - updated) * charge.rate)
+
+    def consume(self, charges: List[BucketCharge], force: bool = False) -> float:
+        """
+        Take every charge if all buckets can afford it, otherwise take nothing.
+        With force, charges are applied unconditionally (buckets may go negative).
+
+        Returns:
+            0 on success, otherwise the seconds until all buckets can afford it
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = [self._level(charge, now) for charge in charges]
+            wait = 0.0
+            if not force:
+                for charge, level in zip(charges, levels):
+                    if level < charge.cost:
+                        wait = max(wait, (charge.cost - level) / charge.rate)
+            if wait == 0.0:
+                for charge, level in zip(charges, levels):
+                    self._buckets[charge.key] = (level - charge.cost, now)
+            return wait
+
+
+# KEYS: bucket keys. ARGV: force flag, then capacity, rate and cost for each key.
+# Uses the Redis clock so every API worker sees the same time.
+_CONSUME_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local force = ARGV[1] == '1'
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 3 - 1])
+    local rate = tonumber(ARGV[i * 3])
+    local cost = tonumber(ARGV[i * 3 + 1])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    levels[i] = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    if not force and levels[i] < cost then
+        wait = math.max(wait, (cost - levels[i]) / rate)
+    end
+end
+if wait == 0 then
+    for i, key in ipairs(KEYS) do
+        local capacity = tonumber(ARGV[i * 3 - 1])
+        local rate = tonumber(ARGV[i * 3])
+        local cost = tonumber(ARGV[i * 3 + 1])
+        redis.call('HSET', key, 'tokens', tostring(levels[i] - cost), 'ts', tostring(now))
+        redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000) + 60000)
+    end
+end
+return tostring(wait)
+"""
+
+
+class RedisBucketBackend:
+    """
+    Token buckets shared by every API worker, updated atomically by a Lua script
+    on any Redis-compatible server.
+    """
+
+    def __init__(self, url: str) -> None:
+        self._client = redis.Redis.from_url(url)
+        self._consume = self._client.register_script(_CONSUME_SCRIPT)
+
+    def consume(self, charges: List[BucketCharge], force: bool = False) -> float:
+        args: list = ["1" if force else "0"]
+        for charge in charges:
+            args.extend([charge.capacity, charge.rate, charge.cost])
+        return float(self._consume(keys=[charge.key for charge in charges], args=args))
+
+
+class RateLimiter:
+    """
+    Requests and tokens per minute, per user and per (user, model).
+
+    `check` runs before the provider call with an estimate of the prompt tokens
+    and rejects the request without charging anything if any bucket is short.
+    `record` settles the difference once the provider reports actual usage,
+    so a reply larger than estimated delays the user's next requests.
+    """
+
+    def __init__(self, backend=None) -> None:
+        self._backend = backend
+
+    @property
+    def backend(self):
+        # Chosen on first use, after the app has loaded its .env
+        if self._backend is None:
+            self._backend = create_bucket_backend()
+        return self._backend
+
+    def _charges(self, user_id: UUID, model_id: UUID, requests: float, tokens: float) -> List[BucketCharge]:
+        limits = [
+            (f"rl:user:{user_id}:requests", RATE_LIMIT_USER_REQUESTS_PER_MINUTE, requests),
+            (f"rl:user:{user_id}:tokens", RATE_LIMIT_USER_TOKENS_PER_MINUTE, tokens),
+            (f"rl:model:{user_id}:{model_id}:requests", RATE_LIMIT_MODEL_REQUESTS_PER_MINUTE, requests),
+            (f"rl:model:{user_id}:{model_id}:tokens", RATE_LIMIT_MODEL_TOKENS_PER_MINUTE, tokens),
+        ]
+        return [
+            # A prompt larger than a whole bucket is let through once the bucket is full,
+            # `record` then puts the bucket in debt for the remainder
+            BucketCharge(key=key, capacity=limit, rate=limit / 60, cost=min(cost, limit))
+            for key, limit, cost in limits
+        ]
+
+    def check(self, user_id: UUID, model_id: UUID, estimated_tokens: int) -> None:
+        """
+        Raises RateLimitExceeded with the seconds to wait if the request is over a limit.
+        """
+        self.check_all(user_id, [model_id], estimated_tokens)
+
+    def check_all(self, user_id: UUID, model_ids: List[UUID], estimated_tokens: int) -> None:
+        """
+        Check one request fanned out to several models, all or nothing: either
+        every model's charges are taken or, with RateLimitExceeded, none are.
+        The user's own buckets are charged once per model.
+        """
+        merged: Dict[str, BucketCharge] = {}
+        for model_id in model_ids:
+            for charge in self._charges(user_id, model_id, 1, estimated_tokens):
+                previous = merged.get(charge.key)
+                if previous is not None:
+                    # Capped like a single charge so the bucket can still afford it once full
+                    cost = min(previous.cost + charge.cost, charge.capacity)
+                    charge = BucketCharge(key=charge.key, capacity=charge.capacity, rate=charge.rate, cost=cost)
+                merged[charge.key] = charge
+
+        try:
+            wait = self.backend.consume(list(merged.values()))
+        except Exception as e:
+            # Fail open: a limiter outage should not take the chat down with it
+            logger.error(f"Rate limiter unavailable, allowing request: {e}", exc_info=True)
+            return
+        if wait > 0:
+            logger.info(f"Rate limited user {user_id} on models {', '.join(map(str, model_ids))} for {wait:.1f}s")
+            raise RateLimitExceeded(retry_after=wait)
+
+    def record(self, user_id: UUID, model_id: UUID, estimated_tokens: int, usage: Dict[str, int]) -> None:
+        """
+        Charge the difference between the actual and the estimated tokens.
+        """
+        actual = usage["prompt_tokens"] + usage["completion_tokens"]
+        charges = [
+            # c.cost is what `check` charged, the estimate capped at the bucket size
+            BucketCharge(key=c.key, capacity=c.capacity, rate=c.rate, cost=actual - c.cost)
+            for c in self._charges(user_id, model_id, 0, estimated_tokens)
+            if c.key.endswith(":tokens")
+        ]
+        try:
+            self.backend.consume(charges, force=True)
+        except Exception as e:
+            logger.error(f"Could not record usage in rate limiter: {e}", exc_info=True)
+
+
+def create_bucket_backend(redis_url: Optional[str] = None):
+    """
+    Redis-backed buckets shared across workers when REDIS_URL is set,
+    otherwise buckets local to this process.
+    """
+    redis_url = redis_url or os.getenv("REDIS_URL")
+    if redis_url:
+        if redis is None:
+            logger.warning("REDIS_URL is set but the redis package is not installed, using in-process buckets")
+        else:
+            return RedisBucketBackend(redis_url)
+    return InMemoryBucketBackend()
+
+
+rate_limiter = RateLimiter()
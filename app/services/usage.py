@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import threading
+from datetime import date, datetime, timezone
+from typing import Dict, List, Tuple
+from uuid import UUID
+
+from app.database.connection import PostgresConnection
+from app.database.usage_queries import upsert_usage_aggregates
+from app.services.constants import USAGE_FLUSH_INTERVAL_SECONDS
+
+
+logger = logging.getLogger(__name__)
+
+UsageKey = Tuple[UUID, UUID, date]
+
+_FIELDS = ("requests", "prompt_tokens", "completion_tokens", "cached_tokens")
+
+
+class UsageAccumulator:
+    """
+    Sums token usage in memory per (user, model, UTC day) and writes it to
+    usage_daily in one batched upsert per flush, instead of one UPDATE per reply.
+    A failed flush keeps its rows for the next one. Usage of a process that
+    dies between flushes is lost; per-message counts are still on the messages.
+    """
+
+    def __init__(self) -> None:
+        self._pending: Dict[UsageKey, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, user_id: UUID, model_id: UUID, usage: Dict[str, int]) -> None:
+        key = (UUID(str(user_id)), UUID(str(model_id)), datetime.now(timezone.utc).date())
+        with self._lock:
+            totals = self._pending.setdefault(key, dict.fromkeys(_FIELDS, 0))
+            totals["requests"] += 1
+            totals["prompt_tokens"] += usage["prompt_tokens"]
+            totals["completion_tokens"] += usage["completion_tokens"]
+            totals["cached_tokens"] += usage["cached_tokens"]
+
+    def _merge(self, pending: Dict[UsageKey, Dict[str, int]]) -> None:
+        with self._lock:
+            for key, values in pending.items():
+                totals = self._pending.setdefault(key, dict.fromkeys(_FIELDS, 0))
+                for field in _FIELDS:
+                    totals[field] += values[field]
+
+    def flush(self) -> int:
+        """
+        Write pending usage to the database. Returns the number of rows written.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        rows: List[tuple] = [
+            (*key, *(values[field] for field in _FIELDS)) for key, values in pending.items()
+        ]
+        try:
+            with PostgresConnection() as conn:
+                upsert_usage_aggregates(conn, rows)
+        except Exception as e:
+            logger.error(f"Could not flush {len(rows)} usage rows, retrying next flush: {e}", exc_info=True)
+            self._merge(pending)
+            return 0
+        return len(rows)
+
+    async def run(self, interval: float = USAGE_FLUSH_INTERVAL_SECONDS) -> None:
+        """
+        Flush every `interval` seconds until cancelled, then flush what is left.
+        """
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await asyncio.to_thread(self.flush)
+        finally:
+            await asyncio.to_thread(self.flush)
+
+
+usage_accumulator = UsageAccumulator()
@@ -0,0 +1,61 @@
+"""
+Load an NDJSON export (plain, gzip or zstd) into a user's account, e.g. when
+migrating a user from another chat tool after converting their data to the
+export format.
+
+    python import_data.py --user-id <uuid> export.ndjson.gz
+    python import_data.py --user-id <uuid> -   # read from stdin
+
+Everything in the file is added under new ids in one transaction, or nothing is.
+"""
+import argparse
+import logging
+import shutil
+import sys
+import tempfile
+from uuid import UUID
+
+import psycopg2.extras
+from dotenv import load_dotenv
+
+from app.custom_exceptions import ImportRejected, WorkspaceLimitExceeded
+from app.database.connection import PostgresConnection
+from app.database.import_queries import import_ndjson
+from app.services.ndjson import open_lines
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger("import_data")
+
+load_dotenv(override=True)
+psycopg2.extras.register_uuid()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=UUID, required=True)
+    parser.add_argument("path", help="Export file, or - for stdin")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryFile() as spooled:
+        if args.path == "-":
+            # Compression is detected by seeking back, which stdin cannot do
+            shutil.copyfileobj(sys.stdin.buffer, spooled)
+            spooled.seek(0)
+            upload = spooled
+        else:
+            upload = open(args.path, "rb")
+
+        try:
+            with upload, PostgresConnection(pooled=False) as conn:
+                counts = import_ndjson(conn, args.user_id, open_lines(upload))
+        except (ImportRejected, WorkspaceLimitExceeded) as e:
+            logger.error(f"Import rejected: {e.message}")
+            sys.exit(1)
+    logger.info(f"Imported {counts}")
+
+
+if __name__ == "__main__":
+    main()
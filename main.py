@@ -1,14 +1,29 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
+from app.auth.dependencies import load_revoked_tokens
+from app.auth.utils import load_jwt_secret
 from app.constants import ALLOWED_ORIGINS
+from app.database.connection import PostgresConnection, close_pools
+from app.database.replicas import replica_router
+from app.services.invalidation import invalidation_bus
+from app.services.prompt_registry import prompt_registry
+from app.services.usage import usage_accumulator
 from app.routes.chats import router as chat_router
 from app.routes.models import router as model_router
 from app.routes.workspaces import router as workspaces_router
 from app.routes.movements import router as movements_router
 from app.routes.folders import router as folders_router
 from app.routes.auth import router as auth_router
+from app.routes.search import router as search_router
+from app.routes.quizzes import router as quizzes_router
+from app.routes.jobs import router as jobs_router
+from app.routes.personas import router as personas_router
+from app.routes.usage import router as usage_router
+from app.routes.data import router as data_router
 from dotenv import load_dotenv
 from starlette.middleware.sessions import SessionMiddleware
 import os
@@ -21,7 +36,32 @@ logging.basicConfig(
 )
 
 load_dotenv(override=True)
-app = FastAPI()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    load_jwt_secret()
+    prompt_registry.load()
+    try:
+        with PostgresConnection() as conn:
+            load_revoked_tokens(conn)
+    except Exception as e:
+        logging.error(f"Could not load revoked tokens at startup: {e}", exc_info=True)
+
+    usage_flusher = asyncio.create_task(usage_accumulator.run())
+    replica_checker = asyncio.create_task(replica_router.run())
+    invalidation_listener = asyncio.create_task(invalidation_bus.run())
+    yield
+    for task in (usage_flusher, replica_checker, invalidation_listener):
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    close_pools()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -56,4 +96,10 @@ app.include_router(workspaces_router)
 app.include_router(folders_router)
 app.include_router(movements_router)
 app.include_router(auth_router)
+app.include_router(search_router)
+app.include_router(quizzes_router)
+app.include_router(jobs_router)
+app.include_router(personas_router)
+app.include_router(usage_router)
+app.include_router(data_router)
 
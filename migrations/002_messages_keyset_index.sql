@@ -0,0 +1,3 @@
+-- Keyset pagination and streaming of a conversation's messages by message_id.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS messages_conversation_id_message_id_idx
+    ON messages (conversation_id, message_id);
@@ -0,0 +1,18 @@
+-- Full-text search over chat titles and message bodies (GET /api/search).
+-- Stored generated columns keep the vectors in sync on every insert/update path,
+-- including insert_chat_messages, without a trigger.
+-- Adding a stored generated column rewrites the table; run this in a maintenance window
+-- on large installations.
+ALTER TABLE messages
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', coalesce(content, ''))) STORED;
+
+ALTER TABLE conversations
+    ADD COLUMN IF NOT EXISTS title_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', coalesce(title, ''))) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS messages_search_vector_idx
+    ON messages USING GIN (search_vector);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS conversations_title_vector_idx
+    ON conversations USING GIN (title_vector);
@@ -0,0 +1,14 @@
+-- Content-addressed outputs of quiz pipeline stages.
+-- checkpoint_key = sha256(stage, sha256(instructions), sha256(inputs), model), so identical
+-- research is reused across runs; later stages also hash in the user's quiz request, so a
+-- failed run resumes after its last completed stage or item. Rows expire after
+-- QUIZ_CHECKPOINT_TTL_SECONDS and are purged by the purge_checkpoints job.
+CREATE TABLE IF NOT EXISTS pipeline_checkpoints (
+    checkpoint_key  TEXT PRIMARY KEY,
+    stage           TEXT NOT NULL,
+    model           TEXT NOT NULL,
+    output          JSONB NOT NULL,
+    created_at      TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS pipeline_checkpoints_created_at_idx ON pipeline_checkpoints (created_at);
@@ -0,0 +1,30 @@
+-- Durable background job queue, claimed by worker.py with FOR UPDATE SKIP LOCKED.
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id          BIGSERIAL PRIMARY KEY,
+    user_id         UUID REFERENCES users (id) ON DELETE CASCADE,
+    kind            TEXT NOT NULL,
+    payload         JSONB NOT NULL DEFAULT '{}'::jsonb,
+    priority        INTEGER NOT NULL DEFAULT 0,            -- higher runs first
+    status          TEXT NOT NULL DEFAULT 'queued'
+                    CHECK (status IN ('queued', 'running', 'succeeded', 'failed')),
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    max_attempts    INTEGER NOT NULL DEFAULT 3,
+    run_after       TIMESTAMPTZ NOT NULL DEFAULT now(),    -- earliest start, pushed back on retry
+    locked_until    TIMESTAMPTZ,                           -- visibility timeout of a running job
+    locked_by       TEXT,
+    last_error      TEXT,
+    result          JSONB,
+    created_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+    finished_at     TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS jobs_queued_idx
+    ON jobs (priority DESC, run_after, job_id)
+    WHERE status = 'queued';
+
+CREATE INDEX IF NOT EXISTS jobs_running_locked_until_idx
+    ON jobs (locked_until)
+    WHERE status = 'running';
+
+CREATE INDEX IF NOT EXISTS jobs_user_id_idx ON jobs (user_id);
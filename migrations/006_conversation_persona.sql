@@ -0,0 +1,3 @@
+-- System prompt persona of a conversation, a key of the prompt registry
+-- (app/services/prompt_registry.py). NULL means the default assistant persona.
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS persona_id TEXT;
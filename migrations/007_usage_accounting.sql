@@ -0,0 +1,23 @@
+-- Provider token counts of each assistant reply (NULL for user messages).
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS prompt_tokens INTEGER;
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS completion_tokens INTEGER;
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS cached_tokens INTEGER;
+
+-- Prices in USD per million tokens, used to cost usage. A NULL cached price
+-- means cached input tokens are billed at the normal input price.
+ALTER TABLE models ADD COLUMN IF NOT EXISTS input_price_per_million NUMERIC(12, 6);
+ALTER TABLE models ADD COLUMN IF NOT EXISTS cached_input_price_per_million NUMERIC(12, 6);
+ALTER TABLE models ADD COLUMN IF NOT EXISTS output_price_per_million NUMERIC(12, 6);
+
+-- Per-user, per-model daily aggregates, written in batches by the API's usage accumulator.
+CREATE TABLE IF NOT EXISTS usage_daily (
+    user_id             UUID NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    model_id            UUID NOT NULL,
+    day                 DATE NOT NULL,
+    requests            BIGINT NOT NULL DEFAULT 0,
+    prompt_tokens       BIGINT NOT NULL DEFAULT 0,
+    completion_tokens   BIGINT NOT NULL DEFAULT 0,
+    cached_tokens       BIGINT NOT NULL DEFAULT 0,
+    cost_usd            NUMERIC(14, 6) NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, model_id, day)
+);
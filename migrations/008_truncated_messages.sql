@@ -0,0 +1,2 @@
+-- Assistant replies cut short because the client disconnected mid-generation.
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS truncated BOOLEAN NOT NULL DEFAULT false;
@@ -0,0 +1,54 @@
+-- Messages form a tree: edits and regenerations are siblings under the same parent.
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS parent_message_id BIGINT
+    REFERENCES messages (message_id) ON DELETE CASCADE;
+
+-- Existing conversations become a single branch, each message a child of the previous one.
+-- Backfilled a batch of conversations per transaction, so no single statement rewrites
+-- or locks the whole table; run through psql in autocommit mode (as for 002) and
+-- safe to re-run after an interruption.
+DO $$
+DECLARE
+    batch_size CONSTANT INTEGER := 500;
+    last_id UUID;
+    batch UUID[];
+BEGIN
+    LOOP
+        SELECT array_agg(conversation_id) INTO batch
+        FROM (
+            SELECT conversation_id FROM conversations
+            WHERE last_id IS NULL OR conversation_id > last_id
+            ORDER BY conversation_id
+            LIMIT batch_size
+        ) next_batch;
+        EXIT WHEN batch IS NULL;
+
+        UPDATE messages m
+        SET parent_message_id = chain.previous_id
+        FROM (
+            SELECT
+                message_id,
+                LAG(message_id) OVER (PARTITION BY conversation_id ORDER BY created_at, message_id) AS previous_id
+            FROM messages
+            WHERE conversation_id = ANY(batch)
+        ) chain
+        WHERE m.message_id = chain.message_id
+        AND m.conversation_id = ANY(batch)
+        AND chain.previous_id IS NOT NULL
+        AND m.parent_message_id IS NULL;
+
+        last_id := batch[array_upper(batch, 1)];
+        COMMIT;
+    END LOOP;
+END
+$$;
+
+CREATE INDEX IF NOT EXISTS messages_parent_message_id_idx ON messages (parent_message_id);
+
+-- Roots of a conversation (sibling_ids of a first message) without scanning its other messages.
+CREATE INDEX IF NOT EXISTS messages_conversation_id_roots_idx
+    ON messages (conversation_id) WHERE parent_message_id IS NULL;
+
+-- Last message of the branch the conversation shows and continues.
+-- NULL means the newest message, which is where existing conversations already are.
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS active_leaf_message_id BIGINT
+    REFERENCES messages (message_id) ON DELETE SET NULL;
@@ -0,0 +1,192 @@
+-- Counters kept up to date by statement-level triggers, in the same transaction as the
+-- insert, move or delete that changes them, so listings read them instead of COUNT(*).
+ALTER TABLE users ADD COLUMN IF NOT EXISTS workspace_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS global_chat_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE workspaces ADD COLUMN IF NOT EXISTS chat_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE folders ADD COLUMN IF NOT EXISTS chat_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS last_message_at TIMESTAMPTZ;
+
+
+-- Conversations: global chat count per user, chat count per workspace and per folder.
+-- A chat in the global space has neither workspace_id nor folder_id.
+CREATE OR REPLACE FUNCTION conversations_maintain_counters() RETURNS trigger AS $$
+DECLARE
+    changes TEXT;
+BEGIN
+    changes := CASE TG_OP
+        WHEN 'INSERT' THEN
+            'SELECT user_id, workspace_id, folder_id, 1 AS delta FROM new_rows'
+        WHEN 'DELETE' THEN
+            'SELECT user_id, workspace_id, folder_id, -1 AS delta FROM old_rows'
+        ELSE
+            -- Only moves change a counter; skip rows whose location is unchanged
+            'SELECT o.user_id, o.workspace_id, o.folder_id, -1 AS delta
+             FROM old_rows o JOIN new_rows n USING (conversation_id)
+             WHERE (o.user_id, o.workspace_id, o.folder_id) IS DISTINCT FROM (n.user_id, n.workspace_id, n.folder_id)
+             UNION ALL
+             SELECT n.user_id, n.workspace_id, n.folder_id, 1 AS delta
+             FROM old_rows o JOIN new_rows n USING (conversation_id)
+             WHERE (o.user_id, o.workspace_id, o.folder_id) IS DISTINCT FROM (n.user_id, n.workspace_id, n.folder_id)'
+    END;
+
+    EXECUTE format($sql$
+        WITH changes AS (%s),
+        global_chats AS (
+            UPDATE users u
+            SET global_chat_count = u.global_chat_count + d.delta
+            FROM (
+                SELECT user_id, sum(delta) AS delta FROM changes
+                WHERE workspace_id IS NULL AND folder_id IS NULL
+                GROUP BY user_id
+            ) d
+            WHERE u.id = d.user_id AND d.delta <> 0
+        ),
+        workspace_chats AS (
+            UPDATE workspaces w
+            SET chat_count = w.chat_count + d.delta
+            FROM (
+                SELECT workspace_id, sum(delta) AS delta FROM changes
+                WHERE workspace_id IS NOT NULL
+                GROUP BY workspace_id
+            ) d
+            WHERE w.workspace_id = d.workspace_id AND d.delta <> 0
+        )
+        UPDATE folders f
+        SET chat_count = f.chat_count + d.delta
+        FROM (
+            SELECT folder_id, sum(delta) AS delta FROM changes
+            WHERE folder_id IS NOT NULL
+            GROUP BY folder_id
+        ) d
+        WHERE f.folder_id = d.folder_id AND d.delta <> 0
+    $sql$, changes);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow one event per trigger
+DROP TRIGGER IF EXISTS conversations_counters_insert ON conversations;
+CREATE TRIGGER conversations_counters_insert
+    AFTER INSERT ON conversations
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION conversations_maintain_counters();
+
+DROP TRIGGER IF EXISTS conversations_counters_update ON conversations;
+CREATE TRIGGER conversations_counters_update
+    AFTER UPDATE ON conversations
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION conversations_maintain_counters();
+
+DROP TRIGGER IF EXISTS conversations_counters_delete ON conversations;
+CREATE TRIGGER conversations_counters_delete
+    AFTER DELETE ON conversations
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION conversations_maintain_counters();
+
+
+-- Workspaces: workspace count per user, which the workspace limit is checked against.
+CREATE OR REPLACE FUNCTION workspaces_maintain_counters() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE users u
+        SET workspace_count = u.workspace_count + d.delta
+        FROM (SELECT user_id, count(*) AS delta FROM new_rows GROUP BY user_id) d
+        WHERE u.id = d.user_id;
+    ELSE
+        UPDATE users u
+        SET workspace_count = u.workspace_count - d.delta
+        FROM (SELECT user_id, count(*) AS delta FROM old_rows GROUP BY user_id) d
+        WHERE u.id = d.user_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS workspaces_counters_insert ON workspaces;
+CREATE TRIGGER workspaces_counters_insert
+    AFTER INSERT ON workspaces
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION workspaces_maintain_counters();
+
+DROP TRIGGER IF EXISTS workspaces_counters_delete ON workspaces;
+CREATE TRIGGER workspaces_counters_delete
+    AFTER DELETE ON workspaces
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION workspaces_maintain_counters();
+
+
+-- Messages: message count and last message time per conversation.
+-- Conversations being deleted with their messages are already gone when this runs.
+CREATE OR REPLACE FUNCTION messages_maintain_counters() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE conversations c
+        SET message_count = c.message_count + d.added,
+            last_message_at = GREATEST(c.last_message_at, d.last_created_at)
+        FROM (
+            SELECT conversation_id, count(*) AS added, max(created_at) AS last_created_at
+            FROM new_rows
+            GROUP BY conversation_id
+        ) d
+        WHERE c.conversation_id = d.conversation_id;
+    ELSE
+        UPDATE conversations c
+        SET message_count = c.message_count - d.removed,
+            last_message_at = (
+                SELECT max(created_at) FROM messages m WHERE m.conversation_id = c.conversation_id
+            )
+        FROM (
+            SELECT conversation_id, count(*) AS removed
+            FROM old_rows
+            GROUP BY conversation_id
+        ) d
+        WHERE c.conversation_id = d.conversation_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS messages_counters_insert ON messages;
+CREATE TRIGGER messages_counters_insert
+    AFTER INSERT ON messages
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION messages_maintain_counters();
+
+DROP TRIGGER IF EXISTS messages_counters_delete ON messages;
+CREATE TRIGGER messages_counters_delete
+    AFTER DELETE ON messages
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION messages_maintain_counters();
+
+
+-- Backfill. Run while writes are paused: rows written between the backfill and
+-- the triggers being created would otherwise be missed.
+UPDATE users u
+SET workspace_count = COALESCE((SELECT count(*) FROM workspaces w WHERE w.user_id = u.id), 0),
+    global_chat_count = COALESCE((
+        SELECT count(*) FROM conversations c
+        WHERE c.user_id = u.id AND c.workspace_id IS NULL AND c.folder_id IS NULL
+    ), 0);
+
+UPDATE workspaces w
+SET chat_count = (SELECT count(*) FROM conversations c WHERE c.workspace_id = w.workspace_id);
+
+UPDATE folders f
+SET chat_count = (SELECT count(*) FROM conversations c WHERE c.folder_id = f.folder_id);
+
+UPDATE conversations c
+SET message_count = d.message_count,
+    last_message_at = d.last_message_at
+FROM (
+    SELECT conversation_id, count(*) AS message_count, max(created_at) AS last_message_at
+    FROM messages
+    GROUP BY conversation_id
+) d
+WHERE c.conversation_id = d.conversation_id;
+
+-- Global chat listing: the page is read in index order.
+CREATE INDEX IF NOT EXISTS conversations_user_global_updated_at_idx
+    ON conversations (user_id, updated_at DESC)
+    WHERE workspace_id IS NULL AND folder_id IS NULL;
@@ -0,0 +1,27 @@
+-- Cold storage for idle conversations. The conversation row stays as a stub (title,
+-- counters, location) while its messages are kept here as one compressed JSON array,
+-- and are moved back into messages the next time the chat is opened.
+CREATE TABLE IF NOT EXISTS conversation_archives (
+    conversation_id         UUID PRIMARY KEY REFERENCES conversations (conversation_id) ON DELETE CASCADE,
+    codec                   TEXT NOT NULL CHECK (codec IN ('zstd', 'zlib')),
+    payload                 BYTEA NOT NULL,
+    message_count           INTEGER NOT NULL,
+    last_message_at         TIMESTAMPTZ,
+    active_leaf_message_id  BIGINT,
+    raw_bytes               BIGINT NOT NULL,
+    compressed_bytes        BIGINT NOT NULL,
+    archived_at             TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- The payload is already compressed, skip TOAST's own compression attempt.
+ALTER TABLE conversation_archives ALTER COLUMN payload SET STORAGE EXTERNAL;
+
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS archived_at TIMESTAMPTZ;
+-- Set when an archived conversation is read back; it is not archived again for
+-- another idle period, so reading an old chat does not cycle it through the archive.
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS rehydrated_at TIMESTAMPTZ;
+
+-- Archiver candidates: hot conversations by last activity.
+CREATE INDEX IF NOT EXISTS conversations_last_message_at_idx
+    ON conversations (last_message_at)
+    WHERE archived_at IS NULL;
@@ -0,0 +1,48 @@
+-- Cache invalidation events for in-process caches, published on the
+-- `cache_invalidation` channel as '<entity>:<key>'. NOTIFY is delivered when the
+-- writing transaction commits and never if it rolls back; identical payloads in
+-- one transaction are sent once. Every API process LISTENs and evicts.
+-- Only entities with an in-process cache are published: NOTIFY takes a global
+-- lock at commit, so it stays off the chat, folder and workspace write paths.
+
+
+-- Revoked tokens: the key carries the expiry so listeners need no lookup.
+CREATE OR REPLACE FUNCTION notify_revoked_token() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify(
+        'cache_invalidation',
+        'revoked_token:' || NEW.jti || ':' || EXTRACT(EPOCH FROM NEW.expires_at)::float8
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS revoked_tokens_notify ON revoked_tokens;
+CREATE TRIGGER revoked_tokens_notify
+    AFTER INSERT ON revoked_tokens
+    FOR EACH ROW EXECUTE FUNCTION notify_revoked_token();
+
+
+-- Models: edited by hand or by deploy scripts, so notified from the table itself.
+CREATE OR REPLACE FUNCTION notify_model_changed() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM pg_notify('cache_invalidation', 'model:*');
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('cache_invalidation', 'model:' || OLD.model_id);
+    ELSE
+        PERFORM pg_notify('cache_invalidation', 'model:' || NEW.model_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS models_notify ON models;
+CREATE TRIGGER models_notify
+    AFTER INSERT OR UPDATE OR DELETE ON models
+    FOR EACH ROW EXECUTE FUNCTION notify_model_changed();
+
+DROP TRIGGER IF EXISTS models_notify_truncate ON models;
+CREATE TRIGGER models_notify_truncate
+    AFTER TRUNCATE ON models
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_model_changed();
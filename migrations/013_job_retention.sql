@@ -0,0 +1,4 @@
+-- Finished jobs are deleted after JOB_RETENTION_DAYS by the purge_jobs job, oldest first.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS jobs_finished_at_idx
+    ON jobs (finished_at)
+    WHERE status IN ('succeeded', 'failed');
@@ -0,0 +1,188 @@
+"""
+Online migration of `messages` to a table hash partitioned on conversation_id.
+
+    python partition_messages.py prepare            # partitioned copy + mirror trigger
+    python partition_messages.py backfill           # copy existing rows in batches, resumable with --after
+    python partition_messages.py status             # progress and rows not copied yet
+    python partition_messages.py swap               # rename the copy into place (brief exclusive lock)
+    python partition_messages.py validate           # validate the re-created foreign key
+    python partition_messages.py verify-pruning --conversation-id ... --user-id ...
+
+The API and workers keep running throughout: until the swap every write to
+`messages` is mirrored into the copy by a trigger.
+"""
+import argparse
+import logging
+import sys
+import time
+from uuid import UUID
+
+import psycopg2.extras
+from dotenv import load_dotenv
+
+from app.constants import MESSAGE_HASH_PARTITIONS
+from app.database.chat_queries import (
+    select_chat_by_id,
+    select_chat_context_by_id,
+    select_chat_header_by_id,
+    select_chat_page_by_id,
+    select_first_user_message,
+    stream_chat_messages,
+)
+from app.database.connection import PostgresConnection
+from app.database.partition_queries import (
+    PlanRecorder,
+    copy_messages_batch,
+    create_partitioned_messages,
+    is_partitioned,
+    partitions_in_plan,
+    select_copy_progress,
+    select_missing_messages,
+    swap_in_partitioned_messages,
+    validate_partitioned_messages,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger("partition_messages")
+
+load_dotenv(override=True)
+psycopg2.extras.register_uuid()
+
+
+def prepare(args: argparse.Namespace) -> None:
+    with PostgresConnection(pooled=False) as conn:
+        if is_partitioned(conn):
+            logger.info("messages is already partitioned")
+            return
+        create_partitioned_messages(conn, args.partitions)
+    logger.info(f"Created the partitioned copy with {args.partitions} partitions, writes are now mirrored")
+
+
+def backfill(args: argparse.Namespace) -> None:
+    after = args.after
+    copied = 0
+    started = time.monotonic()
+    while True:
+        # One short transaction per batch keeps row locks and WAL bursts small
+        with PostgresConnection(pooled=False) as conn:
+            last_id = copy_messages_batch(conn, after, args.batch_size)
+        if last_id is None:
+            break
+        copied += args.batch_size
+        after = last_id
+        if copied % (args.batch_size * 20) == 0:
+            rate = copied / max(time.monotonic() - started, 1e-6)
+            logger.info(f"Copied up to message_id {after} (~{rate:,.0f} rows/s), resume with --after {after}")
+        if args.pause:
+            time.sleep(args.pause)
+    logger.info(f"Backfill done up to message_id {after}")
+
+
+def status(args: argparse.Namespace) -> None:
+    with PostgresConnection(pooled=False) as conn:
+        progress = select_copy_progress(conn)
+        missing = select_missing_messages(conn)
+    logger.info(f"~{progress['copied_rows']:,} of ~{progress['source_rows']:,} rows copied")
+    if missing:
+        logger.info(f"Not copied yet, e.g. message_id {', '.join(map(str, missing))}")
+    else:
+        logger.info("Every message is in the partitioned copy, ready to swap")
+
+
+def swap(args: argparse.Namespace) -> None:
+    with PostgresConnection(pooled=False) as conn:
+        missing = select_missing_messages(conn, limit=1)
+    if missing:
+        logger.error(f"message_id {missing[0]} has not been copied yet, finish the backfill first")
+        sys.exit(1)
+
+    with PostgresConnection(pooled=False) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SET LOCAL lock_timeout = %s;", (f"{args.lock_timeout}s",))
+        swap_in_partitioned_messages(conn)
+    logger.info("messages is now partitioned, run `validate`, then drop messages_unpartitioned when satisfied")
+
+
+def validate(args: argparse.Namespace) -> None:
+    with PostgresConnection(pooled=False) as conn:
+        validate_partitioned_messages(conn)
+    logger.info("Foreign keys validated")
+
+
+def verify_pruning(args: argparse.Namespace) -> None:
+    """
+    EXPLAIN the chat read queries for one conversation and check that each
+    reads a single partition of messages, with custom plans and with the
+    generic plans prepared statements switch to. A generic plan has no
+    conversation_id to prune with when planned; it prunes when it starts.
+    """
+    chat_id, user_id = args.conversation_id, args.user_id
+    checks = {
+        "select_chat_context_by_id": lambda conn: select_chat_context_by_id(conn, chat_id, user_id),
+        "select_chat_by_id": lambda conn: select_chat_by_id(conn, chat_id, user_id),
+        "select_chat_page_by_id (latest)": lambda conn: select_chat_page_by_id(conn, chat_id, user_id, 50),
+        "select_chat_page_by_id (after)": lambda conn: select_chat_page_by_id(conn, chat_id, user_id, 50, after=1),
+        "select_chat_header_by_id": lambda conn: select_chat_header_by_id(conn, chat_id, user_id),
+        "stream_chat_messages": lambda conn: list(stream_chat_messages(conn, chat_id, user_id)),
+        "select_first_user_message": lambda conn: select_first_user_message(conn, chat_id, user_id),
+    }
+
+    failed = False
+    with PostgresConnection(pooled=False) as conn:
+        if not is_partitioned(conn):
+            logger.error("messages is not partitioned yet")
+            sys.exit(1)
+        for plan_cache_mode in ("force_custom_plan", "force_generic_plan"):
+            with conn.cursor() as cursor:
+                cursor.execute("SET LOCAL plan_cache_mode = %s;", (plan_cache_mode,))
+            plan_kind = plan_cache_mode.split("_")[1]
+            for name, run in checks.items():
+                recorder = PlanRecorder(conn)
+                run(recorder)
+                partitions = set().union(*(partitions_in_plan(plan) for plan in recorder.plans))
+                ok = len(partitions) <= 1
+                failed = failed or not ok
+                logger.info(
+                    f"{'ok  ' if ok else 'FAIL'} {name} ({plan_kind} plan): "
+                    f"{', '.join(sorted(partitions)) or 'no partition'}"
+                )
+    if failed:
+        sys.exit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("prepare")
+    command.add_argument("--partitions", type=int, default=MESSAGE_HASH_PARTITIONS)
+    command.set_defaults(run=prepare)
+
+    command = commands.add_parser("backfill")
+    command.add_argument("--batch-size", type=int, default=5000)
+    command.add_argument("--after", type=int, default=0, help="Resume after this message_id")
+    command.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    command.set_defaults(run=backfill)
+
+    commands.add_parser("status").set_defaults(run=status)
+
+    command = commands.add_parser("swap")
+    command.add_argument("--lock-timeout", type=int, default=5, help="Give up if messages cannot be locked in time")
+    command.set_defaults(run=swap)
+
+    commands.add_parser("validate").set_defaults(run=validate)
+
+    command = commands.add_parser("verify-pruning")
+    command.add_argument("--conversation-id", type=UUID, required=True)
+    command.add_argument("--user-id", type=UUID, required=True)
+    command.set_defaults(run=verify_pruning)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Compare the statements behind creating a chat: the single-statement
+insert_chat_with_messages against the former path (INSERT the conversation,
+draw message ids, INSERT the messages), reporting round trips and latency
+per creation.
+
+    python scripts/bench_create_chat.py --user-id <uuid> --model-id <uuid>
+    python scripts/bench_create_chat.py --user-id <uuid> --model-id <uuid> --runs 500
+
+Every creation runs in its own transaction and is rolled back, so the
+database is left as it was (apart from the message id sequence). Run it
+from a host as far from the database as the API servers are: the gap
+between the two paths is mostly network round trips.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+from uuid import UUID
+
+import psycopg2
+import psycopg2.extras
+from dotenv import load_dotenv
+from psycopg2.extensions import connection as PGConnection
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.chat_queries import insert_chat_messages, insert_chat_with_messages  # noqa: E402
+from app.routes.constant import ASSISTANT_ROLE, DEFAULT_CHAT_TITLE, USER_ROLE  # noqa: E402
+
+load_dotenv(override=True)
+psycopg2.extras.register_uuid()
+
+USER_CONTENT = "What is the difference between a process and a thread?"
+ASSISTANT_CONTENT = "A process has its own address space; threads share their process's. " * 20
+USAGE = {"prompt_tokens": 14, "completion_tokens": 280, "cached_tokens": 0}
+
+
+class _CountedCursor:
+    """
+    Cursor proxy counting execute calls, whichever cursor_factory the query asked for.
+    """
+
+    def __init__(self, cursor, counter: Dict[str, int]) -> None:
+        self._cursor = cursor
+        self._counter = counter
+
+    def execute(self, *args, **kwargs):
+        self._counter["statements"] += 1
+        return self._cursor.execute(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        self._cursor.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._cursor.__exit__(*exc)
+
+
+class CountingConnection(psycopg2.extensions.connection):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.counter = {"statements": 0}
+
+    def cursor(self, *args, **kwargs):
+        return _CountedCursor(super().cursor(*args, **kwargs), self.counter)
+
+
+def create_in_one_statement(conn: PGConnection, user_id: UUID, model_id: UUID) -> None:
+    insert_chat_with_messages(
+        conn, user_id, model_id, DEFAULT_CHAT_TITLE, USER_CONTENT, ASSISTANT_CONTENT, usage=USAGE
+    )
+
+
+def create_in_steps(conn: PGConnection, user_id: UUID, model_id: UUID) -> None:
+    # The conversation INSERT create_chat ran before the messages were folded in
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO conversations (user_id, current_model_id, title)
+            VALUES (%s, %s, %s)
+            RETURNING conversation_id;
+            """,
+            (user_id, model_id, DEFAULT_CHAT_TITLE),
+        )
+        conversation_id = cursor.fetchone()[0]
+    insert_chat_messages(conn, [
+        (conversation_id, USER_ROLE, None, USER_CONTENT),
+        (conversation_id, ASSISTANT_ROLE, model_id, ASSISTANT_CONTENT, USAGE),
+    ])
+
+
+def run(
+    conn: CountingConnection,
+    create: Callable[[PGConnection, UUID, UUID], None],
+    user_id: UUID,
+    model_id: UUID,
+    runs: int,
+    warmup: int,
+) -> Dict[str, float]:
+    timings: List[float] = []
+    round_trips = 0
+    for i in range(warmup + runs):
+        conn.counter["statements"] = 0
+        started = time.perf_counter()
+        create(conn, user_id, model_id)
+        conn.rollback()
+        elapsed = time.perf_counter() - started
+        if i >= warmup:
+            timings.append(elapsed * 1000)
+            # psycopg2 sends BEGIN on its own before the first statement, then the rollback
+            round_trips = conn.counter["statements"] + 2
+    timings.sort()
+    return {
+        "round_trips": round_trips,
+        "mean_ms": statistics.fmean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=UUID, required=True, help="Existing user to create the chats for")
+    parser.add_argument("--model-id", type=UUID, required=True, help="Existing model for the assistant reply")
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(
+        connection_factory=CountingConnection,
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("BRANCH_DB_HOST"),
+        port=os.getenv("DB_PORT"),
+        database=os.getenv("DB_NAME"),
+        sslmode="require",
+    )
+    try:
+        for label, create in (("one statement", create_in_one_statement), ("three steps", create_in_steps)):
+            result = run(conn, create, args.user_id, args.model_id, args.runs, args.warmup)
+            print(
+                f"{label:>14}: {result['round_trips']} round trips, "
+                f"mean {result['mean_ms']:.2f} ms, p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms"
+            )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""
+Compare the chat queries on hash partitioned and unpartitioned messages,
+while both tables exist: between `partition_messages.py prepare` + `backfill`
+and dropping messages_unpartitioned after the swap. Reports latency per
+call of the chat reads (as prepared statements, with the plans Postgres
+picks and forced onto generic plans) and of inserting a reply, and the
+partitions each read's generic plan touches.
+
+    python scripts/bench_partitioning.py --user-id <uuid> --model-id <uuid> --chats 2000 --messages 50
+    python scripts/bench_partitioning.py --user-id <uuid> --chat-id <uuid>
+
+With --chats, that many chats of --messages messages each are written to
+both tables first; with --chat-id an existing, backfilled chat is read.
+Everything runs in one transaction that is rolled back, so the database is
+left as it was (apart from the message id sequence). The same query
+functions run on both layouts, with `messages` in their SQL pointed at the
+other table. Inserts also pay for the triggers on each table, listed in the
+output: the mirror trigger before the swap, the counter triggers after it.
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+from uuid import UUID
+
+import psycopg2.extras
+from dotenv import load_dotenv
+from psycopg2 import sql
+from psycopg2.extensions import connection as PGConnection
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.chat_queries import (  # noqa: E402
+    insert_chat_messages,
+    select_chat_by_id,
+    select_chat_context_by_id,
+    select_chat_page_by_id,
+)
+from app.database.connection import PostgresConnection  # noqa: E402
+from app.database.partition_queries import (  # noqa: E402
+    PARTITIONED_TABLE,
+    RETIRED_TABLE,
+    PlanRecorder,
+    is_partitioned,
+    partitions_in_plan,
+)
+from app.database.prepared import statement_registry  # noqa: E402
+from app.routes.constant import ASSISTANT_ROLE, USER_ROLE  # noqa: E402
+
+load_dotenv(override=True)
+psycopg2.extras.register_uuid()
+
+CONTENT = "Partitioning splits one large table into smaller ones by a key. " * 8
+USAGE = {"prompt_tokens": 120, "completion_tokens": 180, "cached_tokens": 0}
+# Table references in the chat queries; the 'messages' JSON keys are left alone
+MESSAGES_TABLE = re.compile(r"\b(FROM|JOIN|INTO|UPDATE)(\s+)messages\b")
+
+
+class _RetargetedCursor:
+    """
+    Cursor proxy running each statement with `messages` replaced by another table.
+    """
+
+    def __init__(self, cursor, table: str) -> None:
+        self._cursor = cursor
+        self._table = table
+
+    def execute(self, query, params=None):
+        return self._cursor.execute(MESSAGES_TABLE.sub(rf"\1\2{self._table}", query), params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        self._cursor.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._cursor.__exit__(*exc)
+
+
+class RetargetedConnection:
+    """
+    Stands in for a connection in the query functions, reading and writing
+    `table` wherever they use `messages`.
+    """
+
+    def __init__(self, conn: PGConnection, table: str) -> None:
+        self._conn = conn
+        self._table = table
+
+    def cursor(self, *args, **kwargs) -> _RetargetedCursor:
+        return _RetargetedCursor(self._conn.cursor(*args, **kwargs), self._table)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def seed(conn: PGConnection, tables: List[str], user_id: UUID, model_id: UUID, chats: int, messages: int) -> None:
+    """
+    Write the same chats, each one branch of alternating user and assistant
+    messages, to every table in `tables`.
+    """
+    with conn.cursor() as cursor:
+        # role may be an enum, which a CASE of text values does not convert to on insert
+        cursor.execute(
+            "SELECT format_type(atttypid, atttypmod) FROM pg_attribute"
+            " WHERE attrelid = 'messages'::regclass AND attname = 'role';"
+        )
+        role_type = sql.SQL(cursor.fetchone()[0])
+        cursor.execute(
+            sql.SQL("""
+            CREATE TEMP TABLE bench_messages ON COMMIT DROP AS
+            WITH new_chats AS (
+                INSERT INTO conversations (user_id, current_model_id, title)
+                SELECT %(user_id)s, %(model_id)s, 'Partitioning benchmark'
+                FROM generate_series(1, %(chats)s)
+                RETURNING conversation_id
+            ),
+            ids AS (
+                SELECT
+                    conversation_id,
+                    n,
+                    nextval(pg_get_serial_sequence('messages', 'message_id')) AS message_id
+                FROM new_chats, generate_series(1, %(messages)s) AS n
+            )
+            SELECT
+                message_id,
+                lag(message_id) OVER (PARTITION BY conversation_id ORDER BY message_id) AS parent_message_id,
+                conversation_id,
+                (CASE WHEN n %% 2 = 1 THEN %(user_role)s ELSE %(assistant_role)s END)::{role_type} AS role,
+                CASE WHEN n %% 2 = 1 THEN NULL ELSE %(model_id)s END AS model_id,
+                %(content)s AS content
+            FROM ids;
+            """).format(role_type=role_type),
+            {
+                "user_id": user_id,
+                "model_id": model_id,
+                "chats": chats,
+                "messages": messages,
+                "user_role": USER_ROLE,
+                "assistant_role": ASSISTANT_ROLE,
+                "content": CONTENT,
+            },
+        )
+        for table in tables:
+            # Before the swap the mirror trigger also copies the rows written to messages
+            cursor.execute(
+                sql.SQL("""
+                INSERT INTO {table} (message_id, parent_message_id, conversation_id, role, model_id, content)
+                SELECT message_id, parent_message_id, conversation_id, role, model_id, content
+                FROM bench_messages
+                ON CONFLICT DO NOTHING;
+                """).format(table=sql.Identifier(table))
+            )
+        cursor.execute(
+            """
+            UPDATE conversations c
+            SET active_leaf_message_id = leaf.message_id
+            FROM (SELECT conversation_id, max(message_id) AS message_id FROM bench_messages GROUP BY 1) leaf
+            WHERE c.conversation_id = leaf.conversation_id;
+            """
+        )
+        # Statistics for the new rows; rolled back with them
+        for table in tables:
+            cursor.execute(sql.SQL("ANALYZE {};").format(sql.Identifier(table)))
+
+
+def select_bench_chats(conn: PGConnection, user_id: UUID, chat_id: Optional[UUID]) -> List[Dict]:
+    """
+    The chats to read and reply to, with their root message (replies go
+    there, so the active leaf is left alone) and model.
+    """
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+        cursor.execute(
+            """
+            SELECT c.conversation_id, c.current_model_id, root.message_id AS root_message_id
+            FROM conversations c
+            CROSS JOIN LATERAL (
+                SELECT min(message_id) AS message_id
+                FROM messages m
+                WHERE m.conversation_id = c.conversation_id AND m.parent_message_id IS NULL
+            ) root
+            WHERE c.user_id = %s
+            AND (%s::uuid IS NULL OR c.conversation_id = %s)
+            AND (%s::uuid IS NOT NULL OR c.title = 'Partitioning benchmark')
+            AND root.message_id IS NOT NULL;
+            """,
+            (user_id, chat_id, chat_id, chat_id),
+        )
+        return cursor.fetchall()
+
+
+def select_triggers(conn: PGConnection, table: str) -> List[str]:
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT tgname FROM pg_trigger WHERE tgrelid = %s::regclass AND NOT tgisinternal ORDER BY tgname;",
+            (table,),
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def measure(call: Callable[[int], object], runs: int, warmup: int) -> Dict[str, float]:
+    timings: List[float] = []
+    for i in range(warmup + runs):
+        started = time.perf_counter()
+        call(i)
+        elapsed = time.perf_counter() - started
+        if i >= warmup:
+            timings.append(elapsed * 1000)
+    timings.sort()
+    return {
+        "mean_ms": statistics.fmean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def set_plan_cache_mode(conn: PGConnection, mode: str) -> None:
+    with conn.cursor() as cursor:
+        cursor.execute("SET LOCAL plan_cache_mode = %s;", (mode,))
+
+
+def bench_layout(
+    conn: PGConnection, table: str, user_id: UUID, chats: List[Dict], runs: int, warmup: int
+) -> None:
+    # The statements are prepared again with this layout's table
+    with conn.cursor() as cursor:
+        cursor.execute("DEALLOCATE ALL;")
+    statement_registry.forget(conn)
+    target = RetargetedConnection(conn, table)
+
+    def chat(i: int) -> Dict:
+        return chats[i % len(chats)]
+
+    reads = {
+        "select_chat_context_by_id": lambda c, i: select_chat_context_by_id(c, chat(i)["conversation_id"], user_id),
+        "select_chat_by_id": lambda c, i: select_chat_by_id(c, chat(i)["conversation_id"], user_id),
+        "select_chat_page_by_id": lambda c, i: select_chat_page_by_id(c, chat(i)["conversation_id"], user_id, 50),
+    }
+    for name, read in reads.items():
+        set_plan_cache_mode(conn, "auto")
+        chosen = measure(lambda i: read(target, i), runs, warmup)
+        set_plan_cache_mode(conn, "force_generic_plan")
+        generic = measure(lambda i: read(target, i), runs, warmup)
+        recorder = PlanRecorder(target)
+        read(recorder, 0)
+        partitions = set().union(*(partitions_in_plan(plan) for plan in recorder.plans))
+        print(
+            f"  {name:<28}{chosen['p50_ms']:>9.3f}ms{chosen['p95_ms']:>9.3f}ms"
+            f"{generic['p50_ms']:>9.3f}ms{generic['p95_ms']:>9.3f}ms"
+            f"{len(partitions) if partitions else '-':>12}"
+        )
+    set_plan_cache_mode(conn, "auto")
+
+    def reply(i: int) -> None:
+        row = chat(i)
+        insert_chat_messages(
+            target,
+            [
+                (row["conversation_id"], USER_ROLE, None, CONTENT),
+                (row["conversation_id"], ASSISTANT_ROLE, row["current_model_id"], CONTENT, USAGE),
+            ],
+            parent_message_id=row["root_message_id"],
+            keep_active_branch=True,
+        )
+
+    inserted = measure(reply, runs, warmup)
+    print(f"  {'insert_chat_messages':<28}{inserted['p50_ms']:>9.3f}ms{inserted['p95_ms']:>9.3f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=UUID, required=True, help="Existing user owning the chats")
+    parser.add_argument("--model-id", type=UUID, help="Existing model for the seeded assistant messages")
+    parser.add_argument("--chat-id", type=UUID, help="Read this backfilled chat instead of seeding")
+    parser.add_argument("--chats", type=int, default=1000, help="Chats to seed")
+    parser.add_argument("--messages", type=int, default=50, help="Messages per seeded chat")
+    parser.add_argument("--runs", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=20)
+    args = parser.parse_args()
+    if args.chat_id is None and args.model_id is None:
+        parser.error("--model-id is needed to seed chats, or pass --chat-id")
+
+    with PostgresConnection(pooled=False) as conn:
+        if is_partitioned(conn):
+            layouts = {"partitioned": "messages", "unpartitioned": RETIRED_TABLE}
+        else:
+            layouts = {"partitioned": PARTITIONED_TABLE, "unpartitioned": "messages"}
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT to_regclass(%s) IS NOT NULL AND to_regclass(%s) IS NOT NULL;",
+                tuple(layouts.values()),
+            )
+            if not cursor.fetchone()[0]:
+                print("Only one layout exists: run `partition_messages.py prepare` and `backfill` first")
+                sys.exit(1)
+
+        if args.chat_id is None:
+            started = time.perf_counter()
+            seed(conn, list(layouts.values()), args.user_id, args.model_id, args.chats, args.messages)
+            print(f"Seeded {args.chats * args.messages:,} messages in {time.perf_counter() - started:.1f}s")
+        chats = select_bench_chats(conn, args.user_id, args.chat_id)
+        if not chats:
+            print("No chat to read: check --user-id and --chat-id")
+            sys.exit(1)
+
+        for layout, table in layouts.items():
+            triggers = ", ".join(select_triggers(conn, table)) or "none"
+            print(f"{layout} ({table}, triggers: {triggers})")
+            print(f"  {'query':<28}{'p50':>11}{'p95':>11}{'generic p50':>11}{'generic p95':>11}{'partitions':>12}")
+            bench_layout(conn, table, args.user_id, chats, args.runs, args.warmup)
+        conn.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Compare the hot read queries run as prepared statements (EXECUTE of a
+statement prepared once per connection) against plain queries parsed and
+planned on every call, reporting latency per call for each.
+
+    python scripts/bench_prepared_statements.py --user-id <uuid> --chat-id <uuid>
+    python scripts/bench_prepared_statements.py --user-id <uuid> --chat-id <uuid> --runs 1000
+
+Both modes run the same queries on the same connection, so the difference is
+the parse and plan time prepared statements save. Postgres switches a
+prepared statement to a cached generic plan after five executions; the
+warmup runs cover that. Use a chat with a realistic number of messages.
+Read only: nothing is written.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+from uuid import UUID
+
+import psycopg2.extras
+from dotenv import load_dotenv
+from psycopg2.extensions import connection as PGConnection
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.chat_queries import (  # noqa: E402
+    select_chat_by_id,
+    select_chat_context_by_id,
+    select_chat_page_by_id,
+    select_user_chat_titles_and_count_single_row,
+)
+from app.database.connection import PostgresConnection  # noqa: E402
+from app.database.prepared import statement_registry  # noqa: E402
+from app.database.workspace_queries import get_user_workspaces_query  # noqa: E402
+
+load_dotenv(override=True)
+psycopg2.extras.register_uuid()
+
+
+def hot_queries(user_id: UUID, chat_id: UUID) -> List[Tuple[str, Callable[[PGConnection], object]]]:
+    return [
+        ("select_chat_context_by_id", lambda conn: select_chat_context_by_id(conn, chat_id, user_id)),
+        ("select_chat_by_id", lambda conn: select_chat_by_id(conn, chat_id, user_id)),
+        ("select_chat_page_by_id", lambda conn: select_chat_page_by_id(conn, chat_id, user_id, 50)),
+        ("select_user_chat_titles", lambda conn: select_user_chat_titles_and_count_single_row(conn, user_id, 20, 0)),
+        ("get_user_workspaces", lambda conn: get_user_workspaces_query(conn, user_id)),
+    ]
+
+
+def measure(conn: PGConnection, query: Callable[[PGConnection], object], runs: int, warmup: int) -> Dict[str, float]:
+    timings: List[float] = []
+    for i in range(warmup + runs):
+        started = time.perf_counter()
+        query(conn)
+        elapsed = time.perf_counter() - started
+        if i >= warmup:
+            timings.append(elapsed * 1000)
+    timings.sort()
+    return {
+        "mean_ms": statistics.fmean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=UUID, required=True)
+    parser.add_argument("--chat-id", type=UUID, required=True, help="A chat of the user, not archived")
+    parser.add_argument("--runs", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'query':<28}{'plain p50':>12}{'prepared p50':>14}{'plain mean':>12}{'prepared mean':>15}{'saved':>9}")
+    # Read only, so the transaction is simply kept open and rolled back at the end
+    with PostgresConnection(pooled=False, readonly=True) as conn:
+        for label, query in hot_queries(args.user_id, args.chat_id):
+            statement_registry.enabled = False
+            plain = measure(conn, query, args.runs, args.warmup)
+            statement_registry.enabled = True
+            prepared = measure(conn, query, args.runs, args.warmup)
+            saved = 1 - prepared["mean_ms"] / plain["mean_ms"] if plain["mean_ms"] else 0.0
+            print(
+                f"{label:<28}{plain['p50_ms']:>10.3f}ms{prepared['p50_ms']:>12.3f}ms"
+                f"{plain['mean_ms']:>10.3f}ms{prepared['mean_ms']:>13.3f}ms{saved:>9.1%}"
+            )
+        conn.rollback()
+
+
+if __name__ == "__main__":
+    main()
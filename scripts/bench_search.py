@@ -0,0 +1,181 @@
+"""
+Measure chat search latency: the first page of results (no cursor) against
+a later page reached by following next_cursor, reporting p50/p95 per call.
+
+    python scripts/bench_search.py --user-id <uuid> --model-id <uuid> --chats 500 --messages 100
+    python scripts/bench_search.py --user-id <uuid> --chats 0 --query "replica lag"
+
+With --chats, that many chats of --messages messages each, made of words
+from a small technical vocabulary, are added to the user first; --chats 0
+searches the user's existing chats. Everything runs in one transaction that
+is rolled back. Seeded rows are not committed, so they are still in the
+GIN index's pending list; for absolute numbers prefer a user with real,
+committed history. Archived chats only match on their title.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+import psycopg2.extras
+from dotenv import load_dotenv
+from psycopg2.extensions import connection as PGConnection
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.connection import PostgresConnection  # noqa: E402
+from app.database.search_queries import search_user_chats_query  # noqa: E402
+from app.routes.constant import USER_ROLE  # noqa: E402
+
+load_dotenv(override=True)
+psycopg2.extras.register_uuid()
+
+VOCABULARY = [
+    "postgres", "index", "query", "partition", "replica", "lag", "cache", "latency", "throughput",
+    "connection", "pool", "transaction", "lock", "vacuum", "snapshot", "cursor", "plan", "join",
+    "scan", "sequence", "trigger", "schema", "migration", "backup", "restore", "shard", "queue",
+    "worker", "thread", "process", "memory", "buffer", "disk", "network", "timeout", "retry",
+    "token", "model", "prompt", "context", "stream", "batch", "commit", "rollback", "checkpoint",
+]
+
+
+def seed(conn: PGConnection, user_id: UUID, model_id: UUID, chats: int, messages: int, words: int) -> None:
+    """
+    Add `chats` chats of `messages` user messages, each `words` random words
+    from VOCABULARY, titled with a few of them.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO conversations (user_id, current_model_id, title)
+            SELECT
+                %(user_id)s,
+                %(model_id)s,
+                initcap(
+                    (%(vocabulary)s::text[])[1 + floor(random() * %(vocabulary_size)s)::int] || ' '
+                    || (%(vocabulary)s::text[])[1 + floor(random() * %(vocabulary_size)s)::int]
+                )
+            FROM generate_series(1, %(chats)s)
+            RETURNING conversation_id;
+            """,
+            {
+                "user_id": user_id,
+                "model_id": model_id,
+                "vocabulary": VOCABULARY,
+                "vocabulary_size": len(VOCABULARY),
+                "chats": chats,
+            },
+        )
+        chat_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            """
+            INSERT INTO messages (conversation_id, role, content)
+            SELECT
+                chat.conversation_id,
+                %(role)s,
+                (
+                    -- Refers to the outer row so the words are drawn again for every message
+                    SELECT string_agg(
+                        (%(vocabulary)s::text[])[1 + floor(random() * %(vocabulary_size)s)::int], ' '
+                    )
+                    FROM generate_series(1, %(words)s)
+                    WHERE n.n > 0
+                )
+            FROM unnest(%(chat_ids)s::uuid[]) AS chat(conversation_id), generate_series(1, %(messages)s) AS n(n);
+            """,
+            {
+                "role": USER_ROLE,
+                "vocabulary": VOCABULARY,
+                "vocabulary_size": len(VOCABULARY),
+                "words": words,
+                "chat_ids": chat_ids,
+                "messages": messages,
+            },
+        )
+
+
+def measure(call: Callable[[], object], runs: int, warmup: int) -> Dict[str, float]:
+    timings: List[float] = []
+    for i in range(warmup + runs):
+        started = time.perf_counter()
+        call()
+        elapsed = time.perf_counter() - started
+        if i >= warmup:
+            timings.append(elapsed * 1000)
+    timings.sort()
+    return {
+        "mean_ms": statistics.fmean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def cursor_of_page(
+    conn: PGConnection, user_id: UUID, query: str, limit: int, page: int
+) -> Tuple[Optional[Tuple[float, str]], int]:
+    """
+    The (after_rank, after_key) that fetches page `page` (1 is the first),
+    following the pages like a client does, and the page it got to.
+    """
+    after_rank, after_key = None, None
+    for reached in range(1, page):
+        rows = search_user_chats_query(conn, user_id, query, limit, after_rank=after_rank, after_key=after_key)
+        if len(rows) <= limit:
+            return (after_rank, after_key) if after_rank is not None else None, reached
+        after_rank, after_key = rows[limit - 1]["rank"], rows[limit - 1]["hit_key"]
+    return (after_rank, after_key) if after_rank is not None else None, page
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=UUID, required=True, help="Existing user to search the chats of")
+    parser.add_argument("--model-id", type=UUID, help="Existing model for the seeded chats")
+    parser.add_argument("--query", default="postgres index", help="Search text, as typed by a user")
+    parser.add_argument("--chats", type=int, default=500, help="Chats to seed, 0 to search existing ones")
+    parser.add_argument("--messages", type=int, default=100, help="Messages per seeded chat")
+    parser.add_argument("--words", type=int, default=60, help="Words per seeded message")
+    parser.add_argument("--limit", type=int, default=20, help="Page size")
+    parser.add_argument("--page", type=int, default=5, help="Page fetched through the cursor")
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    args = parser.parse_args()
+    if args.chats and args.model_id is None:
+        parser.error("--model-id is needed to seed chats, or pass --chats 0")
+
+    with PostgresConnection(pooled=False) as conn:
+        if args.chats:
+            started = time.perf_counter()
+            seed(conn, args.user_id, args.model_id, args.chats, args.messages, args.words)
+            print(f"Seeded {args.chats * args.messages:,} messages in {time.perf_counter() - started:.1f}s")
+
+        after, page = cursor_of_page(conn, args.user_id, args.query, args.limit, args.page)
+        cases = {"first page": None}
+        if after is not None:
+            cases[f"page {page} (cursor)"] = after
+        else:
+            print(f"'{args.query}' has a single page of hits, nothing to follow a cursor to")
+
+        for label, position in cases.items():
+            def search() -> None:
+                search_user_chats_query(
+                    conn,
+                    args.user_id,
+                    args.query,
+                    args.limit,
+                    after_rank=position[0] if position else None,
+                    after_key=position[1] if position else None,
+                )
+
+            result = measure(search, args.runs, args.warmup)
+            print(
+                f"{label:>18}: mean {result['mean_ms']:.2f} ms, "
+                f"p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms"
+            )
+        conn.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+The database tests run against a scratch database given by TEST_DATABASE_URL,
+with the schema and migrations applied. Each test rolls back what it wrote.
+"""
+import io
+import json
+import os
+import uuid
+
+import pytest
+
+try:
+    import psycopg2
+    import psycopg2.extras
+
+    from app.database.import_queries import import_ndjson
+except ImportError:  # the database tests are skipped
+    psycopg2 = None
+
+requires_db = pytest.mark.skipif(
+    psycopg2 is None or not os.getenv("TEST_DATABASE_URL"),
+    reason="needs psycopg2 and TEST_DATABASE_URL",
+)
+
+
+@pytest.fixture
+def conn():
+    psycopg2.extras.register_uuid()
+    connection = psycopg2.connect(os.environ["TEST_DATABASE_URL"])
+    try:
+        yield connection
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+@pytest.fixture
+def user_id(conn):
+    user_id = uuid.uuid4()
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO users (id, username, email) VALUES (%s, %s, %s);",
+            (user_id, "import-test", f"{user_id}@example.com"),
+        )
+    return user_id
+
+
+@pytest.fixture
+def model_id(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT model_id FROM models LIMIT 1;")
+        row = cursor.fetchone()
+    if row is None:
+        pytest.skip("no models in the test database")
+    return str(row[0])
+
+
+def ndjson(*records, trailer=True) -> io.BytesIO:
+    if trailer:
+        records = records + ({"type": "end", "count": len(records)},)
+    return io.BytesIO("".join(json.dumps(record) + "\n" for record in records).encode("utf-8"))
+
+
+def conversation(conversation_id, model_id, leaf):
+    return {
+        "type": "conversation",
+        "conversation_id": conversation_id,
+        "title": "Imported",
+        "current_model_id": model_id,
+        "active_leaf_message_id": leaf,
+    }
+
+
+def message(message_id, parent, conversation_id, role, content):
+    return {
+        "type": "message",
+        "message_id": message_id,
+        "parent_message_id": parent,
+        "conversation_id": conversation_id,
+        "role": role,
+        "content": content,
+    }
+
+
+@requires_db
+def test_branched_import_keeps_parents_before_children(conn, user_id, model_id):
+    conversation_id = str(uuid.uuid4())
+    # Two sibling replies to the root, the second continued; lines out of id order
+    stream = ndjson(
+        conversation(conversation_id, model_id, leaf=40),
+        message(40, 30, conversation_id, "user", "continue"),
+        message(30, 10, conversation_id, "assistant", "reply b"),
+        message(10, None, conversation_id, "user", "hello"),
+        message(20, 10, conversation_id, "assistant", "reply a"),
+    )
+
+    counts = import_ndjson(conn, user_id, stream)
+    assert counts["messages"] == 4
+
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+        cursor.execute(
+            """
+            SELECT m.message_id, m.parent_message_id, m.content, c.active_leaf_message_id
+            FROM messages m JOIN conversations c USING (conversation_id)
+            WHERE c.user_id = %s
+            ORDER BY m.message_id;
+            """,
+            (user_id,),
+        )
+        rows = cursor.fetchall()
+
+    assert [row["content"] for row in rows] == ["hello", "reply a", "reply b", "continue"]
+    ids = {row["content"]: row["message_id"] for row in rows}
+    parents = {row["content"]: row["parent_message_id"] for row in rows}
+    assert parents == {
+        "hello": None,
+        "reply a": ids["hello"],
+        "reply b": ids["hello"],
+        "continue": ids["reply b"],
+    }
+    assert all(row["parent_message_id"] is None or row["parent_message_id"] < row["message_id"] for row in rows)
+    assert rows[0]["active_leaf_message_id"] == ids["continue"]
+
+
+@requires_db
+def test_parent_cycle_is_rejected(conn, user_id, model_id):
+    from app.custom_exceptions import ImportRejected
+
+    conversation_id = str(uuid.uuid4())
+    stream = ndjson(
+        conversation(conversation_id, model_id, leaf=None),
+        message(1, 2, conversation_id, "user", "a"),
+        message(2, 1, conversation_id, "assistant", "b"),
+    )
+
+    with pytest.raises(ImportRejected):
+        import_ndjson(conn, user_id, stream)
+
+
+@requires_db
+@pytest.mark.parametrize("trailer", [None, {"type": "end", "count": 3}], ids=["missing", "wrong count"])
+def test_truncated_file_is_rejected(conn, user_id, model_id, trailer):
+    from app.custom_exceptions import ImportRejected
+
+    conversation_id = str(uuid.uuid4())
+    records = (
+        conversation(conversation_id, model_id, leaf=None),
+        message(1, None, conversation_id, "user", "a"),
+    )
+    if trailer:
+        # Trailer of a longer file: lines were lost in between
+        records += (trailer,)
+
+    with pytest.raises(ImportRejected):
+        import_ndjson(conn, user_id, ndjson(*records, trailer=False))
+
+
+@pytest.mark.parametrize("compression", ["none", "gzip", "zstd"])
+def test_export_file_reads_back_line_for_line(compression):
+    pytest.importorskip("pydantic")
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    from app.schemas.data import Compression
+    from app.services.ndjson import CHUNK_BYTES, encode_lines, open_lines
+
+    # Enough lines to span several chunks
+    lines = [json.dumps({"type": "message", "content": f"line {i}"}) for i in range(CHUNK_BYTES // 10)]
+    exported = b"".join(encode_lines(iter(lines), Compression(compression)))
+
+    assert open_lines(io.BytesIO(exported)).read().decode("utf-8").splitlines() == lines
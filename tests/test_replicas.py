@@ -0,0 +1,92 @@
+import os
+import time
+import uuid
+
+import pytest
+
+from app.database.replica_routing import InMemoryWriteLog, ReplicaRouter, create_write_log
+
+
+REPLICA = "postgresql://replica/db"
+
+
+def make_router(write_log) -> ReplicaRouter:
+    router = ReplicaRouter(dsns=[REPLICA], write_log=write_log)
+    replica = router.replicas[REPLICA]
+    replica.healthy = True
+    replica.caught_up_at = time.time()
+    return router
+
+
+def lag_replica(router: ReplicaRouter, seconds: float) -> None:
+    router.replicas[REPLICA].caught_up_at = time.time() - seconds
+
+
+@pytest.fixture(params=["memory", "redis"])
+def shared_log(request):
+    if request.param == "redis":
+        url = os.getenv("TEST_REDIS_URL")
+        if not url:
+            pytest.skip("TEST_REDIS_URL is not set")
+        pytest.importorskip("redis")
+        return create_write_log(url)
+    return InMemoryWriteLog()
+
+
+def test_write_through_one_worker_is_seen_by_another(shared_log):
+    # Two API workers: separate routers, one write log
+    writer, reader = make_router(shared_log), make_router(shared_log)
+    user_id = str(uuid.uuid4())
+
+    writer.begin_write(user_id)
+    assert reader.choose(user_id) is None  # write in flight
+
+    writer.end_write(user_id)
+    lag_replica(reader, 1.0)
+    assert reader.choose(user_id) is None  # replica has not replayed it
+
+    reader.replicas[REPLICA].caught_up_at = time.time()
+    assert reader.choose(user_id) == REPLICA
+
+
+def test_other_users_still_read_from_lagging_replica(shared_log):
+    writer, reader = make_router(shared_log), make_router(shared_log)
+    writer.end_write(str(uuid.uuid4()))
+    lag_replica(reader, 1.0)
+    assert reader.choose(str(uuid.uuid4())) == REPLICA
+
+
+def test_separate_logs_do_not_share_writes():
+    writer, reader = make_router(InMemoryWriteLog()), make_router(InMemoryWriteLog())
+    user_id = str(uuid.uuid4())
+    writer.end_write(user_id)
+    lag_replica(reader, 1.0)
+    # Why REDIS_URL is needed with several workers
+    assert reader.choose(user_id) == REPLICA
+
+
+class SampledRouter(ReplicaRouter):
+    """
+    Health check probes answered from fixed WAL positions instead of servers.
+    """
+
+    def __init__(self, primary_lsn: int, replay_lsn: int) -> None:
+        super().__init__(dsns=[REPLICA], write_log=InMemoryWriteLog())
+        self.primary_lsn = primary_lsn
+        self.replay_lsn = replay_lsn
+
+    def primary_wal_lsn(self) -> int:
+        return self.primary_lsn
+
+    def replica_status(self, dsn: str):
+        return True, self.replay_lsn
+
+
+def test_check_marks_replica_healthy_once_it_replays_a_sample():
+    router = SampledRouter(primary_lsn=100, replay_lsn=50)
+    router.check()
+    assert router.choose() is None  # has not replayed any sampled position
+
+    router.replay_lsn = 100
+    router.check()
+    assert router.choose() == REPLICA
@@ -0,0 +1,53 @@
+import asyncio
+import logging
+import os
+import signal
+
+import psycopg2.extras
+from dotenv import load_dotenv
+
+from app.database.connection import PostgresConnection
+from app.database.job_queries import ensure_job_scheduled
+from app.services.constants import (
+    JOB_KIND_ARCHIVE_CONVERSATIONS,
+    JOB_KIND_PURGE_CHECKPOINTS,
+    JOB_KIND_PURGE_JOBS,
+    JOB_PRIORITY_LOW,
+)
+from app.services.job_worker import JobWorker
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+load_dotenv(override=True)
+psycopg2.extras.register_uuid()
+
+
+def schedule_recurring_jobs(archive: bool):
+    # Recurring jobs reschedule themselves; this only starts the chains
+    kinds = [JOB_KIND_PURGE_JOBS, JOB_KIND_PURGE_CHECKPOINTS]
+    if archive:
+        kinds.append(JOB_KIND_ARCHIVE_CONVERSATIONS)
+    with PostgresConnection() as conn:
+        for kind in kinds:
+            ensure_job_scheduled(conn, kind, {}, priority=JOB_PRIORITY_LOW, max_attempts=1)
+
+
+async def main():
+    schedule_recurring_jobs(
+        archive=os.getenv("ARCHIVE_CONVERSATIONS", "true").lower() not in ("0", "false", "off", "no")
+    )
+
+    worker = JobWorker(concurrency=int(os.getenv("WORKER_CONCURRENCY", "4")))
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    await worker.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())